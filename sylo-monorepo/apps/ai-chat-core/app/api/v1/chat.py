@@ -1,11 +1,34 @@
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Awaitable, Callable, Hashable, NamedTuple, Tuple
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, Header, Query
-from app.models.chat import ChatRequest, ChatResponse, Message, ChatHistoryEntry
+import asyncio
+import json
+import math
+import time
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header, Query
+from fastapi.responses import StreamingResponse
+from app.models.chat import (
+    ChatRequest,
+    ChatResponse,
+    Message,
+    ChatHistoryEntry,
+    ChatBatchRequest,
+    ChatBatchResponse,
+    ChatBatchItemResult,
+    ChatBatchError,
+    ChatHistoryPage,
+    ChatSessionPage,
+)
+from app.models.user import EffectiveSettings
 from app.services.model_service import model_orchestrator
+from app.core.rate_limiter import DEFAULT_PRIORITY
 from app.crud.crud_chat_history import chat_history_repository
-from app.crud.crud_user_settings import user_settings_repository
+from app.crud.crud_chat_sessions import chat_session_repository
+from app.services.settings_resolver import settings_resolver
+from app.services.context_builder import context_builder, ContextOverflowError
+from app.services.tokenizer import count_message_tokens, estimate_cost
 from app.core.config import settings
+from app.core.metrics import chat_completion_duration, chat_time_to_first_token
+from app.core.tracing import tracer
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
@@ -29,78 +52,584 @@ async def get_user_id(x_user_id: str = Header(...)) -> UUID:
         raise HTTPException(status_code=400, detail="Invalid user ID format")
 
 
-@router.post("/completion", response_model=ChatResponse)
-async def chat_completion(
+class _SharedLookups:
+    """
+    Shares settings and history lookups between the items of a batch, so
+    items for the same user or session hit the repositories once.
+    """
+    
+    def __init__(self):
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+    
+    async def _shared(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._pending.get(key)
+        if future is None:
+            future = self._pending[key] = asyncio.ensure_future(fetch())
+        # One item being cancelled must not cancel the lookup for the others
+        return await asyncio.shield(future)
+    
+    async def get_settings(self, user_id: UUID) -> EffectiveSettings:
+        return await self._shared(
+            ("settings", user_id),
+            lambda: settings_resolver.resolve(user_id)
+        )
+    
+    async def get_context_messages(
+        self,
+        user_id: UUID,
+        session_id: UUID,
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        return await self._shared(
+            ("history", user_id, session_id, limit),
+            lambda: chat_history_repository.get_context_messages(
+                user_id=user_id,
+                session_id=session_id,
+                limit=limit
+            )
+        )
+
+
+class _PreparedChat(NamedTuple):
+    """
+    The model context built for a chat request.
+    """
+    messages: List[Dict[str, Any]]
+    user_settings: EffectiveSettings
+    prompt_tokens: int
+    estimated_cost: float
+
+
+async def _load_settings_and_history(
+    user_id: UUID,
+    session_id: UUID,
+    lookups: Optional[_SharedLookups] = None
+) -> Tuple[EffectiveSettings, List[Dict[str, Any]]]:
+    """
+    Load a user's effective settings and a session's recent history concurrently.
+    
+    The history read doesn't wait for the settings to learn the memory
+    window: it fetches the session cache's full window, which is what a
+    cache miss loads anyway, and is trimmed once the settings arrive. Only a
+    memory window larger than the cache needs a second read.
+    
+    Args:
+        user_id: The ID of the user.
+        session_id: The ID of the session.
+        lookups: Lookups shared with other items of a batch, if any.
+    
+    Returns:
+        The user's effective settings and up to ``memory_window`` messages,
+        oldest first.
+    """
+    if lookups is not None:
+        get_settings = lookups.get_settings
+        get_history = lookups.get_context_messages
+    else:
+        get_settings = settings_resolver.resolve
+        get_history = chat_history_repository.get_context_messages
+    
+    prefetch = chat_history_repository.session_cache.max_messages
+    user_settings, history_messages = await asyncio.gather(
+        get_settings(user_id),
+        get_history(user_id, session_id, prefetch)
+    )
+    
+    memory_window = user_settings.memory_window
+    if memory_window > prefetch:
+        history_messages = await get_history(user_id, session_id, memory_window)
+    else:
+        history_messages = history_messages[max(0, len(history_messages) - memory_window):]
+    
+    return user_settings, history_messages
+
+
+async def _prepare_messages(
     request: ChatRequest,
-    user_id: UUID = Depends(get_user_id)
-) -> ChatResponse:
+    user_id: UUID,
+    lookups: Optional[_SharedLookups] = None
+) -> _PreparedChat:
     """
-    Generate a chat completion using OpenAI.
+    Resolve the session and settings for a request and build the model context.
+    
+    Creates a session if needed, applies the user's effective settings
+    (system, team and user layers, with per-model overrides) to unset
+    request fields, packs recent history into the model's token budget,
+    checks the request's size and worst-case cost locally, and stores the
+    new user messages.
     
     Args:
-        request: The chat completion request.
+        request: The chat completion request (updated in place).
         user_id: The ID of the user making the request.
+        lookups: Lookups shared with other items of a batch, if any.
         
     Returns:
-        The chat completion response.
+        The messages to send to the model, the user's settings, the prompt
+        token count and the estimated worst-case cost.
+        
+    Raises:
+        HTTPException: 413 if the request can't fit the model's context, or
+            400 if its estimated cost exceeds ``max_request_cost``.
     """
-    # Override user_id from the header (security measure)
-    request.user_id = user_id
-    
     # Get or create session ID if not provided
     session_id = request.session_id
     if not session_id:
         session_id = await chat_history_repository.create_new_session(user_id)
         request.session_id = session_id
     
-    # Get user settings
-    user_settings = await user_settings_repository.get_or_create_settings(user_id)
+    # Get effective settings and recent chat history for context
+    user_settings, history_messages = await _load_settings_and_history(user_id, session_id, lookups)
     
-    # Apply user settings if not explicitly provided in the request
+    # Apply settings if not explicitly provided in the request
     if not request.model:
         request.model = user_settings.default_model
+    model_settings = user_settings.for_model(request.model)
     if not request.temperature:
-        request.temperature = user_settings.temperature
-    if not request.max_tokens and user_settings.max_tokens:
-        request.max_tokens = user_settings.max_tokens
+        request.temperature = model_settings["temperature"]
+    if not request.max_tokens and model_settings["max_tokens"]:
+        request.max_tokens = model_settings["max_tokens"]
     
-    # Retrieve chat history for context
-    memory_window = user_settings.memory_window
-    history_entries = await chat_history_repository.get_session_history(
-        user_id=user_id,
-        session_id=session_id,
-        limit=memory_window
-    )
+    # Combine history with current messages within the model's token budget
+    new_messages = [msg.dict() for msg in request.messages]
+    try:
+        with tracer.span("chat.build_context") as span:
+            all_messages, prompt_tokens = context_builder.build(
+                model=request.model,
+                history=history_messages,
+                new_messages=new_messages,
+                max_tokens=request.max_tokens,
+                tools=request.tools
+            )
+            span.set_attributes({
+                "chat.history_messages": len(history_messages),
+                "gen_ai.usage.input_tokens": prompt_tokens,
+            })
+    except ContextOverflowError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     
-    # Convert history entries to message format
-    history_messages = []
-    for entry in history_entries:
-        if entry.metadata and entry.metadata.get("session_start"):
-            # Skip session start marker
-            continue
-        history_messages.append({
-            "role": entry.role,
-            "content": entry.content
-        })
-    
-    # Combine history with current messages, respecting memory window
-    all_messages = history_messages + [msg.dict() for msg in request.messages]
-    if len(all_messages) > memory_window:
-        all_messages = all_messages[-memory_window:]
-    
-    # Store user messages in chat history
-    for msg in request.messages:
+    # Reject requests that could cost more than allowed before calling the provider
+    reply_tokens = request.max_tokens if request.max_tokens is not None else settings.default_max_tokens
+    cost = estimate_cost(request.model, prompt_tokens, reply_tokens)
+    if settings.max_request_cost is not None and cost > settings.max_request_cost:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Estimated request cost {cost:.4f} exceeds the limit of {settings.max_request_cost:.4f}"
+        )
+    
+    # Store user messages in chat history, with the token counts just computed
+    for msg, new_message in zip(request.messages, new_messages):
         if msg.role == "user":
-            await chat_history_repository.create_entry(
+            chat_history_repository.enqueue_entry(
                 ChatHistoryEntry(
                     user_id=user_id,
                     session_id=session_id,
                     role=msg.role,
                     content=msg.content,
-                    model=None  # User messages don't have a model
+                    model=None,  # User messages don't have a model
+                    metadata={"token_counts": new_message.get("token_counts")}
                 )
             )
     
+    return _PreparedChat(all_messages, user_settings, prompt_tokens, cost)
+
+
+def _store_assistant_message(
+    user_id: UUID,
+    session_id: UUID,
+    model: str,
+    message: Message,
+    usage: Optional[Dict[str, Any]]
+) -> None:
+    """
+    Queue an assistant reply for storage in chat history.
+    
+    Args:
+        user_id: The ID of the user.
+        session_id: The ID of the session.
+        model: The model that generated the reply.
+        message: The assistant message.
+        usage: Token usage reported by the provider.
+    """
+    with tracer.span("chat.store_assistant_message"):
+        # Count tokens once now so later turns can reuse the stored count
+        counted = {"role": message.role, "content": message.content}
+        count_message_tokens(counted, model)
+        
+        chat_history_repository.enqueue_entry(
+            ChatHistoryEntry(
+                user_id=user_id,
+                session_id=session_id,
+                role=message.role,
+                content=message.content,
+                model=model,
+                metadata={
+                    "function_call": message.function_call,
+                    "tool_calls": message.tool_calls,
+                    "usage": usage,
+                    "token_counts": counted["token_counts"]
+                }
+            )
+        )
+
+
+async def _store_assistant_message_after_response(
+    user_id: UUID,
+    session_id: UUID,
+    model: str,
+    message: Message,
+    usage: Optional[Dict[str, Any]]
+) -> None:
+    """
+    Background-task form of ``_store_assistant_message``.
+    
+    Runs on the event loop, which the write buffer requires, once the
+    response has been sent. Starlette awaits background tasks as part of the
+    request, so a graceful shutdown finishes them before the lifespan drains
+    the write buffer.
+    """
+    _store_assistant_message(user_id, session_id, model, message, usage)
+
+
+def _raise_for_error(response: Dict[str, Any]) -> None:
+    """
+    Raise an HTTP error for a failed model response.
+    
+    Rate limits are returned as 429 with a ``Retry-After`` header so clients
+    can back off, unavailable providers as 503, and other failures as 500.
+    
+    Args:
+        response: The orchestrator response.
+        
+    Raises:
+        HTTPException: If the response is an error.
+    """
+    if not response.get("error", False):
+        return
+    
+    message = response.get("message", "Unknown error")
+    if response.get("status_code") == 429:
+        retry_after = response.get("retry_after")
+        raise HTTPException(
+            status_code=429,
+            detail=f"Model provider rate limit: {message}",
+            headers={"Retry-After": str(math.ceil(retry_after))} if retry_after else None
+        )
+    
+    if response.get("type") == "CircuitOpenError":
+        raise HTTPException(status_code=503, detail=message)
+    
+    raise HTTPException(
+        status_code=500,
+        detail=f"OpenAI API error: {message}"
+    )
+
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """
+    Format a Server-Sent Event.
+    
+    Args:
+        event: The event name.
+        data: The JSON-serializable event payload.
+        
+    Returns:
+        The encoded event, terminated by a blank line.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def _stream_chat_completion(
+    request: ChatRequest,
+    user_id: UUID,
+    messages: List[Dict[str, Any]],
+    fallback_models: Optional[List[str]] = None,
+    started: Optional[float] = None
+) -> AsyncIterator[str]:
+    """
+    Stream a chat completion as Server-Sent Events.
+    
+    Emits a ``delta`` event per content fragment, then a ``done`` event with
+    the session ID, serving model, finish reason and usage. Provider failures are reported
+    as an ``error`` event. The assembled reply is written to chat history
+    once the stream has finished.
+    
+    Args:
+        request: The chat completion request.
+        user_id: The ID of the user making the request.
+        messages: The messages to send to the model.
+        fallback_models: Preferred models to fall back to, in order.
+        started: ``time.perf_counter()`` when the request was received, to
+            record time to first token and end-to-end latency.
+    
+    Yields:
+        Encoded Server-Sent Events.
+    """
+    session_id = request.session_id
+    content_parts = []
+    finish_reason = None
+    usage = None
+    model = request.model
+    if started is None:
+        started = time.perf_counter()
+    
+    async for chunk in model_orchestrator.stream_completion(
+        messages=messages,
+        model=request.model,
+        temperature=request.temperature,
+        max_tokens=request.max_tokens,
+        tools=request.tools,
+        tool_choice=request.tool_choice,
+        fallback_models=fallback_models
+    ):
+        if chunk.get("error", False):
+            yield _sse_event("error", {
+                "message": chunk.get("message", "Unknown error"),
+                "type": chunk.get("type"),
+                "status_code": chunk.get("status_code"),
+                "retry_after": chunk.get("retry_after")
+            })
+            chat_completion_duration.labels("true", "error").observe(time.perf_counter() - started)
+            return
+        
+        model = chunk.get("model", model)
+        if chunk.get("usage"):
+            usage = chunk["usage"]
+        
+        if not chunk.get("choices"):
+            continue
+        
+        choice = chunk["choices"][0]
+        delta = choice.get("delta") or {}
+        if delta.get("content"):
+            if not content_parts:
+                chat_time_to_first_token.labels(model).observe(time.perf_counter() - started)
+            content_parts.append(delta["content"])
+            yield _sse_event("delta", {"content": delta["content"]})
+        if choice.get("finish_reason"):
+            finish_reason = choice["finish_reason"]
+    
+    # Store the assembled assistant message in chat history
+    message = Message(role="assistant", content="".join(content_parts))
+    _store_assistant_message(user_id, session_id, model, message, usage)
+    
+    yield _sse_event("done", {
+        "session_id": str(session_id),
+        "model": model,
+        "finish_reason": finish_reason,
+        "usage": usage
+    })
+    chat_completion_duration.labels("true", "success").observe(time.perf_counter() - started)
+
+
+@router.post("/completion", response_model=ChatResponse)
+async def chat_completion(
+    request: ChatRequest,
+    background_tasks: BackgroundTasks,
+    user_id: UUID = Depends(get_user_id)
+) -> ChatResponse:
+    """
+    Generate a chat completion using OpenAI.
+    
+    When ``request.stream`` is set, the reply is returned as a
+    ``text/event-stream`` of ``delta`` events followed by a ``done`` event.
+    Otherwise the reply is stored in chat history after the response is sent.
+    
+    Args:
+        request: The chat completion request.
+        background_tasks: Work to run after the response is sent.
+        user_id: The ID of the user making the request.
+        
+    Returns:
+        The chat completion response.
+    """
+    # Override user_id from the header (security measure)
+    request.user_id = user_id
+    started = time.perf_counter()
+    
+    try:
+        with tracer.span("chat.prepare"):
+            prepared = await _prepare_messages(request, user_id)
+        fallback_models = prepared.user_settings.preferred_models
+        
+        if request.stream:
+            # Latency of streamed replies is recorded when the stream ends
+            return StreamingResponse(
+                _stream_chat_completion(
+                    request, user_id, prepared.messages, fallback_models, started
+                ),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+        
+        with tracer.span("chat.generate"):
+            response = await _generate_chat_response(
+                request, user_id, prepared.messages, fallback_models,
+                background_tasks=background_tasks
+            )
+    except Exception:
+        chat_completion_duration.labels(str(request.stream).lower(), "error").observe(
+            time.perf_counter() - started
+        )
+        raise
+    
+    chat_completion_duration.labels("false", "success").observe(time.perf_counter() - started)
+    return response
+
+
+@router.post("/completions:batch", response_model=ChatBatchResponse)
+async def chat_completion_batch(
+    batch: ChatBatchRequest,
+    user_id: UUID = Depends(get_user_id)
+):
+    """
+    Generate chat completions for many requests with bounded concurrency.
+    
+    Items run through the orchestrator at most ``max_concurrency`` at a time
+    and at batch scheduling priority, so interactive requests are served
+    first when providers are rate limited. Settings and history lookups are
+    shared between items of the same user and session. A failed item is
+    reported in its result and does not fail the batch. Per-item
+    ``stream`` flags are ignored.
+    
+    When ``batch.stream`` is set, results are returned as
+    ``application/x-ndjson``, one line per item in completion order.
+    
+    Args:
+        batch: The batch of chat completion requests.
+        user_id: The ID of the user making the request.
+        
+    Returns:
+        The results, in the order of the request items.
+        
+    Raises:
+        HTTPException: If the batch has more items than allowed.
+    """
+    if len(batch.items) > settings.chat_batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch has {len(batch.items)} items; the maximum is {settings.chat_batch_max_items}"
+        )
+    
+    concurrency = settings.chat_batch_max_concurrency
+    if batch.max_concurrency:
+        concurrency = min(batch.max_concurrency, concurrency)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    lookups = _SharedLookups()
+    
+    async def run_item(index: int, request: ChatRequest) -> ChatBatchItemResult:
+        async with semaphore:
+            return await _run_batch_item(index, request, user_id, lookups)
+    
+    tasks = [
+        asyncio.ensure_future(run_item(index, request))
+        for index, request in enumerate(batch.items)
+    ]
+    
+    if batch.stream:
+        return StreamingResponse(
+            _stream_batch_results(tasks),
+            media_type="application/x-ndjson",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
+    try:
+        results = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    
+    return ChatBatchResponse(results=results)
+
+
+async def _run_batch_item(
+    index: int,
+    request: ChatRequest,
+    user_id: UUID,
+    lookups: _SharedLookups
+) -> ChatBatchItemResult:
+    """
+    Run one batch item, capturing its failure instead of raising.
+    
+    Args:
+        index: The item's position in the batch.
+        request: The item's chat completion request.
+        user_id: The ID of the user making the request.
+        lookups: Lookups shared with the other items.
+        
+    Returns:
+        The item's response or error.
+    """
+    # Override user_id from the header (security measure)
+    request.user_id = user_id
+    request.stream = False
+    
+    try:
+        prepared = await _prepare_messages(request, user_id, lookups)
+        response = await _generate_chat_response(
+            request,
+            user_id,
+            prepared.messages,
+            prepared.user_settings.preferred_models,
+            priority=settings.chat_batch_priority
+        )
+        return ChatBatchItemResult(index=index, session_id=response.session_id, response=response)
+    except HTTPException as e:
+        error = ChatBatchError(status_code=e.status_code, detail=str(e.detail))
+    except Exception as e:
+        error = ChatBatchError(status_code=500, detail=str(e))
+    
+    return ChatBatchItemResult(index=index, session_id=request.session_id, error=error)
+
+
+async def _stream_batch_results(tasks: List[asyncio.Task]) -> AsyncIterator[str]:
+    """
+    Stream batch results as NDJSON in completion order.
+    
+    Pending items are cancelled if the client disconnects.
+    
+    Args:
+        tasks: The running batch item tasks.
+        
+    Yields:
+        One JSON-encoded ``ChatBatchItemResult`` per line.
+    """
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            result = await next_result
+            yield result.json() + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _generate_chat_response(
+    request: ChatRequest,
+    user_id: UUID,
+    all_messages: List[Dict[str, Any]],
+    fallback_models: Optional[List[str]],
+    priority: int = DEFAULT_PRIORITY,
+    background_tasks: Optional[BackgroundTasks] = None
+) -> ChatResponse:
+    """
+    Generate a non-streamed completion and store the reply.
+    
+    Args:
+        request: The chat completion request.
+        user_id: The ID of the user making the request.
+        all_messages: The messages to send to the model.
+        fallback_models: Preferred models to fall back to, in order.
+        priority: Scheduling priority when providers are rate limited.
+        background_tasks: If given, the reply is stored after the response
+            is sent instead of before returning.
+    
+    Returns:
+        The chat completion response.
+        
+    Raises:
+        HTTPException: If the model call failed.
+    """
+    session_id = request.session_id
+    
     # Call the appropriate model service via the orchestrator
     response = await model_orchestrator.generate_completion(
         messages=all_messages,
@@ -108,15 +637,13 @@ async def chat_completion(
         temperature=request.temperature,
         max_tokens=request.max_tokens,
         tools=request.tools,
-        tool_choice=request.tool_choice
+        tool_choice=request.tool_choice,
+        fallback_models=fallback_models,
+        priority=priority
     )
     
     # Handle errors
-    if "error" in response and response.get("error", False):
-        raise HTTPException(
-            status_code=500,
-            detail=f"OpenAI API error: {response.get('message', 'Unknown error')}"
-        )
+    _raise_for_error(response)
     
     # Extract assistant message
     assistant_message = response["choices"][0]["message"]
@@ -129,27 +656,37 @@ async def chat_completion(
         tool_calls=assistant_message.get("tool_calls")
     )
     
-    # Store assistant message in chat history
-    await chat_history_repository.create_entry(
-        ChatHistoryEntry(
-            user_id=user_id,
-            session_id=session_id,
-            role=message.role,
-            content=message.content,
-            model=request.model,
-            metadata={
-                "function_call": message.function_call,
-                "tool_calls": message.tool_calls,
-                "usage": response.get("usage")
-            }
+    # Store assistant message in chat history, under the model that served it
+    model = response.get("model", request.model)
+    if background_tasks is not None:
+        background_tasks.add_task(
+            _store_assistant_message_after_response,
+            user_id, session_id, model, message, response.get("usage")
+        )
+    else:
+        _store_assistant_message(
+            user_id, session_id, model, message, response.get("usage")
+        )
+    
+    # Price the reply from the usage the provider reported
+    usage = response.get("usage") or {}
+    cost = None
+    if "prompt_tokens" in usage:
+        cost = estimate_cost(
+            model,
+            usage["prompt_tokens"],
+            usage.get("completion_tokens", 0),
+            usage.get("cache_read_tokens", 0),
+            usage.get("cache_write_tokens", 0)
         )
-    )
     
     # Create response
     chat_response = ChatResponse(
         message=message,
         session_id=session_id,
+        model=model,
         usage=response.get("usage"),
+        estimated_cost=cost,
         finish_reason=response["choices"][0].get("finish_reason")
     )
     
@@ -173,6 +710,39 @@ async def create_session(
     return {"session_id": session_id}
 
 
+@router.get("/sessions", response_model=ChatSessionPage)
+async def list_sessions(
+    limit: int = Query(50, ge=1, description="Maximum sessions to return (capped by the server)"),
+    cursor: Optional[str] = Query(None, description="The next_cursor of the previous page"),
+    user_id: UUID = Depends(get_user_id)
+) -> ChatSessionPage:
+    """
+    List the user's chat sessions, most recently active first.
+    
+    Served from the session index, so the cost depends on the page size
+    rather than on how much history the user has.
+    
+    Args:
+        limit: Maximum number of sessions to return.
+        cursor: The cursor returned with the previous page.
+        user_id: The ID of the user making the request.
+    
+    Returns:
+        The page of sessions and the cursor for the next one.
+    
+    Raises:
+        HTTPException: If the cursor is invalid.
+    """
+    try:
+        return await chat_session_repository.list_sessions(
+            user_id,
+            limit=min(limit, settings.chat_session_page_max_size),
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.delete("/sessions/{session_id}", response_model=Dict[str, bool])
 async def delete_session(
     session_id: UUID,
@@ -192,6 +762,88 @@ async def delete_session(
     return {"success": success}
 
 
+@router.get("/sessions/{session_id}/messages", response_model=ChatHistoryPage)
+async def get_session_messages(
+    session_id: UUID,
+    limit: int = Query(50, ge=1, description="Maximum messages to return (capped by the server)"),
+    cursor: Optional[str] = Query(None, description="The next_cursor of the previous page"),
+    order: str = Query("asc", pattern="^(asc|desc)$", description="asc for oldest first, desc for newest first"),
+    user_id: UUID = Depends(get_user_id)
+) -> ChatHistoryPage:
+    """
+    Get a page of a session's messages.
+    
+    Pages are keyed on (created_at, id) rather than offsets, so loading the
+    start of a long thread costs the same as loading its end.
+    
+    Args:
+        session_id: The ID of the session.
+        limit: Maximum number of messages to return.
+        cursor: The cursor returned with the previous page.
+        order: Sort order ("asc" or "desc").
+        user_id: The ID of the user making the request.
+    
+    Returns:
+        The page of messages and the cursor for the next one.
+    
+    Raises:
+        HTTPException: If the cursor is invalid.
+    """
+    try:
+        return await chat_history_repository.get_session_page(
+            user_id,
+            session_id,
+            limit=min(limit, settings.chat_history_page_max_size),
+            cursor=cursor,
+            order=order
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/sessions/{session_id}/export")
+async def export_session(
+    session_id: UUID,
+    user_id: UUID = Depends(get_user_id)
+) -> StreamingResponse:
+    """
+    Export all of a session's messages as NDJSON, oldest first.
+    
+    Messages are streamed as they are read, one keyset page at a time, so
+    exports of any length run in constant memory.
+    
+    Args:
+        session_id: The ID of the session.
+        user_id: The ID of the user making the request.
+    
+    Returns:
+        An ``application/x-ndjson`` response with one message per line.
+    """
+    return StreamingResponse(
+        _stream_session_export(user_id, session_id),
+        media_type="application/x-ndjson",
+        headers={
+            "Content-Disposition": f'attachment; filename="session-{session_id}.ndjson"',
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+async def _stream_session_export(user_id: UUID, session_id: UUID) -> AsyncIterator[str]:
+    """
+    Stream a session's messages as NDJSON.
+    
+    Args:
+        user_id: The ID of the user.
+        session_id: The ID of the session.
+    
+    Yields:
+        One JSON-encoded message per line.
+    """
+    async for row in chat_history_repository.iter_session_rows(user_id, session_id):
+        yield json.dumps(row, separators=(",", ":")) + "\n"
+
+
 @router.get("/models", response_model=List[Dict[str, Any]])
 async def list_available_models() -> List[Dict[str, Any]]:
     """
@@ -1,8 +1,9 @@
 from typing import Dict, Any
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, Header
-from app.models.user import UserSettingsResponse, UserSettingsUpdateRequest
+from app.models.user import EffectiveSettings, UserSettingsResponse, UserSettingsUpdateRequest
 from app.crud.crud_user_settings import user_settings_repository
+from app.services.settings_resolver import settings_resolver
 
 router = APIRouter(prefix="/user-settings", tags=["user_settings"])
 
@@ -96,4 +97,23 @@ async def update_settings(
             settings=None,
             success=False,
             error=str(e)
-        )
\ No newline at end of file
+        )
+
+
+@router.get("/effective", response_model=EffectiveSettings)
+async def get_effective_settings(
+    user_id: UUID = Depends(get_user_id)
+) -> EffectiveSettings:
+    """
+    Get the settings the user's chat requests run with.
+    
+    Merges system defaults, the user's teams' settings and the user's own
+    settings, as applied to chat completions.
+    
+    Args:
+        user_id: The ID of the user making the request.
+        
+    Returns:
+        The effective settings.
+    """
+    return await settings_resolver.resolve(user_id)
@@ -0,0 +1,123 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Bounded in-process LRU cache whose entries expire after a fixed TTL.
+    
+    Not thread-safe; intended for use from the event loop only.
+    """
+    
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None
+    ):
+        """
+        Initialize the cache.
+        
+        Args:
+            maxsize: Maximum number of entries before the least recently used is evicted.
+            ttl: Seconds an entry stays valid after it is set.
+            on_evict: Called with the key and value of every entry that leaves
+                the cache (evicted, expired, replaced, invalidated or cleared),
+                for keeping side indexes in step.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Get a value, refreshing its LRU position.
+        
+        Args:
+            key: The cache key.
+        
+        Returns:
+            The cached value, or None if missing or expired.
+        """
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self._evicted(key, value)
+            self.misses += 1
+            return None
+        
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+    
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Store a value, evicting the least recently used entry if full.
+        
+        Args:
+            key: The cache key.
+            value: The value to cache.
+        """
+        previous = self._data.get(key)
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        if previous is not None:
+            self._evicted(key, previous[1])
+        while len(self._data) > self.maxsize:
+            evicted_key, (_, evicted_value) = self._data.popitem(last=False)
+            self.evictions += 1
+            self._evicted(evicted_key, evicted_value)
+    
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Remove a single entry if present.
+        
+        Args:
+            key: The cache key.
+        """
+        item = self._data.pop(key, None)
+        if item is not None:
+            self._evicted(key, item[1])
+    
+    def clear(self) -> None:
+        """
+        Remove all entries.
+        """
+        items = list(self._data.items())
+        self._data.clear()
+        for key, (_, value) in items:
+            self._evicted(key, value)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters.
+        
+        Returns:
+            Dict with size, capacity, hits, misses, evictions and hit ratio.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+    
+    def _evicted(self, key: Hashable, value: Any) -> None:
+        """
+        Report an entry that left the cache to ``on_evict``.
+        """
+        if self.on_evict is not None:
+            self.on_evict(key, value)
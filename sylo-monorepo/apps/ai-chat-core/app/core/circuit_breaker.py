@@ -0,0 +1,309 @@
+import time
+from typing import Any, Dict, List, Optional
+
+# Circuit breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class RollingWindow:
+    """
+    Call outcomes over the last ``window`` seconds, kept in one-second buckets.
+    
+    Memory is constant and recording is O(1), so every call can be counted.
+    """
+    
+    def __init__(self, window: int):
+        self.window = max(1, int(window))
+        # Per bucket: [second, calls, failures, slow calls, latency sum]
+        self._buckets: List[List[float]] = [[-1, 0, 0, 0, 0.0] for _ in range(self.window)]
+    
+    def record(self, failed: bool, slow: bool, latency: float, now: float) -> None:
+        second = int(now)
+        bucket = self._buckets[second % self.window]
+        if bucket[0] != second:
+            bucket[:] = [second, 0, 0, 0, 0.0]
+        bucket[1] += 1
+        bucket[2] += failed
+        bucket[3] += slow
+        bucket[4] += latency
+    
+    def totals(self, now: float) -> Dict[str, float]:
+        """
+        Sum the buckets that are still inside the window.
+        
+        Returns:
+            Dict with calls, failures, slow calls and total latency.
+        """
+        oldest = int(now) - self.window
+        calls = failures = slow = latency = 0
+        for second, bucket_calls, bucket_failures, bucket_slow, bucket_latency in self._buckets:
+            if second > oldest:
+                calls += bucket_calls
+                failures += bucket_failures
+                slow += bucket_slow
+                latency += bucket_latency
+        return {"calls": calls, "failures": failures, "slow": slow, "latency": latency}
+    
+    def reset(self) -> None:
+        for bucket in self._buckets:
+            bucket[:] = [-1, 0, 0, 0, 0.0]
+
+
+class Permit:
+    """
+    An allowed call. Half-open probes carry the half-open period they were
+    admitted in, so only they can close or re-open the circuit.
+    """
+    
+    __slots__ = ("probe_generation",)
+    
+    def __init__(self, probe_generation: Optional[int] = None):
+        self.probe_generation = probe_generation
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker with a rolling error-rate window and half-open probes.
+    
+    While closed, calls pass and their outcomes are recorded. The circuit
+    opens when the error rate over the window reaches the threshold (after a
+    minimum number of calls), or after a run of consecutive failures. While
+    open, calls are rejected immediately. Once the open period has passed,
+    a limited number of probe calls are let through: a successful probe
+    closes the circuit, a failed one re-opens it for twice as long.
+    
+    Not thread-safe; intended for use from the event loop only.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        min_calls: int = 10,
+        consecutive_failures: int = 5,
+        window: int = 60,
+        open_seconds: float = 30.0,
+        max_open_seconds: float = 300.0,
+        half_open_probes: int = 1,
+        slow_call_seconds: float = 30.0
+    ):
+        """
+        Initialize the breaker.
+        
+        Args:
+            name: Name reported in statistics.
+            failure_rate_threshold: Error rate over the window that opens the circuit.
+            min_calls: Calls needed in the window before the error rate is used.
+            consecutive_failures: Failures in a row that open the circuit.
+            window: Length of the rolling window in seconds.
+            open_seconds: Initial time the circuit stays open.
+            max_open_seconds: Upper bound on the open time after failed probes.
+            half_open_probes: Probe calls allowed at once while half-open.
+            slow_call_seconds: Calls slower than this count as slow in the health score.
+        """
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.consecutive_failures = consecutive_failures
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.half_open_probes = half_open_probes
+        self.slow_call_seconds = slow_call_seconds
+        self.window = RollingWindow(window)
+        self.state = CLOSED
+        self.failure_streak = 0
+        self.opened_until = 0.0
+        self.open_duration = open_seconds
+        self.probes_in_flight = 0
+        # Incremented on each half-open period, to tell current probes apart
+        self.probe_generation = 0
+        self.rejected = 0
+        self.times_opened = 0
+    
+    def allow_request(self) -> Optional[Permit]:
+        """
+        Check whether a call may go ahead, claiming a probe slot if half-open.
+        
+        Every allowed call must be followed by ``record_success``,
+        ``record_failure`` or ``record_ignored`` with the returned permit.
+        
+        Returns:
+            The call's permit, or None if the call should fail fast.
+        """
+        if self.state == OPEN:
+            if time.monotonic() < self.opened_until:
+                self.rejected += 1
+                return None
+            self.state = HALF_OPEN
+            self.probe_generation += 1
+            self.probes_in_flight = 0
+        
+        if self.state == HALF_OPEN:
+            if self.probes_in_flight >= self.half_open_probes:
+                self.rejected += 1
+                return None
+            self.probes_in_flight += 1
+            return Permit(self.probe_generation)
+        
+        return Permit()
+    
+    def is_open(self) -> bool:
+        """
+        Check, without claiming a probe, whether calls are currently rejected.
+        """
+        return self.state == OPEN and time.monotonic() < self.opened_until
+    
+    def record_success(self, latency: float, permit: Permit) -> None:
+        """
+        Record a successful call.
+        
+        Args:
+            latency: The call's duration in seconds.
+            permit: The permit returned by ``allow_request``.
+        """
+        now = time.monotonic()
+        self.window.record(False, latency >= self.slow_call_seconds, latency, now)
+        self.failure_streak = 0
+        
+        if self._release_probe(permit):
+            self.state = CLOSED
+            self.open_duration = self.open_seconds
+            self.window.reset()
+    
+    def record_failure(self, latency: float, permit: Permit) -> None:
+        """
+        Record a failed call, opening the circuit if failures are sustained.
+        
+        Args:
+            latency: The call's duration in seconds.
+            permit: The permit returned by ``allow_request``.
+        """
+        now = time.monotonic()
+        self.window.record(True, latency >= self.slow_call_seconds, latency, now)
+        self.failure_streak += 1
+        
+        if self._release_probe(permit):
+            # The provider is still down: back off before probing again
+            self.open_duration = min(self.max_open_seconds, self.open_duration * 2)
+            self._open(now)
+            return
+        
+        if self.state == CLOSED and self._should_open(now):
+            self._open(now)
+    
+    def record_ignored(self, permit: Permit) -> None:
+        """
+        Release an allowed call whose outcome says nothing about provider
+        health, such as a cancelled call or a request error.
+        
+        Args:
+            permit: The permit returned by ``allow_request``.
+        """
+        self._release_probe(permit)
+    
+    def health(self) -> Dict[str, Any]:
+        """
+        Get the breaker state and a health score over the rolling window.
+        
+        The score is 1.0 for a healthy provider, falls with the error rate
+        and the share of slow calls, and is 0 while the circuit is open.
+        
+        Returns:
+            Dict with state, score, calls, error rate, slow call rate, mean
+            latency and rejected calls.
+        """
+        totals = self.window.totals(time.monotonic())
+        calls = totals["calls"]
+        error_rate = totals["failures"] / calls if calls else 0.0
+        slow_rate = totals["slow"] / calls if calls else 0.0
+        
+        state = self.state
+        if state == OPEN and not self.is_open():
+            state = HALF_OPEN
+        
+        if state == OPEN:
+            score = 0.0
+        else:
+            score = (1.0 - error_rate) * (1.0 - slow_rate / 2)
+            if state == HALF_OPEN:
+                score /= 2
+        
+        return {
+            "state": state,
+            "score": round(score, 3),
+            "calls": calls,
+            "error_rate": round(error_rate, 3),
+            "slow_call_rate": round(slow_rate, 3),
+            "mean_latency": round(totals["latency"] / calls, 3) if calls else None,
+            "rejected": self.rejected,
+            "times_opened": self.times_opened,
+        }
+    
+    def _should_open(self, now: float) -> bool:
+        if self.failure_streak >= self.consecutive_failures:
+            return True
+        totals = self.window.totals(now)
+        if totals["calls"] < self.min_calls:
+            return False
+        return totals["failures"] / totals["calls"] >= self.failure_rate_threshold
+    
+    def _release_probe(self, permit: Permit) -> bool:
+        """
+        Free the probe slot of a finished call.
+        
+        Returns:
+            True if the call was a probe of the current half-open period,
+            whose outcome should decide the circuit's state.
+        """
+        if (
+            self.state != HALF_OPEN
+            or permit.probe_generation is None
+            or permit.probe_generation != self.probe_generation
+        ):
+            return False
+        self.probes_in_flight = max(0, self.probes_in_flight - 1)
+        return True
+    
+    def _open(self, now: float) -> None:
+        self.state = OPEN
+        self.opened_until = now + self.open_duration
+        self.times_opened += 1
+
+
+class CircuitBreakerRegistry:
+    """
+    Lazily created circuit breakers sharing one configuration.
+    """
+    
+    def __init__(self, **options):
+        """
+        Initialize the registry.
+        
+        Args:
+            **options: Keyword arguments passed to every ``CircuitBreaker``.
+        """
+        self.options = options
+        self._breakers: Dict[str, CircuitBreaker] = {}
+    
+    def get(self, name: str) -> CircuitBreaker:
+        """
+        Get the breaker for a name, creating it on first use.
+        """
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = self._breakers[name] = CircuitBreaker(name, **self.options)
+        return breaker
+    
+    def peek(self, name: str) -> Optional[CircuitBreaker]:
+        """
+        Get the breaker for a name if one has been created.
+        """
+        return self._breakers.get(name)
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the health of every breaker created so far.
+        """
+        return {name: breaker.health() for name, breaker in self._breakers.items()}
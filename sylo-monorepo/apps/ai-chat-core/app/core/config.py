@@ -17,6 +17,8 @@ class ModelConfig(BaseSettings):
     cost_per_1k_output: float = 0.0
     context_window: int = 8192
     priority: int = 0  # Lower number means higher priority
+    requests_per_minute: int = 0  # Provider quota for this model, 0 for unlimited
+    tokens_per_minute: int = 0  # Provider quota for this model, 0 for unlimited
     
     model_config = SettingsConfigDict(
         arbitrary_types_allowed=True,
@@ -34,9 +36,26 @@ class Settings(BaseSettings):
     # OpenAI API Configuration
     openai_api_key: str = Field(..., env="OPENAI_API_KEY")
     openai_org_id: Optional[str] = Field(None, env="OPENAI_ORG_ID")
+    openai_api_base: Optional[str] = Field(None, env="OPENAI_API_BASE")
     
     # Anthropic API Configuration (optional)
     anthropic_api_key: Optional[str] = Field(None, env="ANTHROPIC_API_KEY")
+    anthropic_api_url: str = Field("https://api.anthropic.com/v1/messages", env="ANTHROPIC_API_URL")
+    
+    # Anthropic HTTP Client Configuration (shared, pooled per process)
+    anthropic_http2: bool = Field(True, env="ANTHROPIC_HTTP2")
+    anthropic_max_connections: int = Field(100, env="ANTHROPIC_MAX_CONNECTIONS")
+    anthropic_max_keepalive_connections: int = Field(20, env="ANTHROPIC_MAX_KEEPALIVE_CONNECTIONS")
+    anthropic_keepalive_expiry: float = Field(30.0, env="ANTHROPIC_KEEPALIVE_EXPIRY")
+    anthropic_connect_timeout: float = Field(5.0, env="ANTHROPIC_CONNECT_TIMEOUT")
+    anthropic_read_timeout: float = Field(120.0, env="ANTHROPIC_READ_TIMEOUT")
+    anthropic_write_timeout: float = Field(10.0, env="ANTHROPIC_WRITE_TIMEOUT")
+    anthropic_pool_timeout: float = Field(10.0, env="ANTHROPIC_POOL_TIMEOUT")
+    
+    # Tokenizer Configuration
+    tokenizer_mode: str = Field("exact", env="TOKENIZER_MODE")  # "exact" or "approximate"
+    tokenizer_approx_chars_per_token: float = Field(4.0, env="TOKENIZER_APPROX_CHARS_PER_TOKEN")
+    max_request_cost: Optional[float] = Field(None, env="MAX_REQUEST_COST")
     
     # Default Model Configuration
     default_model: str = Field("gpt-4o", env="DEFAULT_MODEL")
@@ -51,6 +70,105 @@ class Settings(BaseSettings):
     supabase_url: str = Field(..., env="SUPABASE_URL")
     supabase_anon_key: str = Field(..., env="SUPABASE_ANON_KEY")
     supabase_service_role_key: str = Field(..., env="SUPABASE_SERVICE_ROLE_KEY")
+    supabase_max_workers: int = Field(16, env="SUPABASE_MAX_WORKERS")
+    supabase_query_timeout: float = Field(10.0, env="SUPABASE_QUERY_TIMEOUT")
+    supabase_http2: bool = Field(True, env="SUPABASE_HTTP2")
+    supabase_max_connections: int = Field(32, env="SUPABASE_MAX_CONNECTIONS")
+    supabase_max_keepalive_connections: int = Field(16, env="SUPABASE_MAX_KEEPALIVE_CONNECTIONS")
+    supabase_keepalive_expiry: float = Field(30.0, env="SUPABASE_KEEPALIVE_EXPIRY")
+    supabase_connect_timeout: float = Field(5.0, env="SUPABASE_CONNECT_TIMEOUT")
+    supabase_user_client_cache_size: int = Field(1000, env="SUPABASE_USER_CLIENT_CACHE_SIZE")
+    supabase_user_client_ttl: float = Field(300.0, env="SUPABASE_USER_CLIENT_TTL")
+    
+    # Chat History Write-Behind Configuration
+    chat_history_flush_batch_size: int = Field(100, env="CHAT_HISTORY_FLUSH_BATCH_SIZE")
+    chat_history_flush_interval: float = Field(0.25, env="CHAT_HISTORY_FLUSH_INTERVAL")
+    chat_history_flush_max_retries: int = Field(3, env="CHAT_HISTORY_FLUSH_MAX_RETRIES")
+    chat_history_buffer_max_rows: int = Field(10000, env="CHAT_HISTORY_BUFFER_MAX_ROWS")
+    
+    # Cache Configuration
+    user_settings_cache_size: int = Field(10000, env="USER_SETTINGS_CACHE_SIZE")
+    user_settings_cache_ttl: float = Field(300.0, env="USER_SETTINGS_CACHE_TTL")
+    cache_invalidation_dsn: Optional[str] = Field(None, env="CACHE_INVALIDATION_DSN")
+    session_cache_max_messages: int = Field(50, env="SESSION_CACHE_MAX_MESSAGES")
+    session_cache_max_bytes: int = Field(64 * 1024 * 1024, env="SESSION_CACHE_MAX_BYTES")
+    session_cache_idle_ttl: float = Field(900.0, env="SESSION_CACHE_IDLE_TTL")
+    effective_settings_cache_size: int = Field(10000, env="EFFECTIVE_SETTINGS_CACHE_SIZE")
+    effective_settings_cache_ttl: float = Field(300.0, env="EFFECTIVE_SETTINGS_CACHE_TTL")
+    team_membership_cache_size: int = Field(10000, env="TEAM_MEMBERSHIP_CACHE_SIZE")
+    team_membership_cache_ttl: float = Field(300.0, env="TEAM_MEMBERSHIP_CACHE_TTL")
+    
+    # Completion Cache Configuration
+    completion_cache_enabled: bool = Field(True, env="COMPLETION_CACHE_ENABLED")
+    completion_cache_max_entries: int = Field(1000, env="COMPLETION_CACHE_MAX_ENTRIES")
+    completion_cache_ttl: float = Field(3600.0, env="COMPLETION_CACHE_TTL")
+    completion_cache_max_temperature: float = Field(0.3, env="COMPLETION_CACHE_MAX_TEMPERATURE")
+    completion_cache_max_entry_bytes: int = Field(256 * 1024, env="COMPLETION_CACHE_MAX_ENTRY_BYTES")
+    completion_cache_persistent: bool = Field(False, env="COMPLETION_CACHE_PERSISTENT")
+    
+    # Mark stable prompt prefixes for provider-side prompt caching
+    enable_prompt_caching: bool = Field(True, env="ENABLE_PROMPT_CACHING")
+    
+    # Coalesce concurrent identical completion requests into one upstream call
+    enable_request_coalescing: bool = Field(True, env="ENABLE_REQUEST_COALESCING")
+    
+    # Model Fallback and Hedging Configuration
+    enable_model_fallback: bool = Field(True, env="ENABLE_MODEL_FALLBACK")
+    model_fallback_max_attempts: int = Field(3, env="MODEL_FALLBACK_MAX_ATTEMPTS")
+    model_attempt_timeout: float = Field(60.0, env="MODEL_ATTEMPT_TIMEOUT")
+    enable_hedged_requests: bool = Field(False, env="ENABLE_HEDGED_REQUESTS")
+    hedge_percentile: float = Field(0.95, env="HEDGE_PERCENTILE")
+    hedge_min_samples: int = Field(20, env="HEDGE_MIN_SAMPLES")
+    hedge_min_delay: float = Field(0.5, env="HEDGE_MIN_DELAY")
+    
+    # Provider Rate Limiting Configuration
+    enable_rate_limiting: bool = Field(True, env="ENABLE_RATE_LIMITING")
+    rate_limit_max_concurrency: int = Field(64, env="RATE_LIMIT_MAX_CONCURRENCY")
+    rate_limit_min_concurrency: int = Field(1, env="RATE_LIMIT_MIN_CONCURRENCY")
+    rate_limit_queue_timeout: float = Field(30.0, env="RATE_LIMIT_QUEUE_TIMEOUT")
+    rate_limit_default_retry_after: float = Field(1.0, env="RATE_LIMIT_DEFAULT_RETRY_AFTER")
+    
+    # Provider Circuit Breaker Configuration
+    enable_circuit_breaker: bool = Field(True, env="ENABLE_CIRCUIT_BREAKER")
+    circuit_failure_rate_threshold: float = Field(0.5, env="CIRCUIT_FAILURE_RATE_THRESHOLD")
+    circuit_min_calls: int = Field(10, env="CIRCUIT_MIN_CALLS")
+    circuit_consecutive_failures: int = Field(5, env="CIRCUIT_CONSECUTIVE_FAILURES")
+    circuit_window_seconds: int = Field(60, env="CIRCUIT_WINDOW_SECONDS")
+    circuit_open_seconds: float = Field(30.0, env="CIRCUIT_OPEN_SECONDS")
+    circuit_max_open_seconds: float = Field(300.0, env="CIRCUIT_MAX_OPEN_SECONDS")
+    circuit_half_open_probes: int = Field(1, env="CIRCUIT_HALF_OPEN_PROBES")
+    circuit_slow_call_seconds: float = Field(30.0, env="CIRCUIT_SLOW_CALL_SECONDS")
+    
+    # Batch Chat Completion Configuration
+    chat_batch_max_items: int = Field(1000, env="CHAT_BATCH_MAX_ITEMS")
+    chat_batch_max_concurrency: int = Field(16, env="CHAT_BATCH_MAX_CONCURRENCY")
+    chat_batch_priority: int = Field(10, env="CHAT_BATCH_PRIORITY")
+    
+    # Session History Pagination Configuration
+    chat_history_page_max_size: int = Field(200, env="CHAT_HISTORY_PAGE_MAX_SIZE")
+    chat_history_export_page_size: int = Field(500, env="CHAT_HISTORY_EXPORT_PAGE_SIZE")
+    chat_session_page_max_size: int = Field(100, env="CHAT_SESSION_PAGE_MAX_SIZE")
+    
+    # Bulk Prompt Categorization Configuration
+    prompt_bulk_max_prompt_tokens: int = Field(6000, env="PROMPT_BULK_MAX_PROMPT_TOKENS")
+    prompt_bulk_max_items_per_call: int = Field(50, env="PROMPT_BULK_MAX_ITEMS_PER_CALL")
+    prompt_bulk_concurrency: int = Field(4, env="PROMPT_BULK_CONCURRENCY")
+    prompt_bulk_max_retries: int = Field(3, env="PROMPT_BULK_MAX_RETRIES")
+    prompt_bulk_priority: int = Field(20, env="PROMPT_BULK_PRIORITY")
+    
+    # Metrics Configuration
+    enable_metrics: bool = Field(True, env="ENABLE_METRICS")
+    
+    # Tracing Configuration
+    enable_tracing: bool = Field(False, env="ENABLE_TRACING")
+    tracing_exporter: str = Field("file", env="TRACING_EXPORTER")
+    tracing_sample_rate: float = Field(0.1, env="TRACING_SAMPLE_RATE")
+    tracing_file_path: str = Field("traces.jsonl", env="TRACING_FILE_PATH")
+    tracing_otlp_endpoint: str = Field("http://localhost:4318/v1/traces", env="TRACING_OTLP_ENDPOINT")
+    tracing_service_name: str = Field("ai-chat-core", env="TRACING_SERVICE_NAME")
+    tracing_max_queue_size: int = Field(2048, env="TRACING_MAX_QUEUE_SIZE")
+    tracing_batch_size: int = Field(512, env="TRACING_BATCH_SIZE")
+    tracing_flush_interval: float = Field(5.0, env="TRACING_FLUSH_INTERVAL")
     
     # API Configuration
     api_host: str = Field("0.0.0.0", env="API_HOST")
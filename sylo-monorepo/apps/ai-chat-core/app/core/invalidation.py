@@ -0,0 +1,104 @@
+from typing import Callable, Dict, List, Optional
+from app.core.config import settings
+
+try:
+    import asyncpg
+except ImportError:  # Optional: only needed for cross-replica invalidation
+    asyncpg = None
+
+
+class InvalidationBus:
+    """
+    Publish/subscribe hub for cache invalidation.
+    
+    Subscribers are always notified in-process. When ``CACHE_INVALIDATION_DSN``
+    points at the Supabase Postgres database, invalidations are also sent with
+    ``NOTIFY`` and received with ``LISTEN`` so every replica drops stale entries.
+    """
+    
+    def __init__(self, dsn: Optional[str] = None):
+        self.dsn = dsn
+        self._subscribers: Dict[str, List[Callable[[str], None]]] = {}
+        self._connection = None
+    
+    def subscribe(self, channel: str, callback: Callable[[str], None]) -> None:
+        """
+        Register a callback for invalidations on a channel.
+        
+        Args:
+            channel: The channel name (e.g. the table being cached).
+            callback: Called with the invalidated key.
+        """
+        self._subscribers.setdefault(channel, []).append(callback)
+    
+    async def publish(self, channel: str, key: str, local: bool = True) -> None:
+        """
+        Invalidate a key locally and on all other replicas.
+        
+        Args:
+            channel: The channel name.
+            key: The key to invalidate.
+            local: Whether to notify this process's subscribers too. Pass
+                False when the local cache was already updated in place.
+        """
+        if local:
+            self._dispatch(channel, key)
+        
+        if self._connection is not None:
+            try:
+                await self._connection.execute("SELECT pg_notify($1, $2)", channel, key)
+            except Exception as e:
+                print(f"Error publishing cache invalidation: {str(e)}")
+    
+    async def start(self) -> None:
+        """
+        Connect to Postgres and listen on all subscribed channels, if configured.
+        """
+        if not self.dsn:
+            return
+        if asyncpg is None:
+            print("Warning: CACHE_INVALIDATION_DSN is set but asyncpg is not installed. "
+                  "Cache invalidation will be local to this process.")
+            return
+        
+        try:
+            self._connection = await asyncpg.connect(self.dsn)
+            for channel in self._subscribers:
+                await self._connection.add_listener(channel, self._on_notify)
+        except Exception as e:
+            print(f"Error starting cache invalidation listener: {str(e)}")
+            self._connection = None
+    
+    async def stop(self) -> None:
+        """
+        Close the Postgres connection, if any.
+        """
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+    
+    def _on_notify(self, connection, pid: int, channel: str, payload: str) -> None:
+        """
+        asyncpg listener callback for NOTIFY messages.
+        
+        Our own notifications were already dispatched by ``publish``; handling
+        them again would drop entries written through since.
+        """
+        if pid == connection.get_server_pid():
+            return
+        self._dispatch(channel, payload)
+    
+    def _dispatch(self, channel: str, key: str) -> None:
+        """
+        Notify local subscribers of an invalidation.
+        
+        Args:
+            channel: The channel name.
+            key: The invalidated key.
+        """
+        for callback in self._subscribers.get(channel, []):
+            callback(key)
+
+
+# Create a global instance
+invalidation_bus = InvalidationBus(settings.cache_invalidation_dsn)
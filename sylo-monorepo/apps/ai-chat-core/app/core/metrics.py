@@ -0,0 +1,429 @@
+import functools
+import inspect
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from app.core.stats import DEFAULT_LATENCY_BUCKETS, LatencyHistogram
+from app.core.tracing import tracer
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _CounterValue:
+    __slots__ = ("value",)
+    
+    def __init__(self):
+        self.value = 0.0
+    
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _GaugeValue(_CounterValue):
+    __slots__ = ()
+    
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+    
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Metric(ABC):
+    """
+    A named metric with one child per combination of label values.
+    
+    Children are created on first use and kept for the life of the process,
+    so label values must come from a small, fixed set (models, providers,
+    route templates), never from user input. Recording is a dict lookup plus
+    an addition, cheap enough for every request.
+    """
+    
+    type_name = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+    
+    def labels(self, *values: Any) -> Any:
+        """
+        Get the child for a set of label values, creating it on first use.
+        
+        Args:
+            *values: One value per label name, in order.
+        
+        Returns:
+            The child, on which to record observations.
+        """
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(
+                    f"Metric '{self.name}' expects labels {self.labelnames}, got {key}"
+                )
+            child = self._children[key] = self._new_child()
+        return child
+    
+    @abstractmethod
+    def _new_child(self) -> Any:
+        """
+        Create the value object recording one label combination.
+        """
+        pass
+    
+    def render(self) -> List[str]:
+        """
+        Render the metric in the Prometheus text format.
+        
+        Returns:
+            The exposition lines.
+        """
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for values, child in list(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+    
+    def _render_child(self, values: Tuple[str, ...], child: Any) -> List[str]:
+        labels = _format_labels(self.labelnames, values)
+        return [f"{self.name}{labels} {_format_value(child.value)}"]
+
+
+class Counter(Metric):
+    """
+    Monotonically increasing total.
+    """
+    
+    type_name = "counter"
+    
+    def _new_child(self) -> _CounterValue:
+        return _CounterValue()
+    
+    def inc(self, amount: float = 1.0) -> None:
+        """
+        Increment the unlabelled counter.
+        """
+        self.labels().inc(amount)
+
+
+class Gauge(Metric):
+    """
+    Value that can go up and down.
+    """
+    
+    type_name = "gauge"
+    
+    def _new_child(self) -> _GaugeValue:
+        return _GaugeValue()
+    
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+    
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+
+class Histogram(Metric):
+    """
+    Latency histogram over fixed buckets, backed by ``LatencyHistogram``.
+    """
+    
+    type_name = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Optional[List[float]] = None
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets or DEFAULT_LATENCY_BUCKETS
+    
+    def _new_child(self) -> LatencyHistogram:
+        return LatencyHistogram(self.buckets)
+    
+    def observe(self, seconds: float) -> None:
+        """
+        Record an observation on the unlabelled histogram.
+        """
+        self.labels().observe(seconds)
+    
+    def _render_child(self, values: Tuple[str, ...], child: LatencyHistogram) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(child.buckets, child.counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, values, f'le="{_format_value(float(bound))}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        
+        labels = _format_labels(self.labelnames, values, 'le="+Inf"')
+        lines.append(f"{self.name}_bucket{labels} {child.count}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered together for the ``/metrics`` endpoint.
+    
+    Metrics are updated from the event loop without locking; rendering
+    copies each metric's children first, so a scrape never blocks requests.
+    """
+    
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+    
+    def _register(self, metric: Metric) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+    
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+    
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Optional[List[float]] = None
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+    
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text format.
+        
+        Returns:
+            The exposition text.
+        """
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Create a global instance
+metrics = MetricsRegistry()
+
+http_requests = metrics.counter(
+    "http_requests_total",
+    "HTTP requests by route and status code.",
+    ("method", "route", "status")
+)
+http_request_duration = metrics.histogram(
+    "http_request_duration_seconds",
+    "End-to-end HTTP request latency, until the last body chunk is sent.",
+    ("method", "route")
+)
+http_requests_in_flight = metrics.gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served."
+)
+chat_completion_duration = metrics.histogram(
+    "chat_completion_duration_seconds",
+    "End-to-end chat completion latency, including context lookups and history writes.",
+    ("stream", "outcome")
+)
+chat_time_to_first_token = metrics.histogram(
+    "chat_time_to_first_token_seconds",
+    "Time from receiving a streamed chat request to sending its first content delta.",
+    ("model",)
+)
+orchestrator_duration = metrics.histogram(
+    "model_orchestrator_duration_seconds",
+    "Latency of ModelOrchestrator.generate_completion, by requested model and source.",
+    ("model", "source")
+)
+provider_duration = metrics.histogram(
+    "model_provider_duration_seconds",
+    "Latency of a single provider call, excluding rate limiter queueing.",
+    ("provider", "model", "outcome")
+)
+model_tokens = metrics.counter(
+    "model_tokens_total",
+    "Tokens reported by providers, by direction (input, output, cache_read or cache_write).",
+    ("provider", "model", "direction")
+)
+model_cost = metrics.counter(
+    "model_estimated_cost_total",
+    "Estimated provider cost from ModelConfig.cost_per_1k_input and cost_per_1k_output.",
+    ("provider", "model")
+)
+supabase_query_duration = metrics.histogram(
+    "supabase_query_duration_seconds",
+    "Latency of a Supabase query, including waiting for a query worker."
+)
+repository_duration = metrics.histogram(
+    "repository_call_duration_seconds",
+    "Latency of repository methods, including cache hits.",
+    ("repository", "method", "outcome")
+)
+
+
+def _timed_repository_call(repository: str, name: str, method: Callable) -> Callable:
+    """
+    Wrap a repository function so each call is recorded in ``repository_duration``.
+    
+    Coroutine functions are timed until they return and traced as a span;
+    async generator functions are timed from the first item until they are
+    exhausted or closed, without a span since one would stay current in the
+    consumer between items. Plain functions, such as ones that only enqueue
+    work, are timed as calls. Raised exceptions are recorded with outcome
+    ``error`` and re-raised.
+    """
+    success = repository_duration.labels(repository, name, "success")
+    error = repository_duration.labels(repository, name, "error")
+    span_name = f"{repository}.{name}"
+    
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def timed_coroutine(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                with tracer.span(span_name):
+                    result = await method(*args, **kwargs)
+            except BaseException:
+                error.observe(time.perf_counter() - started)
+                raise
+            success.observe(time.perf_counter() - started)
+            return result
+        return timed_coroutine
+    
+    if inspect.isasyncgenfunction(method):
+        @functools.wraps(method)
+        async def timed_generator(*args, **kwargs):
+            started = time.perf_counter()
+            generator = method(*args, **kwargs)
+            try:
+                async for item in generator:
+                    yield item
+            except GeneratorExit:
+                # Closed early by the consumer, e.g. a client disconnecting
+                success.observe(time.perf_counter() - started)
+                raise
+            except BaseException:
+                error.observe(time.perf_counter() - started)
+                raise
+            else:
+                success.observe(time.perf_counter() - started)
+            finally:
+                await generator.aclose()
+        return timed_generator
+    
+    @functools.wraps(method)
+    def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = method(*args, **kwargs)
+        except BaseException:
+            error.observe(time.perf_counter() - started)
+            raise
+        success.observe(time.perf_counter() - started)
+        return result
+    return timed
+
+
+def instrument_repository(repository: str) -> Callable[[type], type]:
+    """
+    Class decorator timing every public method of a repository.
+    
+    Args:
+        repository: The repository label, e.g. ``chat_history``.
+    
+    Returns:
+        The decorator.
+    """
+    def decorate(cls: type) -> type:
+        for name, member in list(vars(cls).items()):
+            if name.startswith("_") or not inspect.isfunction(member):
+                continue
+            setattr(cls, name, _timed_repository_call(repository, name, member))
+        return cls
+    
+    return decorate
+
+
+def instrument_repository_function(repository: str) -> Callable[[Callable], Callable]:
+    """
+    Decorator timing a module-level repository function.
+    
+    Args:
+        repository: The repository label, e.g. ``team_settings``.
+    
+    Returns:
+        The decorator.
+    """
+    def decorate(function: Callable) -> Callable:
+        return _timed_repository_call(repository, function.__name__, function)
+    
+    return decorate
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request counts, in-flight requests and latency.
+    
+    Requests are labelled with their route template rather than the raw
+    path, so IDs in URLs don't create new series. Latency runs until the
+    response body is complete, which covers streamed responses.
+    """
+    
+    def __init__(self, app: Callable, exclude_paths: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.exclude_paths = set(exclude_paths)
+    
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or scope.get("path") in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+        
+        started = time.perf_counter()
+        status = 500
+        
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            # The router stores the matched route in the scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope.get("method", "")
+            http_request_duration.labels(method, route).observe(time.perf_counter() - started)
+            http_requests.labels(method, route, status).inc()
@@ -0,0 +1,359 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+# Default scheduling priority; lower numbers are served first
+DEFAULT_PRIORITY = 0
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a ``retry-after`` header given in seconds.
+    
+    Args:
+        value: The header value, if present.
+    
+    Returns:
+        The delay in seconds, or None if missing or not numeric.
+    """
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RateLimitExceeded(Exception):
+    """
+    Raised when a request cannot be admitted before its deadline.
+    """
+    
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at a per-minute rate.
+    
+    The bucket starts full and holds at most one minute of quota.
+    """
+    
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+    
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def wait_time(self, amount: float, now: float) -> float:
+        """
+        Get the seconds until ``amount`` can be taken.
+        
+        Amounts above the capacity only wait for a full bucket, so oversized
+        requests are delayed rather than starved.
+        """
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+    
+    def take(self, amount: float, now: float) -> None:
+        """
+        Remove ``amount`` from the bucket. The level may go negative.
+        """
+        self._refill(now)
+        self.level -= amount
+    
+    def give_back(self, amount: float) -> None:
+        """
+        Return over-estimated quota, or charge under-estimated quota when negative.
+        """
+        self.level = min(self.capacity, self.level + amount)
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency and quota limiter with an AIMD concurrency window.
+    
+    Requests are admitted while in-flight calls are below the current
+    concurrency limit and the request and token buckets have quota.
+    Otherwise they wait in a priority queue (lower priority value first,
+    FIFO within a priority). Each success raises the limit additively; each
+    rate-limit response halves it and pauses admissions for ``retry-after``.
+    
+    Not thread-safe; intended for use from the event loop only.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        max_concurrency: int = 64,
+        min_concurrency: int = 1
+    ):
+        """
+        Initialize the limiter.
+        
+        Args:
+            name: Name reported in statistics.
+            requests_per_minute: Request quota, or 0 for unlimited.
+            tokens_per_minute: Token quota, or 0 for unlimited.
+            max_concurrency: Upper bound, and starting value, of the concurrency limit.
+            min_concurrency: Lower bound of the concurrency limit.
+        """
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.rate_limited = 0
+        self.rejected = 0
+        self._waiters: List[list] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+    
+    async def acquire(
+        self,
+        tokens: int = 0,
+        priority: int = DEFAULT_PRIORITY,
+        deadline: Optional[float] = None
+    ) -> None:
+        """
+        Wait for a slot and quota.
+        
+        Args:
+            tokens: Estimated tokens the request will use.
+            priority: Scheduling priority; lower values are served first.
+            deadline: ``time.monotonic()`` value after which to give up.
+        
+        Raises:
+            RateLimitExceeded: If the request was not admitted by the deadline.
+        """
+        now = time.monotonic()
+        if not self._waiters and self._admission_delay(tokens, now) == 0:
+            self._admit(tokens, now)
+            return
+        
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, [priority, next(self._sequence), future, tokens])
+        self._dispatch()
+        
+        timeout = None if deadline is None else max(0.0, deadline - now)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise RateLimitExceeded(
+                f"Rate limit for '{self.name}' not available before deadline",
+                retry_after=self._retry_after(tokens)
+            )
+        except asyncio.CancelledError:
+            # Admitted just as the caller was cancelled: hand the slot back
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        finally:
+            # A cancelled waiter may have been at the head of the queue
+            if not future.done() or future.cancelled():
+                self._dispatch()
+    
+    def release(self) -> None:
+        """
+        Free a slot taken by ``acquire``.
+        """
+        self.in_flight -= 1
+        self._dispatch()
+    
+    def record_success(self, estimated_tokens: int = 0, actual_tokens: Optional[int] = None) -> None:
+        """
+        Grow the concurrency limit and correct the token estimate.
+        
+        Args:
+            estimated_tokens: Tokens charged at admission.
+            actual_tokens: Tokens reported by the provider, if known.
+        """
+        self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+        if self.tokens is not None and actual_tokens is not None:
+            self.tokens.give_back(estimated_tokens - actual_tokens)
+        self._dispatch()
+    
+    def record_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """
+        Halve the concurrency limit and pause admissions.
+        
+        Args:
+            retry_after: Seconds the provider asked us to wait, if given.
+        """
+        self.rate_limited += 1
+        self.limit = max(float(self.min_concurrency), self.limit / 2)
+        if retry_after:
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+        self._dispatch()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the limiter's current state and counters.
+        
+        Returns:
+            Dict with the concurrency limit, in-flight and queued requests,
+            remaining pause, rate-limit responses and rejected requests.
+        """
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": sum(1 for waiter in self._waiters if not waiter[2].done()),
+            "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 3),
+            "rate_limited": self.rate_limited,
+            "rejected": self.rejected,
+        }
+    
+    def _admission_delay(self, tokens: int, now: float) -> Optional[float]:
+        """
+        Get the seconds until a request can be admitted.
+        
+        Returns:
+            0 if it can be admitted now, a delay if it waits on a pause or
+            quota, or None if it waits for a slot to be released.
+        """
+        if self.in_flight >= int(self.limit):
+            return None
+        
+        delay = max(0.0, self.paused_until - now)
+        if self.requests is not None:
+            delay = max(delay, self.requests.wait_time(1, now))
+        if self.tokens is not None and tokens:
+            delay = max(delay, self.tokens.wait_time(tokens, now))
+        return delay
+    
+    def _admit(self, tokens: int, now: float) -> None:
+        self.in_flight += 1
+        if self.requests is not None:
+            self.requests.take(1, now)
+        if self.tokens is not None and tokens:
+            self.tokens.take(tokens, now)
+    
+    def _retry_after(self, tokens: int) -> float:
+        delay = self._admission_delay(tokens, time.monotonic())
+        return delay if delay else 1.0
+    
+    def _dispatch(self) -> None:
+        """
+        Admit queued requests in priority order while capacity allows.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        
+        now = time.monotonic()
+        while self._waiters:
+            priority, sequence, future, tokens = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            
+            delay = self._admission_delay(tokens, now)
+            if delay is None:
+                return
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+            
+            heapq.heappop(self._waiters)
+            self._admit(tokens, now)
+            future.set_result(None)
+
+
+class RateLimiterRegistry:
+    """
+    Lazily created limiters per provider and per model.
+    
+    A call holds a slot in both its model's limiter, which tracks the
+    model's request and token quotas, and its provider's limiter, which
+    bounds concurrency against the provider as a whole.
+    """
+    
+    def __init__(
+        self,
+        max_concurrency: int,
+        min_concurrency: int,
+        queue_timeout: float,
+        default_retry_after: float
+    ):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.queue_timeout = queue_timeout
+        self.default_retry_after = default_retry_after
+        self._limiters: Dict[str, AdaptiveLimiter] = {}
+    
+    def get(self, name: str, requests_per_minute: int = 0, tokens_per_minute: int = 0) -> AdaptiveLimiter:
+        """
+        Get the limiter for a provider or model, creating it on first use.
+        
+        Args:
+            name: The limiter name, e.g. ``openai`` or ``openai:gpt-4o``.
+            requests_per_minute: Request quota, or 0 for unlimited.
+            tokens_per_minute: Token quota, or 0 for unlimited.
+        
+        Returns:
+            The limiter.
+        """
+        limiter = self._limiters.get(name)
+        if limiter is None:
+            limiter = self._limiters[name] = AdaptiveLimiter(
+                name,
+                requests_per_minute=requests_per_minute,
+                tokens_per_minute=tokens_per_minute,
+                max_concurrency=self.max_concurrency,
+                min_concurrency=self.min_concurrency
+            )
+        return limiter
+    
+    @asynccontextmanager
+    async def slot(
+        self,
+        limiters: Tuple[AdaptiveLimiter, ...],
+        tokens: int = 0,
+        priority: int = DEFAULT_PRIORITY,
+        deadline: Optional[float] = None
+    ) -> AsyncIterator[None]:
+        """
+        Hold a slot in each limiter, acquired in order, for the duration of a call.
+        
+        Args:
+            limiters: The limiters to acquire, most specific first.
+            tokens: Estimated tokens the call will use.
+            priority: Scheduling priority; lower values are served first.
+            deadline: ``time.monotonic()`` value after which to give up.
+                Defaults to ``queue_timeout`` from now.
+        
+        Raises:
+            RateLimitExceeded: If a slot was not available by the deadline.
+        """
+        if deadline is None:
+            deadline = time.monotonic() + self.queue_timeout
+        
+        acquired = []
+        try:
+            for limiter in limiters:
+                await limiter.acquire(tokens, priority, deadline)
+                acquired.append(limiter)
+            yield
+        finally:
+            for limiter in reversed(acquired):
+                limiter.release()
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get statistics for every limiter created so far.
+        """
+        return {name: limiter.stats() for name, limiter in self._limiters.items()}
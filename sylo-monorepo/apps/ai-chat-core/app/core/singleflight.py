@@ -0,0 +1,104 @@
+import asyncio
+import copy
+from typing import Any, Awaitable, Callable, Dict
+
+
+class _Call:
+    """
+    An in-flight call and the number of callers waiting on it.
+    """
+    
+    __slots__ = ("task", "waiters")
+    
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one execution.
+    
+    The first caller for a key starts the call; callers arriving while it
+    is in flight wait on the same result. The call runs as its own task, so
+    one caller being cancelled does not affect the others; it is only
+    cancelled when every waiter has gone. Errors are raised to all waiters.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.abandoned = 0
+    
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run ``fn`` once for all concurrent callers with the same key.
+        
+        Args:
+            key: The request fingerprint.
+            fn: Zero-argument coroutine function performing the call.
+        
+        Returns:
+            The call's result. When the call was shared, callers receive deep
+            copies so they cannot affect each other.
+        """
+        call = self._calls.get(key)
+        leader = call is None
+        
+        if leader:
+            self.calls += 1
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task: self._finish(key, call))
+        else:
+            self.coalesced += 1
+        
+        call.waiters += 1
+        try:
+            result = await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            # Cancel the shared call only if nobody is left waiting for it
+            if not call.task.done() and call.waiters == 1:
+                self.abandoned += 1
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+        
+        # Hand out copies while anyone else may still read the shared result
+        if leader and call.waiters == 0:
+            return result
+        return copy.deepcopy(result)
+    
+    def in_flight(self) -> int:
+        """
+        Get the number of distinct calls currently running.
+        """
+        return len(self._calls)
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        Get coalescing counters.
+        
+        Returns:
+            Dict with upstream calls, coalesced callers, errors, abandoned calls
+            and calls currently in flight.
+        """
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "abandoned": self.abandoned,
+            "in_flight": len(self._calls),
+        }
+    
+    def _finish(self, key: str, call: _Call) -> None:
+        """
+        Remove a completed call and record its outcome.
+        """
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.task.cancelled() and call.task.exception() is not None:
+            self.errors += 1
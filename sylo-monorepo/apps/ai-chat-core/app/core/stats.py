@@ -0,0 +1,71 @@
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+# Latency bucket upper bounds in seconds, roughly log-spaced from 5ms to 5 minutes
+DEFAULT_LATENCY_BUCKETS: List[float] = [
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0,
+    5.0, 7.5, 10.0, 15.0, 20.0, 30.0, 45.0, 60.0, 90.0, 120.0, 180.0, 300.0,
+]
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram with approximate percentiles.
+    
+    Observations are O(log buckets) and memory is constant, so it is cheap
+    enough to record every request.
+    """
+    
+    def __init__(self, buckets: Optional[List[float]] = None):
+        self.buckets = buckets or DEFAULT_LATENCY_BUCKETS
+        # One extra slot counts observations above the largest bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+    
+    def observe(self, seconds: float) -> None:
+        """
+        Record one observation.
+        
+        Args:
+            seconds: The observed latency.
+        """
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+    
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Estimate a percentile as the upper bound of the bucket containing it.
+        
+        Args:
+            q: The quantile, between 0 and 1.
+        
+        Returns:
+            The estimated latency in seconds, or None if nothing was observed.
+        """
+        if self.count == 0:
+            return None
+        
+        rank = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return self.buckets[min(index, len(self.buckets) - 1)]
+        return self.buckets[-1]
+    
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        """
+        Get a summary of the histogram.
+        
+        Returns:
+            Dict with count, mean and p50/p95/p99 estimates in seconds.
+        """
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+        }
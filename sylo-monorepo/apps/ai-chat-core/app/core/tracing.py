@@ -0,0 +1,650 @@
+"""
+Lightweight tracing compatible with OpenTelemetry.
+
+Spans carry W3C trace context (``traceparent``), so traces started by the
+API gateway continue here, and are exported in batches in the OTLP JSON
+span format, either to an OTLP/HTTP collector, to a local JSONL file or to
+memory for tests.
+
+Sampling is decided once per trace from its trace ID and inherited by all
+of its spans, and an upstream sampling decision is respected. Spans of
+unsampled traces are not recorded, so tracing costs little at high RPS.
+"""
+import asyncio
+import json
+import random
+import re
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Mapping, NamedTuple, Optional, Sequence
+from app.core.config import settings
+
+# W3C trace context headers
+TRACEPARENT_HEADER = "traceparent"
+TRACESTATE_HEADER = "tracestate"
+
+# Span kinds, as in OpenTelemetry
+SPAN_KIND_INTERNAL = "internal"
+SPAN_KIND_SERVER = "server"
+SPAN_KIND_CLIENT = "client"
+
+# OTLP numeric values for span kinds and status codes
+_OTLP_KINDS = {SPAN_KIND_INTERNAL: 1, SPAN_KIND_SERVER: 2, SPAN_KIND_CLIENT: 3}
+_OTLP_STATUS = {"UNSET": 0, "OK": 1, "ERROR": 2}
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class SpanContext(NamedTuple):
+    """
+    Identity of a span, as propagated between services.
+    """
+    trace_id: str
+    span_id: str
+    sampled: bool
+    remote: bool = False
+    trace_state: Optional[str] = None
+
+
+def parse_traceparent(value: Optional[str], trace_state: Optional[str] = None) -> Optional[SpanContext]:
+    """
+    Parse a W3C ``traceparent`` header.
+    
+    Args:
+        value: The header value, if present.
+        trace_state: The ``tracestate`` header to carry along, if present.
+    
+    Returns:
+        The remote span context, or None if missing or malformed.
+    """
+    match = _TRACEPARENT.match((value or "").strip().lower())
+    if match is None:
+        return None
+    trace_id, span_id, flags = match.groups()
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return SpanContext(trace_id, span_id, bool(int(flags, 16) & 1), True, trace_state)
+
+
+class Span:
+    """
+    A timed operation within a trace.
+    
+    Spans are created by ``Tracer`` and exported once ended.
+    """
+    
+    __slots__ = (
+        "name", "context", "parent_id", "kind", "start_ns", "end_ns",
+        "attributes", "events", "status", "status_message", "_tracer",
+    )
+    
+    recording = True
+    
+    def __init__(
+        self,
+        tracer: Optional["Tracer"],
+        name: str,
+        context: SpanContext,
+        parent_id: Optional[str] = None,
+        kind: str = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None
+    ):
+        self._tracer = tracer
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes) if attributes else {}
+        self.events: List[Dict[str, Any]] = []
+        self.status = "UNSET"
+        self.status_message: Optional[str] = None
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+    
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+    
+    def set_attributes(self, attributes: Mapping[str, Any]) -> None:
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+    
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> None:
+        self.events.append({
+            "name": name,
+            "time_unix_nano": time.time_ns(),
+            "attributes": attributes or {},
+        })
+    
+    def set_status(self, ok: bool, message: Optional[str] = None) -> None:
+        self.status = "OK" if ok else "ERROR"
+        self.status_message = message
+    
+    def record_exception(self, exception: BaseException) -> None:
+        """
+        Record an exception as an event and mark the span as failed.
+        """
+        self.add_event("exception", {
+            "exception.type": type(exception).__name__,
+            "exception.message": str(exception),
+        })
+        self.set_status(False, str(exception))
+    
+    def end(self) -> None:
+        """
+        End the span and hand it to the tracer for export. Later calls are ignored.
+        """
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if self._tracer is not None:
+            self._tracer._on_end(self)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get the span as a JSON-serializable dict.
+        
+        Returns:
+            Dict with the span's identity, timing, attributes, events and status.
+        """
+        return {
+            "name": self.name,
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_span_id": self.parent_id,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "attributes": self.attributes,
+            "events": self.events,
+            "status": {"code": self.status, "message": self.status_message},
+        }
+
+
+class NonRecordingSpan(Span):
+    """
+    Span of an unsampled trace: carries trace context for propagation but
+    records nothing and is never exported.
+    """
+    
+    __slots__ = ()
+    
+    recording = False
+    
+    def __init__(self, context: SpanContext):
+        self.context = context
+        self.end_ns = None
+    
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+    
+    def set_attributes(self, attributes: Mapping[str, Any]) -> None:
+        pass
+    
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> None:
+        pass
+    
+    def set_status(self, ok: bool, message: Optional[str] = None) -> None:
+        pass
+    
+    def record_exception(self, exception: BaseException) -> None:
+        pass
+    
+    def end(self) -> None:
+        pass
+
+
+# Returned while tracing is disabled
+INVALID_SPAN = NonRecordingSpan(SpanContext("0" * 32, "0" * 16, False))
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class SpanExporter(ABC):
+    """
+    Abstract destination for finished spans.
+    """
+    
+    @abstractmethod
+    async def export(self, spans: List[Span]) -> None:
+        """
+        Export a batch of finished spans.
+        
+        Args:
+            spans: The spans, in the order they ended.
+        """
+        pass
+    
+    async def shutdown(self) -> None:
+        """
+        Release any resources held by the exporter.
+        """
+        pass
+
+
+class InMemorySpanExporter(SpanExporter):
+    """
+    Keeps exported spans in a list, for tests and debugging.
+    """
+    
+    def __init__(self):
+        self.spans: List[Span] = []
+    
+    async def export(self, spans: List[Span]) -> None:
+        self.spans.extend(spans)
+    
+    def clear(self) -> None:
+        self.spans.clear()
+
+
+class FileSpanExporter(SpanExporter):
+    """
+    Appends spans to a JSONL file, one span per line.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+    
+    async def export(self, spans: List[Span]) -> None:
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        await asyncio.get_running_loop().run_in_executor(None, self._append, lines)
+    
+    def _append(self, lines: str) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+class OTLPSpanExporter(SpanExporter):
+    """
+    Sends spans to an OpenTelemetry collector using OTLP/HTTP with JSON encoding.
+    """
+    
+    def __init__(self, endpoint: str, service_name: str, timeout: float = 10.0):
+        import httpx
+        
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self._client = httpx.AsyncClient(timeout=timeout)
+    
+    async def export(self, spans: List[Span]) -> None:
+        response = await self._client.post(self.endpoint, json=self._encode(spans))
+        response.raise_for_status()
+    
+    async def shutdown(self) -> None:
+        await self._client.aclose()
+    
+    def _encode(self, spans: List[Span]) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": self.service_name})},
+                "scopeSpans": [{
+                    "scope": {"name": "ai-chat-core"},
+                    "spans": [_otlp_span(span) for span in spans],
+                }],
+            }]
+        }
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Mapping[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+def _otlp_span(span: Span) -> Dict[str, Any]:
+    encoded = {
+        "traceId": span.context.trace_id,
+        "spanId": span.context.span_id,
+        "name": span.name,
+        "kind": _OTLP_KINDS[span.kind],
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": _otlp_attributes(span.attributes),
+        "events": [
+            {
+                "name": event["name"],
+                "timeUnixNano": str(event["time_unix_nano"]),
+                "attributes": _otlp_attributes(event["attributes"]),
+            }
+            for event in span.events
+        ],
+        "status": {"code": _OTLP_STATUS[span.status], "message": span.status_message or ""},
+    }
+    if span.parent_id:
+        encoded["parentSpanId"] = span.parent_id
+    if span.context.trace_state:
+        encoded["traceState"] = span.context.trace_state
+    return encoded
+
+
+class Tracer:
+    """
+    Creates spans and exports finished ones in batches.
+    
+    The current span is tracked in a context variable, so spans opened with
+    ``span()`` nest across awaits. Finished spans are queued and exported
+    by a background task every ``flush_interval`` seconds or once
+    ``batch_size`` spans are waiting; when the queue is full, new spans are
+    dropped rather than slowing requests down.
+    """
+    
+    def __init__(
+        self,
+        exporter: Optional[SpanExporter] = None,
+        sample_rate: float = 1.0,
+        max_queue_size: int = 2048,
+        batch_size: int = 512,
+        flush_interval: float = 5.0
+    ):
+        """
+        Initialize the tracer.
+        
+        Args:
+            exporter: Where to send finished spans. Tracing is disabled while None.
+            sample_rate: Fraction of new traces to record, between 0 and 1.
+            max_queue_size: Finished spans held before new ones are dropped.
+            batch_size: Spans that trigger an export before the interval.
+            flush_interval: Seconds between exports.
+        """
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.exported = 0
+        self.dropped = 0
+        self.failed_exports = 0
+        self._queue: List[Span] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+    
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+    
+    def set_exporter(self, exporter: Optional[SpanExporter]) -> None:
+        """
+        Replace the exporter, e.g. with an ``InMemorySpanExporter`` in tests.
+        """
+        self.exporter = exporter
+    
+    def current_span(self) -> Optional[Span]:
+        """
+        Get the span active in the current context, if any.
+        """
+        return _current_span.get()
+    
+    def start_span(
+        self,
+        name: str,
+        kind: str = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Optional[SpanContext] = None
+    ) -> Span:
+        """
+        Start a span without making it current. The caller must ``end()`` it.
+        
+        Args:
+            name: The span name.
+            kind: One of the ``SPAN_KIND_*`` constants.
+            attributes: Initial span attributes.
+            parent: The parent context; defaults to the current span.
+        
+        Returns:
+            The span, or a non-recording span if the trace is not sampled.
+        """
+        if not self.enabled:
+            return INVALID_SPAN
+        
+        if parent is None:
+            current = _current_span.get()
+            parent = current.context if current is not None else None
+        
+        if parent is not None and not parent.sampled:
+            # Children of unsampled spans share the parent's context
+            return NonRecordingSpan(parent)
+        
+        if parent is None:
+            trace_id = _new_id(128)
+            sampled = self._sample(trace_id)
+            context = SpanContext(trace_id, _new_id(64), sampled)
+            if not sampled:
+                return NonRecordingSpan(context)
+            return Span(self, name, context, None, kind, attributes)
+        
+        context = SpanContext(parent.trace_id, _new_id(64), True, False, parent.trace_state)
+        return Span(self, name, context, parent.span_id, kind, attributes)
+    
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        kind: str = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Optional[SpanContext] = None
+    ) -> Iterator[Span]:
+        """
+        Run a block in a new current span, recording any exception it raises.
+        
+        Args:
+            name: The span name.
+            kind: One of the ``SPAN_KIND_*`` constants.
+            attributes: Initial span attributes.
+            parent: The parent context; defaults to the current span.
+        
+        Yields:
+            The span.
+        """
+        if not self.enabled:
+            yield INVALID_SPAN
+            return
+        
+        span = self.start_span(name, kind, attributes, parent)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            if not isinstance(e, (GeneratorExit, asyncio.CancelledError)):
+                span.record_exception(e)
+            raise
+        finally:
+            span.end()
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # An async generator closed from another context
+                pass
+    
+    def start(self) -> None:
+        """
+        Start the background export loop. Safe to call more than once.
+        """
+        if not self.enabled or (self._task is not None and not self._task.done()):
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self) -> None:
+        """
+        Stop the export loop, export queued spans and shut the exporter down.
+        
+        The loop is asked to exit rather than cancelled, so an export already
+        in progress completes before the remaining spans are flushed.
+        """
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        
+        await self.flush()
+        if self.exporter is not None:
+            await self.exporter.shutdown()
+    
+    async def flush(self) -> None:
+        """
+        Export every queued span now.
+        
+        If the flush is cancelled, the batch being exported is put back in
+        the queue.
+        """
+        while self._queue and self.exporter is not None:
+            batch, self._queue = self._queue[:self.batch_size], self._queue[self.batch_size:]
+            try:
+                await self.exporter.export(batch)
+                self.exported += len(batch)
+            except asyncio.CancelledError:
+                self._queue[:0] = batch
+                raise
+            except Exception as e:
+                self.failed_exports += 1
+                self.dropped += len(batch)
+                print(f"Error exporting spans: {str(e)}")
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get tracing counters.
+        
+        Returns:
+            Dict with whether tracing is enabled, the sample rate, and queued,
+            exported and dropped spans.
+        """
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "queued": len(self._queue),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "failed_exports": self.failed_exports,
+        }
+    
+    def _sample(self, trace_id: str) -> bool:
+        # Decide from the trace ID, so every service sampling at the same rate agrees
+        return int(trace_id[16:], 16) < self.sample_rate * (1 << 64)
+    
+    def _on_end(self, span: Span) -> None:
+        if len(self._queue) >= self.max_queue_size:
+            self.dropped += 1
+            return
+        self._queue.append(span)
+        if len(self._queue) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+    
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if not self._stopping:
+                await self.flush()
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+# Exporter factories by name, selected with TRACING_EXPORTER
+SPAN_EXPORTERS: Dict[str, Callable[[], SpanExporter]] = {
+    "memory": InMemorySpanExporter,
+    "file": lambda: FileSpanExporter(settings.tracing_file_path),
+    "otlp": lambda: OTLPSpanExporter(settings.tracing_otlp_endpoint, settings.tracing_service_name),
+}
+
+
+def register_exporter(name: str, factory: Callable[[], SpanExporter]) -> None:
+    """
+    Register an exporter factory so it can be selected with TRACING_EXPORTER.
+    
+    Args:
+        name: The exporter name.
+        factory: Builds the exporter.
+    """
+    SPAN_EXPORTERS[name] = factory
+
+
+def _build_exporter() -> Optional[SpanExporter]:
+    if not settings.enable_tracing:
+        return None
+    factory = SPAN_EXPORTERS.get(settings.tracing_exporter)
+    if factory is None:
+        print(f"Warning: Unknown TRACING_EXPORTER '{settings.tracing_exporter}'. Tracing is disabled.")
+        return None
+    return factory()
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware opening a server span per HTTP request.
+    
+    The span continues the caller's trace when a ``traceparent`` header is
+    present and is named after the matched route template.
+    """
+    
+    def __init__(self, app: Callable, exclude_paths: Sequence[str] = ("/metrics", "/health")):
+        self.app = app
+        self.exclude_paths = set(exclude_paths)
+    
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if (
+            scope["type"] != "http"
+            or not tracer.enabled
+            or scope.get("path") in self.exclude_paths
+        ):
+            await self.app(scope, receive, send)
+            return
+        
+        headers = {}
+        for key, value in scope.get("headers", []):
+            if key in (b"traceparent", b"tracestate"):
+                headers[key.decode("latin-1")] = value.decode("latin-1")
+        parent = parse_traceparent(headers.get(TRACEPARENT_HEADER), headers.get(TRACESTATE_HEADER))
+        
+        method = scope.get("method", "")
+        with tracer.span(method, SPAN_KIND_SERVER, parent=parent) as span:
+            span.set_attributes({
+                "http.request.method": method,
+                "url.path": scope.get("path"),
+            })
+            
+            async def send_wrapper(message: Dict[str, Any]) -> None:
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    span.set_attribute("http.response.status_code", status)
+                    if status >= 500:
+                        span.set_status(False)
+                await send(message)
+            
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route and span.recording:
+                    span.name = f"{method} {route}"
+                    span.set_attribute("http.route", route)
+
+
+# Create a global instance
+tracer = Tracer(
+    exporter=_build_exporter(),
+    sample_rate=settings.tracing_sample_rate,
+    max_queue_size=settings.tracing_max_queue_size,
+    batch_size=settings.tracing_batch_size,
+    flush_interval=settings.tracing_flush_interval
+)
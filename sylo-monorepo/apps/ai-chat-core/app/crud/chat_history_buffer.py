@@ -0,0 +1,284 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from app.core.config import settings
+from app.db.supabase_client import supabase_admin, execute_query
+
+# PostgREST codes for failing to reach the database (PGRST000-PGRST003)
+PGRST_CONNECTION_ERROR_PREFIX = "PGRST0"
+
+
+def _is_row_error(error: Exception) -> bool:
+    """
+    Check whether the database rejected the rows themselves.
+    
+    Row errors carry a Postgres SQLSTATE or a PostgREST request error code;
+    timeouts and connection failures don't, and are worth retrying as-is.
+    """
+    code = getattr(error, "code", None)
+    return isinstance(code, str) and not code.startswith(PGRST_CONNECTION_ERROR_PREFIX)
+
+
+class _PendingRow:
+    """
+    A row waiting to be written, with the future that reports its durability.
+    """
+    
+    __slots__ = ("row", "session_key", "future", "attempts")
+    
+    def __init__(self, row: Dict[str, Any], session_key: str, future: asyncio.Future):
+        self.row = row
+        self.session_key = session_key
+        self.future = future
+        self.attempts = 0
+
+
+class ChatHistoryWriteBuffer:
+    """
+    Write-behind buffer that batches chat history inserts.
+    
+    Rows from all requests are collected in memory and written as bulk
+    inserts once ``batch_size`` rows are pending or ``flush_interval``
+    seconds have passed, whichever comes first. Callers that need their
+    writes to be durable can wait on a session with ``wait_for_session``.
+    
+    Inserts skip rows whose ID already exists, so a batch that was committed
+    but timed out on the client can be retried safely. A batch the database
+    rejects is split until the bad rows are isolated, so they don't fail
+    other users' rows. At most ``max_pending`` rows are held; past that the
+    oldest are dropped, so a database outage can't grow memory unbounded.
+    
+    ``on_written`` is awaited with the rows of each batch once they are
+    durable, e.g. to tell other replicas to reload the affected sessions.
+    """
+    
+    def __init__(
+        self,
+        table_name: str,
+        batch_size: int = settings.chat_history_flush_batch_size,
+        flush_interval: float = settings.chat_history_flush_interval,
+        max_retries: int = settings.chat_history_flush_max_retries,
+        max_pending: int = settings.chat_history_buffer_max_rows,
+        on_written: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None
+    ):
+        self.table_name = table_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.max_pending = max_pending
+        self.on_written = on_written
+        
+        self._pending: List[_PendingRow] = []
+        self._session_futures: Dict[str, Set[asyncio.Future]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+    
+    def start(self) -> None:
+        """
+        Start the background flush loop. Safe to call more than once.
+        """
+        if self._task is not None and not self._task.done():
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self) -> None:
+        """
+        Stop the background loop and flush everything still pending.
+        
+        The loop is asked to exit rather than cancelled, so a flush already
+        in progress finishes its writes before the buffer is drained.
+        """
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        
+        # Drain the buffer, retrying failed batches up to max_retries
+        while self._pending:
+            await self.flush()
+    
+    def enqueue(self, row: Dict[str, Any], session_id: Any) -> asyncio.Future:
+        """
+        Add a row to the buffer.
+        
+        Args:
+            row: The JSON-serializable row to insert.
+            session_id: The session the row belongs to.
+        
+        Returns:
+            A future that resolves once the row has been written.
+        """
+        self.start()
+        
+        future = asyncio.get_running_loop().create_future()
+        # Mark failures as retrieved so unawaited futures don't log warnings
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        
+        session_key = str(session_id)
+        self._pending.append(_PendingRow(row, session_key, future))
+        self._session_futures.setdefault(session_key, set()).add(future)
+        
+        # Shed the oldest rows (retries first in line) once the buffer is full
+        overflow = len(self._pending) - self.max_pending
+        if overflow > 0:
+            print(f"Chat history buffer full, dropping {overflow} rows")
+            error = RuntimeError("Chat history buffer full; row dropped")
+            for item in self._pending[:overflow]:
+                self._resolve(item, error)
+            del self._pending[:overflow]
+        
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        
+        return future
+    
+    def has_pending(self, session_id: Any) -> bool:
+        """
+        Check whether a session has writes that are not yet durable.
+        
+        Args:
+            session_id: The ID of the session.
+        
+        Returns:
+            True if any rows for the session are still buffered.
+        """
+        return bool(self._session_futures.get(str(session_id)))
+    
+    async def wait_for_session(self, session_id: Any) -> None:
+        """
+        Wait until every buffered row for a session has been written.
+        
+        Triggers an immediate flush rather than waiting for the interval.
+        Rows that are given up on are logged by the flush and don't fail
+        the caller, which only needs the session's writes to have settled.
+        
+        Args:
+            session_id: The ID of the session.
+        """
+        futures = list(self._session_futures.get(str(session_id), ()))
+        if not futures:
+            return
+        self._wakeup.set()
+        await asyncio.gather(*futures, return_exceptions=True)
+    
+    async def flush(self) -> None:
+        """
+        Write all currently pending rows as bulk inserts.
+        
+        If the flush is cancelled, the rows it had not finished writing are
+        put back in the buffer; rewriting any that did commit is harmless.
+        """
+        async with self._flush_lock:
+            batches = []
+            while self._pending:
+                batches.append(self._pending[:self.batch_size])
+                del self._pending[:self.batch_size]
+            
+            for index, batch in enumerate(batches):
+                try:
+                    await self._write_batch(batch)
+                except asyncio.CancelledError:
+                    # Skip rows already resolved or requeued for retry
+                    requeued = {id(item) for item in self._pending}
+                    unwritten = [
+                        item
+                        for remaining in batches[index:]
+                        for item in remaining
+                        if not item.future.done() and id(item) not in requeued
+                    ]
+                    self._pending[:0] = unwritten
+                    raise
+    
+    async def _write_batch(self, batch: List[_PendingRow]) -> None:
+        """
+        Insert one batch, resolving or requeueing its rows.
+        
+        Args:
+            batch: The rows to insert.
+        """
+        try:
+            await execute_query(
+                supabase_admin.table(self.table_name).upsert(
+                    [item.row for item in batch],
+                    on_conflict="id",
+                    ignore_duplicates=True
+                )
+            )
+        except Exception as e:
+            if _is_row_error(e):
+                # Split the batch so the rows the database rejects fail alone;
+                # retrying a rejected row won't help
+                if len(batch) > 1:
+                    middle = len(batch) // 2
+                    await self._write_batch(batch[:middle])
+                    await self._write_batch(batch[middle:])
+                else:
+                    print(f"Error writing chat history row: {str(e)}")
+                    self._resolve(batch[0], e)
+                return
+            
+            print(f"Error writing chat history batch of {len(batch)} rows: {str(e)}")
+            retry = []
+            for item in batch:
+                item.attempts += 1
+                if item.attempts < self.max_retries:
+                    retry.append(item)
+                else:
+                    self._resolve(item, e)
+            # Retry on the next flush, ahead of newer rows
+            self._pending[:0] = retry
+            return
+        
+        for item in batch:
+            self._resolve(item)
+        
+        if self.on_written is not None:
+            try:
+                await self.on_written([item.row for item in batch])
+            except Exception as e:
+                print(f"Error handling written chat history rows: {str(e)}")
+    
+    def _resolve(self, item: _PendingRow, error: Optional[Exception] = None) -> None:
+        """
+        Complete a row's future and drop it from the session index.
+        
+        Args:
+            item: The pending row.
+            error: The write error, if the row was given up on.
+        """
+        if not item.future.done():
+            if error is None:
+                item.future.set_result(None)
+            else:
+                item.future.set_exception(error)
+        
+        futures = self._session_futures.get(item.session_key)
+        if futures is not None:
+            futures.discard(item.future)
+            if not futures:
+                del self._session_futures[item.session_key]
+    
+    async def _run(self) -> None:
+        """
+        Flush on the size threshold or the time interval, whichever comes first.
+        """
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            
+            if self._pending and not self._stopping:
+                try:
+                    await self.flush()
+                except Exception as e:
+                    print(f"Error flushing chat history buffer: {str(e)}")
@@ -1,10 +1,74 @@
-from typing import List, Optional, Dict, Any
+import base64
+import json
+import re
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple
 from uuid import UUID, uuid4
 from datetime import datetime
-from app.db.supabase_client import supabase, supabase_admin
-from app.models.chat import ChatHistoryEntry
+from app.core.config import settings
+from app.core.invalidation import invalidation_bus
+from app.core.metrics import instrument_repository
+from app.db.supabase_client import supabase, supabase_admin, execute_query
+from app.crud.chat_history_buffer import ChatHistoryWriteBuffer
+from app.crud.session_cache import SessionHistoryCache
+from app.models.chat import ChatHistoryEntry, ChatHistoryItem, ChatHistoryPage
 
+# Invalidation channel published with a session cache key once rows written
+# to the session are durable, so other replicas reload its context window
+CHAT_HISTORY_CHANNEL = "chat_history"
 
+# Columns returned by the paginated history and export endpoints
+HISTORY_PAGE_COLUMNS = "id,role,content,model,created_at"
+
+# Timestamps as PostgREST returns them; fractional digits and offset format vary
+_CURSOR_TIMESTAMP = re.compile(
+    r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(\.\d{1,6})?(Z|[+-]\d{2}(:?\d{2})?)?"
+)
+
+
+def encode_history_cursor(created_at: str, entry_id: str) -> str:
+    """
+    Build an opaque cursor pointing just past a (timestamp, id) ordered row.
+    
+    Also used for the session index, keyed on last_message_at.
+    
+    Args:
+        created_at: The row's timestamp sort key, as returned by Supabase.
+        entry_id: The row's ID.
+    
+    Returns:
+        A URL-safe cursor string.
+    """
+    raw = json.dumps([created_at, entry_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_history_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    Read the (created_at, id) position stored in a cursor.
+    
+    Args:
+        cursor: A cursor from ``encode_history_cursor``.
+    
+    Returns:
+        The created_at timestamp and row ID.
+    
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, entry_id = json.loads(raw)
+        # Validate both parts, since they end up in a PostgREST filter. The
+        # timestamp is passed through as-is: datetime.fromisoformat rejects
+        # some PostgREST output before Python 3.11
+        if not isinstance(created_at, str) or not _CURSOR_TIMESTAMP.fullmatch(created_at):
+            raise ValueError(created_at)
+        return created_at, str(UUID(entry_id))
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid history cursor") from e
+
+
+@instrument_repository("chat_history")
 class ChatHistoryRepository:
     """
     Repository for managing chat history in Supabase.
@@ -12,33 +76,73 @@ class ChatHistoryRepository:
     
     def __init__(self):
         self.table_name = "chat_history"
+        self.write_buffer = ChatHistoryWriteBuffer(self.table_name, on_written=self._publish_written)
+        self.session_cache = SessionHistoryCache()
+        invalidation_bus.subscribe(CHAT_HISTORY_CHANNEL, self.session_cache.evict)
     
-    async def create_entry(self, entry: ChatHistoryEntry) -> ChatHistoryEntry:
+    @staticmethod
+    def _session_key(user_id: UUID, session_id: UUID) -> str:
         """
-        Create a new chat history entry.
+        Build the session cache key. Includes the user so sessions stay user-scoped.
+        """
+        return f"{user_id}:{session_id}"
+    
+    async def _publish_written(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Tell other replicas to drop their cached windows of written sessions.
+        
+        This replica's window was already appended to in place, so only the
+        others are notified. They reload from Supabase, where the rows now are.
         
         Args:
-            entry: The chat history entry to create.
-            
+            rows: The rows just written.
+        """
+        keys = {self._session_key(row["user_id"], row["session_id"]) for row in rows}
+        for key in keys:
+            await invalidation_bus.publish(CHAT_HISTORY_CHANNEL, key, local=False)
+    
+    def _to_row(self, entry: ChatHistoryEntry) -> Dict[str, Any]:
+        """
+        Prepare an entry for insertion, filling in its ID and timestamp.
+        
+        Args:
+            entry: The chat history entry (updated in place).
+        
         Returns:
-            The created chat history entry with ID.
+            A JSON-serializable row for Supabase.
         """
         # Generate UUID if not provided
         if not entry.id:
             entry.id = uuid4()
-            
+        
         # Set created_at if not provided
         if not entry.created_at:
             entry.created_at = datetime.now()
-            
+        
         # Convert to dict for Supabase
         entry_dict = entry.dict()
+        for key in ("id", "user_id", "session_id"):
+            entry_dict[key] = str(entry_dict[key])
         
         # Convert datetime to ISO format string for Supabase
         entry_dict["created_at"] = entry_dict["created_at"].isoformat()
         
+        return entry_dict
+    
+    async def create_entry(self, entry: ChatHistoryEntry) -> ChatHistoryEntry:
+        """
+        Create a new chat history entry.
+        
+        Args:
+            entry: The chat history entry to create.
+        
+        Returns:
+            The created chat history entry with ID.
+        """
+        entry_dict = self._to_row(entry)
+        
         # Insert into Supabase
-        response = supabase_admin.table(self.table_name).insert(entry_dict).execute()
+        response = await execute_query(supabase_admin.table(self.table_name).insert(entry_dict))
         
         if response.data:
             # Update the entry with the returned data
@@ -47,6 +151,39 @@ class ChatHistoryRepository:
             # If no data returned, return the original entry
             return entry
     
+    def enqueue_entry(self, entry: ChatHistoryEntry) -> ChatHistoryEntry:
+        """
+        Queue a chat history entry for a batched write-behind insert.
+        
+        The entry is returned immediately with its ID and timestamp set. Use
+        ``wait_for_session_writes`` when the write must be durable.
+        
+        Args:
+            entry: The chat history entry to create.
+        
+        Returns:
+            The entry with ID and created_at filled in.
+        """
+        self.write_buffer.enqueue(self._to_row(entry), entry.session_id)
+        
+        # Keep the cached context window in step with the write
+        metadata = entry.metadata or {}
+        if not metadata.get("session_start"):
+            self.session_cache.append(
+                self._session_key(entry.user_id, entry.session_id),
+                (entry.role, entry.content, dict(metadata.get("token_counts") or {}))
+            )
+        return entry
+    
+    async def wait_for_session_writes(self, session_id: UUID) -> None:
+        """
+        Wait until all queued entries for a session have been written.
+        
+        Args:
+            session_id: The ID of the session.
+        """
+        await self.write_buffer.wait_for_session(session_id)
+    
     async def get_session_history(
         self, 
         user_id: UUID, 
@@ -62,10 +199,13 @@ class ChatHistoryRepository:
             session_id: The ID of the session.
             limit: Maximum number of entries to return.
             order: Sort order ("asc" or "desc").
-            
+        
         Returns:
             List of chat history entries.
         """
+        # Make sure buffered writes for this session are visible
+        await self.wait_for_session_writes(session_id)
+        
         # Query Supabase
         query = (
             supabase.table(self.table_name)
@@ -76,7 +216,7 @@ class ChatHistoryRepository:
             .limit(limit)
         )
         
-        response = query.execute()
+        response = await execute_query(query)
         
         if response.data:
             # Convert to ChatHistoryEntry objects
@@ -84,6 +224,185 @@ class ChatHistoryRepository:
         else:
             return []
     
+    async def get_context_messages(
+        self,
+        user_id: UUID,
+        session_id: UUID,
+        limit: int = 50
+    ) -> List[Dict[str, str]]:
+        """
+        Get the most recent messages of a session for use as model context.
+        
+        Served from the in-memory session cache when possible; on a miss the
+        window is loaded from Supabase and cached. Session start markers are
+        excluded. Each message carries the ``token_counts`` stored with its
+        row; the dict is shared with the cache so counts computed later are
+        kept for the next turn.
+        
+        Args:
+            user_id: The ID of the user.
+            session_id: The ID of the session.
+            limit: Maximum number of messages to return.
+        
+        Returns:
+            List of message dicts with role, content and token_counts, oldest first.
+        """
+        key = self._session_key(user_id, session_id)
+        cached = self.session_cache.get(key, limit)
+        
+        if cached is None:
+            # Make sure buffered writes for this session are visible
+            await self.wait_for_session_writes(session_id)
+            
+            # Load the newest rows, selecting only the columns we need
+            query = (
+                supabase.table(self.table_name)
+                .select("role,content,metadata")
+                .eq("user_id", str(user_id))
+                .eq("session_id", str(session_id))
+                .order("created_at", desc=True)
+                .limit(max(limit, self.session_cache.max_messages))
+            )
+            
+            # Messages written while the query runs would be missing from its rows
+            generation = self.session_cache.begin_load(key)
+            try:
+                response = await execute_query(query)
+            finally:
+                current = self.session_cache.end_load(key, generation)
+            
+            cached = []
+            for row in reversed(response.data or []):
+                metadata = row.get("metadata") or {}
+                if metadata.get("session_start"):
+                    continue
+                cached.append((row["role"], row["content"], dict(metadata.get("token_counts") or {})))
+            if current:
+                self.session_cache.fill(key, cached)
+            cached = cached[-limit:]
+        
+        return [
+            {"role": role, "content": content, "token_counts": token_counts}
+            for role, content, token_counts in cached
+        ]
+    
+    async def get_session_page(
+        self,
+        user_id: UUID,
+        session_id: UUID,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        order: str = "asc"
+    ) -> ChatHistoryPage:
+        """
+        Get one page of a session's messages using keyset pagination.
+        
+        Rows are ordered by (created_at, id) and each page continues from the
+        last row of the previous one, so every page costs the same however
+        deep into the session it is. Only the columns in
+        ``HISTORY_PAGE_COLUMNS`` are selected, and session start markers are
+        excluded.
+        
+        Args:
+            user_id: The ID of the user.
+            session_id: The ID of the session.
+            limit: Maximum number of messages to return.
+            cursor: The ``next_cursor`` of the previous page, if any.
+            order: "asc" for oldest first, "desc" for newest first.
+        
+        Returns:
+            The page, with a cursor for the next one if more rows remain.
+        
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        # Make sure buffered writes for this session are visible
+        await self.wait_for_session_writes(session_id)
+        
+        rows = await self._fetch_page(user_id, session_id, limit + 1, cursor, order)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        next_cursor = None
+        if has_more:
+            next_cursor = encode_history_cursor(rows[-1]["created_at"], rows[-1]["id"])
+        return ChatHistoryPage(
+            items=[ChatHistoryItem(**row) for row in rows],
+            next_cursor=next_cursor,
+            has_more=has_more
+        )
+    
+    async def iter_session_rows(
+        self,
+        user_id: UUID,
+        session_id: UUID,
+        page_size: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate over all of a session's messages, oldest first.
+        
+        Rows are read one keyset page at a time, so memory use does not grow
+        with the length of the session.
+        
+        Args:
+            user_id: The ID of the user.
+            session_id: The ID of the session.
+            page_size: Rows read per query (defaults to settings.chat_history_export_page_size).
+        
+        Yields:
+            Raw rows with the columns in ``HISTORY_PAGE_COLUMNS``.
+        """
+        page_size = page_size or settings.chat_history_export_page_size
+        await self.wait_for_session_writes(session_id)
+        
+        cursor = None
+        while True:
+            rows = await self._fetch_page(user_id, session_id, page_size, cursor, "asc")
+            for row in rows:
+                yield row
+            if len(rows) < page_size:
+                return
+            cursor = encode_history_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    
+    async def _fetch_page(
+        self,
+        user_id: UUID,
+        session_id: UUID,
+        limit: int,
+        cursor: Optional[str],
+        order: str
+    ) -> List[Dict[str, Any]]:
+        """
+        Read up to ``limit`` rows after a cursor position.
+        """
+        descending = order == "desc"
+        query = (
+            supabase.table(self.table_name)
+            .select(HISTORY_PAGE_COLUMNS)
+            .eq("user_id", str(user_id))
+            .eq("session_id", str(session_id))
+            .is_("metadata->>session_start", "null")
+        )
+        
+        if cursor:
+            created_at, entry_id = decode_history_cursor(cursor)
+            op = "lt" if descending else "gt"
+            # Row comparison (created_at, id) > cursor, spelled out for PostgREST
+            query = query.or_(
+                f'created_at.{op}."{created_at}",'
+                f'and(created_at.eq."{created_at}",id.{op}.{entry_id})'
+            )
+        
+        query = (
+            query
+            .order("created_at", desc=descending)
+            .order("id", desc=descending)
+            .limit(limit)
+        )
+        
+        response = await execute_query(query)
+        return response.data or []
+    
     async def get_recent_history(
         self, 
         user_id: UUID, 
@@ -95,7 +414,7 @@ class ChatHistoryRepository:
         Args:
             user_id: The ID of the user.
             limit: Maximum number of entries to return.
-            
+        
         Returns:
             List of chat history entries.
         """
@@ -108,7 +427,7 @@ class ChatHistoryRepository:
             .limit(limit)
         )
         
-        response = query.execute()
+        response = await execute_query(query)
         
         if response.data:
             # Convert to ChatHistoryEntry objects
@@ -122,7 +441,7 @@ class ChatHistoryRepository:
         
         Args:
             user_id: The ID of the user.
-            
+        
         Returns:
             The ID of the new session.
         """
@@ -137,7 +456,10 @@ class ChatHistoryRepository:
             metadata={"session_start": True}
         )
         
-        await self.create_entry(entry)
+        self.enqueue_entry(entry)
+        
+        # A new session has no history, so its first turn needs no read
+        self.session_cache.fill(self._session_key(user_id, session_id), [])
         
         return session_id
     
@@ -148,19 +470,24 @@ class ChatHistoryRepository:
         Args:
             user_id: The ID of the user.
             session_id: The ID of the session to delete.
-            
+        
         Returns:
             True if successful, False otherwise.
         """
+        # Flush buffered writes first so they can't recreate deleted rows
+        await self.wait_for_session_writes(session_id)
+        
         # Delete from Supabase
-        response = (
+        response = await execute_query(
             supabase_admin.table(self.table_name)
             .delete()
             .eq("user_id", str(user_id))
             .eq("session_id", str(session_id))
-            .execute()
         )
         
+        # Drop the cached window here and on other replicas
+        await invalidation_bus.publish(CHAT_HISTORY_CHANNEL, self._session_key(user_id, session_id))
+        
         # Check if deletion was successful
         return response.data is not None
 
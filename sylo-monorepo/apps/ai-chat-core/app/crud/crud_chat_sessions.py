@@ -0,0 +1,86 @@
+from typing import Optional
+from uuid import UUID
+from app.core.metrics import instrument_repository
+from app.db.supabase_client import supabase, execute_query
+from app.crud.crud_chat_history import encode_history_cursor, decode_history_cursor
+from app.models.chat import ChatSessionPage, ChatSessionSummary
+
+# Columns returned by the session list endpoint
+SESSION_LIST_COLUMNS = "id,title,message_count,last_model,created_at,last_message_at"
+
+
+@instrument_repository("chat_sessions")
+class ChatSessionRepository:
+    """
+    Repository for the chat session index in Supabase.
+    
+    Rows are maintained by triggers on ``chat_history`` (see
+    ``migrations/20261018_chat_sessions.sql``), so this repository only reads.
+    """
+    
+    def __init__(self):
+        self.table_name = "chat_sessions"
+    
+    async def list_sessions(
+        self,
+        user_id: UUID,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> ChatSessionPage:
+        """
+        Get one page of a user's sessions, most recently active first.
+        
+        Pages are keyed on (last_message_at, id), so each costs one index
+        range read however many sessions or messages the user has. A session
+        that becomes active while a client is paging moves to the front and
+        is not repeated on later pages. Messages still in the write-behind
+        buffer are reflected once they are flushed.
+        
+        Args:
+            user_id: The ID of the user.
+            limit: Maximum number of sessions to return.
+            cursor: The ``next_cursor`` of the previous page, if any.
+        
+        Returns:
+            The page, with a cursor for the next one if more sessions remain.
+        
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        query = (
+            supabase.table(self.table_name)
+            .select(SESSION_LIST_COLUMNS)
+            .eq("user_id", str(user_id))
+        )
+        
+        if cursor:
+            last_message_at, session_id = decode_history_cursor(cursor)
+            query = query.or_(
+                f'last_message_at.lt."{last_message_at}",'
+                f'and(last_message_at.eq."{last_message_at}",id.lt.{session_id})'
+            )
+        
+        query = (
+            query
+            .order("last_message_at", desc=True)
+            .order("id", desc=True)
+            .limit(limit + 1)
+        )
+        
+        response = await execute_query(query)
+        rows = response.data or []
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        next_cursor = None
+        if has_more:
+            next_cursor = encode_history_cursor(rows[-1]["last_message_at"], rows[-1]["id"])
+        return ChatSessionPage(
+            items=[ChatSessionSummary(**row) for row in rows],
+            next_cursor=next_cursor,
+            has_more=has_more
+        )
+
+
+# Create a global instance
+chat_session_repository = ChatSessionRepository()
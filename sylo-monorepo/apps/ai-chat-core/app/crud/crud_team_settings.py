@@ -1,52 +1,169 @@
-from typing import List, Optional
+import asyncio
+from typing import Any, Dict, List, Optional, Set
 from uuid import UUID
 from datetime import datetime
 
 from app.models.team import TeamSettings, TeamSettingsUpdateRequest, Team
-from app.db.supabase_client import get_supabase_client
+from app.core.cache import TTLCache
+from app.core.config import settings as app_settings
+from app.core.invalidation import invalidation_bus
+from app.core.metrics import instrument_repository_function
+from app.db.supabase_client import supabase, execute_query
 
+# Invalidation channel published with the team ID when a team's settings change
+TEAM_SETTINGS_CHANNEL = "team_settings"
 
-async def get_teams_for_user(user_id: UUID) -> List[Team]:
+# Invalidation channels for membership, keyed by user ID and team ID; the
+# migration's triggers NOTIFY on them when teams or team_members change
+TEAM_MEMBERS_CHANNEL = "team_members"
+TEAMS_CHANNEL = "teams"
+
+# Function returning the teams a user owns or belongs to (see migrations/)
+TEAMS_FOR_USER_RPC = "get_teams_for_user"
+
+# PostgREST error code for a function missing from the schema cache
+PGRST_FUNCTION_NOT_FOUND = "PGRST202"
+
+# Team ID -> users whose cached teams include it, for invalidation. Only
+# holds users currently in _membership_cache, so it is bounded by its size
+_team_users: Dict[str, Set[str]] = {}
+
+
+def _unindex_user_teams(user_id: str, teams: List[Team]) -> None:
+    """
+    Drop a user leaving the membership cache from the team index.
+    """
+    for team in teams:
+        users = _team_users.get(str(team.id))
+        if users is not None:
+            users.discard(user_id)
+            if not users:
+                del _team_users[str(team.id)]
+
+
+# User ID -> teams, kept in memory since membership rarely changes
+_membership_cache = TTLCache(
+    maxsize=app_settings.team_membership_cache_size,
+    ttl=app_settings.team_membership_cache_ttl,
+    on_evict=_unindex_user_teams
+)
+
+# Cleared if the RPC hasn't been migrated, to use the multi-query fallback
+_rpc_available = True
+
+
+def _to_team(team: Dict[str, Any]) -> Team:
+    """
+    Convert a ``teams`` row to a Team.
+    """
+    return Team(
+        id=UUID(team["id"]),
+        name=team["name"],
+        description=team.get("description"),
+        created_at=datetime.fromisoformat(team["created_at"]) if team.get("created_at") else None,
+        updated_at=datetime.fromisoformat(team["updated_at"]) if team.get("updated_at") else None,
+        owner_id=UUID(team["owner_id"]),
+        members=team.get("members")
+    )
+
+
+def invalidate_user_teams(user_id: str) -> None:
+    """
+    Drop a user's cached team memberships.
+    
+    Args:
+        user_id: The ID of the user, as a string.
+    """
+    _membership_cache.invalidate(user_id)
+
+
+def invalidate_team(team_id: str) -> None:
+    """
+    Drop the cached team memberships of every user of a team.
+    
+    Args:
+        team_id: The ID of the team, as a string.
+    """
+    for user_id in _team_users.pop(team_id, ()):
+        _membership_cache.invalidate(user_id)
+
+
+def membership_cache_stats() -> Dict[str, Any]:
+    """
+    Get hit/miss counters for the team membership cache.
+    
+    Returns:
+        Dict of cache statistics.
     """
-    Get all teams that a user is a member of.
+    return {**_membership_cache.stats(), "rpc_available": _rpc_available}
+
+
+invalidation_bus.subscribe(TEAM_MEMBERS_CHANNEL, invalidate_user_teams)
+invalidation_bus.subscribe(TEAMS_CHANNEL, invalidate_team)
+
+
+async def _fetch_teams_for_user(user_id: UUID) -> List[Dict[str, Any]]:
     """
-    supabase = get_supabase_client()
+    Fetch the ``teams`` rows a user owns or belongs to.
     
-    # First get teams where user is the owner
-    owner_response = supabase.table("teams").select("*").eq("owner_id", str(user_id)).execute()
+    Uses the ``get_teams_for_user`` function, one round trip. Until that
+    migration is applied, falls back to querying owned teams and
+    memberships concurrently and then the member teams.
+    """
+    global _rpc_available
     
-    # Then get teams where user is a member
-    member_response = supabase.table("team_members").select("team_id").eq("user_id", str(user_id)).execute()
+    if _rpc_available:
+        try:
+            response = await execute_query(supabase.rpc(TEAMS_FOR_USER_RPC, {"p_user_id": str(user_id)}))
+            return response.data or []
+        except Exception as e:
+            if getattr(e, "code", None) != PGRST_FUNCTION_NOT_FOUND:
+                raise
+            print(f"Warning: {TEAMS_FOR_USER_RPC} is not installed; apply the team membership migration. "
+                  "Falling back to separate team queries.")
+            _rpc_available = False
     
-    team_ids = [member["team_id"] for member in member_response.data]
+    owner_response, member_response = await asyncio.gather(
+        execute_query(supabase.table("teams").select("*").eq("owner_id", str(user_id))),
+        execute_query(supabase.table("team_members").select("team_id").eq("user_id", str(user_id)))
+    )
     
-    # If user is a member of any teams, get those teams
-    teams = owner_response.data
+    teams = owner_response.data or []
+    owned = {team["id"] for team in teams}
+    team_ids = [member["team_id"] for member in member_response.data or [] if member["team_id"] not in owned]
     if team_ids:
-        member_teams_response = supabase.table("teams").select("*").in_("id", team_ids).execute()
-        teams.extend(member_teams_response.data)
-    
-    # Convert to Team objects
-    return [
-        Team(
-            id=UUID(team["id"]),
-            name=team["name"],
-            description=team.get("description"),
-            created_at=datetime.fromisoformat(team["created_at"]) if team.get("created_at") else None,
-            updated_at=datetime.fromisoformat(team["updated_at"]) if team.get("updated_at") else None,
-            owner_id=UUID(team["owner_id"]),
-            members=team.get("members")
-        )
-        for team in teams
-    ]
+        member_teams_response = await execute_query(supabase.table("teams").select("*").in_("id", team_ids))
+        teams.extend(member_teams_response.data or [])
+    return teams
 
 
+@instrument_repository_function("team_settings")
+async def get_teams_for_user(user_id: UUID) -> List[Team]:
+    """
+    Get all teams that a user owns or is a member of.
+    
+    Served from the in-process membership index when possible; on a miss
+    the teams are loaded in one round trip. Cached lists are shared, so
+    callers must not mutate them.
+    """
+    key = str(user_id)
+    cached = _membership_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    teams = [_to_team(team) for team in await _fetch_teams_for_user(user_id)]
+    _membership_cache.set(key, teams)
+    for team in teams:
+        _team_users.setdefault(str(team.id), set()).add(key)
+    return teams
+
+
+@instrument_repository_function("team_settings")
 async def get_team_settings(team_id: UUID) -> Optional[TeamSettings]:
     """
     Get settings for a specific team.
     """
-    supabase = get_supabase_client()
-    response = supabase.table("team_settings").select("*").eq("team_id", str(team_id)).execute()
+    response = await execute_query(supabase.table("team_settings").select("*").eq("team_id", str(team_id)))
     
     if not response.data:
         return None
@@ -69,12 +186,11 @@ async def get_team_settings(team_id: UUID) -> Optional[TeamSettings]:
     )
 
 
+@instrument_repository_function("team_settings")
 async def create_team_settings(request: TeamSettingsUpdateRequest) -> TeamSettings:
     """
     Create settings for a specific team.
     """
-    supabase = get_supabase_client()
-    
     # Check if settings already exist
     existing = await get_team_settings(request.team_id)
     if existing:
@@ -107,11 +223,14 @@ async def create_team_settings(request: TeamSettingsUpdateRequest) -> TeamSettin
         settings_data["enforce_team_settings"] = request.enforce_team_settings
     
     # Insert into database
-    response = supabase.table("team_settings").insert(settings_data).execute()
+    response = await execute_query(supabase.table("team_settings").insert(settings_data))
     
     if not response.data:
         raise ValueError("Failed to create team settings")
     
+    # Drop effective settings merged without this team's settings
+    await invalidation_bus.publish(TEAM_SETTINGS_CHANNEL, str(request.team_id))
+    
     created_data = response.data[0]
     
     return TeamSettings(
@@ -130,12 +249,11 @@ async def create_team_settings(request: TeamSettingsUpdateRequest) -> TeamSettin
     )
 
 
+@instrument_repository_function("team_settings")
 async def update_team_settings(request: TeamSettingsUpdateRequest) -> TeamSettings:
     """
     Update settings for a specific team.
     """
-    supabase = get_supabase_client()
-    
     # Check if settings exist
     existing = await get_team_settings(request.team_id)
     if not existing:
@@ -165,11 +283,14 @@ async def update_team_settings(request: TeamSettingsUpdateRequest) -> TeamSettin
         settings_data["enforce_team_settings"] = request.enforce_team_settings
     
     # Update in database
-    response = supabase.table("team_settings").update(settings_data).eq("team_id", str(request.team_id)).execute()
+    response = await execute_query(supabase.table("team_settings").update(settings_data).eq("team_id", str(request.team_id)))
     
     if not response.data:
         raise ValueError("Failed to update team settings")
     
+    # Drop effective settings merged with the old values
+    await invalidation_bus.publish(TEAM_SETTINGS_CHANNEL, str(request.team_id))
+    
     updated_data = response.data[0]
     
     return TeamSettings(
@@ -188,14 +309,14 @@ async def update_team_settings(request: TeamSettingsUpdateRequest) -> TeamSettin
     )
 
 
+@instrument_repository_function("team_settings")
 async def delete_team_settings(team_id: UUID) -> bool:
     """
     Delete settings for a specific team.
     """
-    supabase = get_supabase_client()
-    
     # Delete from database
-    response = supabase.table("team_settings").delete().eq("team_id", str(team_id)).execute()
+    response = await execute_query(supabase.table("team_settings").delete().eq("team_id", str(team_id)))
+    await invalidation_bus.publish(TEAM_SETTINGS_CHANNEL, str(team_id))
     
     # Return success status
     return len(response.data) > 0
\ No newline at end of file
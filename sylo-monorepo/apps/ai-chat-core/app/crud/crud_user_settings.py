@@ -1,10 +1,15 @@
 from typing import Optional, Dict, Any
 from uuid import UUID, uuid4
 from datetime import datetime
-from app.db.supabase_client import supabase, supabase_admin
+from app.core.config import settings as app_settings
+from app.core.cache import TTLCache
+from app.core.invalidation import invalidation_bus
+from app.core.metrics import instrument_repository
+from app.db.supabase_client import supabase, supabase_admin, execute_query
 from app.models.user import UserSettings, UserSettingsUpdateRequest
 
 
+@instrument_repository("user_settings")
 class UserSettingsRepository:
     """
     Repository for managing user settings in Supabase.
@@ -12,29 +17,53 @@ class UserSettingsRepository:
     
     def __init__(self):
         self.table_name = "user_settings"
+        
+        # Settings rarely change, so keep them in memory keyed by user ID
+        self.cache = TTLCache(
+            maxsize=app_settings.user_settings_cache_size,
+            ttl=app_settings.user_settings_cache_ttl
+        )
+        invalidation_bus.subscribe(self.table_name, self.cache.invalidate)
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Get hit/miss counters for the settings cache.
+        
+        Returns:
+            Dict of cache statistics.
+        """
+        return self.cache.stats()
     
     async def get_settings(self, user_id: UUID) -> Optional[UserSettings]:
         """
         Get settings for a specific user.
         
+        Served from the in-process cache when possible. Cached objects are
+        shared, so callers must not mutate the returned settings.
+        
         Args:
             user_id: The ID of the user.
             
         Returns:
             The user's settings or None if not found.
         """
+        cached = self.cache.get(str(user_id))
+        if cached is not None:
+            return cached
+        
         # Query Supabase
-        response = (
+        response = await execute_query(
             supabase.table(self.table_name)
             .select("*")
             .eq("user_id", str(user_id))
             .limit(1)
-            .execute()
         )
         
         if response.data and len(response.data) > 0:
-            # Convert to UserSettings object
-            return UserSettings(**response.data[0])
+            # Convert to UserSettings object and cache it
+            user_settings = UserSettings(**response.data[0])
+            self.cache.set(str(user_id), user_settings)
+            return user_settings
         else:
             return None
     
@@ -67,14 +96,15 @@ class UserSettingsRepository:
         settings_dict["updated_at"] = settings_dict["updated_at"].isoformat()
         
         # Insert into Supabase
-        response = supabase_admin.table(self.table_name).insert(settings_dict).execute()
+        response = await execute_query(supabase_admin.table(self.table_name).insert(settings_dict))
         
         if response.data:
             # Update the settings with the returned data
-            return UserSettings(**response.data[0])
-        else:
-            # If no data returned, return the original settings
-            return settings
+            settings = UserSettings(**response.data[0])
+        
+        # Write through to the cache
+        self.cache.set(str(settings.user_id), settings)
+        return settings
     
     async def update_settings(
         self, 
@@ -116,18 +146,25 @@ class UserSettingsRepository:
         update_dict["updated_at"] = datetime.now().isoformat()
         
         # Update in Supabase
-        response = (
+        response = await execute_query(
             supabase_admin.table(self.table_name)
             .update(update_dict)
             .eq("user_id", str(user_id))
-            .execute()
         )
         
+        # Drop stale copies held by other replicas and dependent caches. This
+        # dispatches to local subscribers too, so it must run before the
+        # write-through below or it would drop the fresh entry
+        await invalidation_bus.publish(self.table_name, str(user_id))
+        
         if response.data and len(response.data) > 0:
-            # Convert to UserSettings object
-            return UserSettings(**response.data[0])
+            # Convert to UserSettings object and write through to the cache
+            updated_settings = UserSettings(**response.data[0])
+            self.cache.set(str(user_id), updated_settings)
         else:
-            return None
+            updated_settings = None
+        
+        return updated_settings
     
     async def get_or_create_settings(self, user_id: UUID) -> UserSettings:
         """
@@ -0,0 +1,236 @@
+import sys
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+
+# Compact cached form of a message: (role, content, token counts by encoding)
+CachedMessage = Tuple[str, str, Dict[str, int]]
+
+# Approximate per-message overhead of the tuple, counts dict and deque slot, in bytes
+_MESSAGE_OVERHEAD = 320
+
+
+class _SessionWindow:
+    """
+    Ring buffer holding the most recent messages of one session.
+    """
+    
+    __slots__ = ("messages", "nbytes", "last_access")
+    
+    def __init__(self, capacity: int):
+        self.messages: deque = deque(maxlen=capacity)
+        self.nbytes = 0
+        self.last_access = time.monotonic()
+
+
+class SessionHistoryCache:
+    """
+    In-memory cache of recent messages per chat session.
+    
+    Each session keeps a ring buffer of its last ``max_messages`` messages,
+    filled from Supabase on a miss and appended to in place as new entries
+    are written. Sessions are evicted least-recently-used first once the
+    total size exceeds ``max_bytes``, or when idle for ``idle_ttl`` seconds.
+    
+    The cache is per process. The chat history repository drops a session
+    on other replicas through the invalidation bus once its new rows are
+    written; without ``CACHE_INVALIDATION_DSN``, deployments running several
+    replicas should route a session to one replica or keep ``idle_ttl`` short.
+    """
+    
+    def __init__(
+        self,
+        max_messages: int = settings.session_cache_max_messages,
+        max_bytes: int = settings.session_cache_max_bytes,
+        idle_ttl: float = settings.session_cache_idle_ttl
+    ):
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self._sessions: "OrderedDict[str, _SessionWindow]" = OrderedDict()
+        # In-flight loads per uncached session: [loads, appends seen meanwhile]
+        self._loading: Dict[str, List[int]] = {}
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key: str, limit: int) -> Optional[List[CachedMessage]]:
+        """
+        Get the most recent messages of a session.
+        
+        Args:
+            key: The session cache key.
+            limit: Maximum number of messages to return.
+        
+        Returns:
+            Up to ``limit`` messages, oldest first, or None on a miss.
+        """
+        window = self._sessions.get(key)
+        now = time.monotonic()
+        if window is None or limit > self.max_messages or now - window.last_access > self.idle_ttl:
+            if window is not None and now - window.last_access > self.idle_ttl:
+                self._remove(key)
+            self.misses += 1
+            return None
+        
+        window.last_access = now
+        self._sessions.move_to_end(key)
+        self.hits += 1
+        
+        if limit >= len(window.messages):
+            return list(window.messages)
+        return list(window.messages)[-limit:]
+    
+    def begin_load(self, key: str) -> int:
+        """
+        Register a storage read for a session that missed the cache.
+        
+        Messages appended while the read is in flight are not in its result,
+        so the read must not be used to fill the cache; ``end_load`` reports
+        whether that happened.
+        
+        Args:
+            key: The session cache key.
+        
+        Returns:
+            A generation to pass to ``end_load``.
+        """
+        entry = self._loading.setdefault(key, [0, 0])
+        entry[0] += 1
+        return entry[1]
+    
+    def end_load(self, key: str, generation: int) -> bool:
+        """
+        Finish a read started with ``begin_load``.
+        
+        Args:
+            key: The session cache key.
+            generation: The value returned by ``begin_load``.
+        
+        Returns:
+            True if the read is still current and may be used to ``fill``.
+        """
+        entry = self._loading.get(key)
+        if entry is None:
+            return False
+        entry[0] -= 1
+        if entry[0] <= 0:
+            del self._loading[key]
+        return entry[1] == generation
+    
+    def fill(self, key: str, messages: List[CachedMessage]) -> None:
+        """
+        Populate a session window from storage, replacing any existing one.
+        
+        Args:
+            key: The session cache key.
+            messages: The session's most recent messages, oldest first.
+        """
+        self._remove(key)
+        window = _SessionWindow(self.max_messages)
+        self._sessions[key] = window
+        for message in messages[-self.max_messages:]:
+            self._push(window, message)
+        self._evict()
+    
+    def append(self, key: str, message: CachedMessage) -> None:
+        """
+        Append a newly written message to a cached session.
+        
+        Sessions that are not cached are left alone; the next read loads
+        them from storage. Reads already in flight are marked stale.
+        
+        Args:
+            key: The session cache key.
+            message: The message to append.
+        """
+        self._mark_loads_stale(key)
+        window = self._sessions.get(key)
+        if window is None:
+            return
+        window.last_access = time.monotonic()
+        self._sessions.move_to_end(key)
+        self._push(window, message)
+        self._evict()
+    
+    def evict(self, key: str) -> None:
+        """
+        Drop a session from the cache.
+        
+        Args:
+            key: The session cache key.
+        """
+        self._mark_loads_stale(key)
+        self._remove(key)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters.
+        
+        Returns:
+            Dict with session count, size in bytes, hits, misses and evictions.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "sessions": len(self._sessions),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+    
+    def _mark_loads_stale(self, key: str) -> None:
+        """
+        Stop reads in flight for a session from filling the cache.
+        """
+        entry = self._loading.get(key)
+        if entry is not None:
+            entry[1] += 1
+    
+    def _push(self, window: _SessionWindow, message: CachedMessage) -> None:
+        """
+        Append a message to a window, accounting for any message it displaces.
+        """
+        if len(window.messages) == window.messages.maxlen:
+            dropped = window.messages[0]
+            self._adjust(window, -self._sizeof(dropped))
+        window.messages.append(message)
+        self._adjust(window, self._sizeof(message))
+    
+    def _adjust(self, window: _SessionWindow, delta: int) -> None:
+        """
+        Update the byte counters of a window and of the whole cache.
+        """
+        window.nbytes += delta
+        self._total_bytes += delta
+    
+    def _remove(self, key: str) -> None:
+        """
+        Remove a session window and release its bytes.
+        """
+        window = self._sessions.pop(key, None)
+        if window is not None:
+            self._total_bytes -= window.nbytes
+    
+    def _evict(self) -> None:
+        """
+        Evict idle sessions, then least recently used ones until under budget.
+        """
+        now = time.monotonic()
+        while self._sessions:
+            key, window = next(iter(self._sessions.items()))
+            if self._total_bytes <= self.max_bytes and now - window.last_access <= self.idle_ttl:
+                break
+            self._remove(key)
+            self.evictions += 1
+    
+    @staticmethod
+    def _sizeof(message: CachedMessage) -> int:
+        """
+        Approximate the memory held by a cached message.
+        """
+        return sys.getsizeof(message[1]) + _MESSAGE_OVERHEAD
@@ -1,34 +1,226 @@
+import asyncio
+import hashlib
+import inspect
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+import httpx
 from supabase import create_client, Client
+from postgrest import SyncPostgrestClient
 from app.core.config import settings
+from app.core.cache import TTLCache
+from app.core.metrics import supabase_query_duration
+from app.core.tracing import tracer, SPAN_KIND_CLIENT
+
+try:
+    from supabase.lib.client_options import SyncClientOptions
+except ImportError:  # Older supabase-py: clients build their own HTTP sessions
+    SyncClientOptions = None
+
+# Older postgrest clients can't be handed an existing HTTP client
+_POSTGREST_ACCEPTS_HTTP_CLIENT = "http_client" in inspect.signature(SyncPostgrestClient).parameters
+
+
+class SupabaseClientRegistry:
+    """
+    Hands out long-lived Supabase clients that share one connection pool.
+    
+    The anon and service-role clients are built once; per-user clients,
+    which send the user's JWT so row-level security applies, are kept in a
+    TTL-bounded LRU keyed by token. All of them send requests through a
+    single pooled ``httpx.Client`` (with supabase-py versions that accept
+    one), so client construction and TCP/TLS setup stay out of requests.
+    The pool is closed by ``close``.
+    """
+    
+    def __init__(self):
+        self._http: Optional[httpx.Client] = None
+        self._anon: Optional[Client] = None
+        self._service_role: Optional[Client] = None
+        self._user_clients = TTLCache(
+            maxsize=settings.supabase_user_client_cache_size,
+            ttl=settings.supabase_user_client_ttl
+        )
+        self._shares_http_client = (
+            SyncClientOptions is not None and hasattr(SyncClientOptions, "httpx_client")
+        )
+    
+    @property
+    def http_client(self) -> httpx.Client:
+        """
+        Get the shared HTTP client, creating it on first use.
+        """
+        if self._http is None:
+            self._http = httpx.Client(
+                http2=settings.supabase_http2,
+                limits=httpx.Limits(
+                    max_connections=settings.supabase_max_connections,
+                    max_keepalive_connections=settings.supabase_max_keepalive_connections,
+                    keepalive_expiry=settings.supabase_keepalive_expiry
+                ),
+                timeout=httpx.Timeout(
+                    settings.supabase_query_timeout,
+                    connect=settings.supabase_connect_timeout
+                ),
+                follow_redirects=True
+            )
+        return self._http
+    
+    def _create(self, key: str) -> Client:
+        if self._shares_http_client:
+            return create_client(
+                settings.supabase_url,
+                key,
+                options=SyncClientOptions(httpx_client=self.http_client)
+            )
+        return create_client(settings.supabase_url, key)
+    
+    @property
+    def anon(self) -> Client:
+        """
+        Get the client authenticated with the anon key.
+        """
+        if self._anon is None:
+            self._anon = self._create(settings.supabase_anon_key)
+        return self._anon
+    
+    @property
+    def service_role(self) -> Client:
+        """
+        Get the client authenticated with the service role key.
+        """
+        if self._service_role is None:
+            self._service_role = self._create(settings.supabase_service_role_key)
+        return self._service_role
+    
+    def for_user(self, access_token: str) -> SyncPostgrestClient:
+        """
+        Get a PostgREST client that acts as the user holding a JWT.
+        
+        Clients are cached by token, so repeated requests from the same
+        session reuse one. Like the shared clients, they support ``table``
+        and ``rpc``.
+        
+        Args:
+            access_token: The user's Supabase access token.
+        
+        Returns:
+            The user-scoped client.
+        """
+        # Key by digest so tokens aren't held as cache keys
+        key = hashlib.sha256(access_token.encode()).hexdigest()
+        client = self._user_clients.get(key)
+        if client is None:
+            headers = {
+                "apikey": settings.supabase_anon_key,
+                "Authorization": f"Bearer {access_token}",
+            }
+            kwargs: Dict[str, Any] = {"headers": headers}
+            if _POSTGREST_ACCEPTS_HTTP_CLIENT:
+                kwargs["http_client"] = self.http_client
+            client = SyncPostgrestClient(f"{settings.supabase_url}/rest/v1", **kwargs)
+            self._user_clients.set(key, client)
+        return client
+    
+    def close(self) -> None:
+        """
+        Close the shared connection pool. Called on application shutdown,
+        after the last query has run.
+        
+        Clients built on the pool are closed with it. With supabase-py
+        versions that can't share a pool, each client's own session is left
+        to close with the process.
+        """
+        self._user_clients.clear()
+        if self._http is not None:
+            self._http.close()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get counters for the user client cache.
+        
+        Returns:
+            Dict of cache statistics and whether clients share one pool.
+        """
+        return {
+            "user_clients": self._user_clients.stats(),
+            "shared_pool": self._shares_http_client,
+        }
+
+
+# Create a global instance
+clients = SupabaseClientRegistry()
 
 
 def get_supabase_client() -> Client:
     """
-    Create and return a Supabase client instance.
+    Get the shared Supabase client authenticated with the anon key.
     
     Returns:
-        Client: A configured Supabase client.
+        Client: The pooled anon client.
     """
-    return create_client(
-        settings.supabase_url,
-        settings.supabase_anon_key
-    )
+    return clients.anon
 
 
 def get_supabase_admin_client() -> Client:
     """
-    Create and return a Supabase client with admin privileges (service role).
+    Get the shared Supabase client with admin privileges (service role).
     Use this for operations that require elevated permissions.
     
     Returns:
-        Client: A configured Supabase client with admin privileges.
+        Client: The pooled service-role client.
+    """
+    return clients.service_role
+
+
+# Bounded pool that runs the synchronous supabase-py calls off the event loop
+_query_executor = ThreadPoolExecutor(
+    max_workers=settings.supabase_max_workers,
+    thread_name_prefix="supabase"
+)
+
+
+async def execute_query(query: Any, timeout: Optional[float] = None) -> Any:
+    """
+    Execute a Supabase query builder without blocking the event loop.
+    
+    supabase-py's ``execute()`` performs blocking HTTP I/O, so it is run on a
+    bounded thread pool. The timeout covers both waiting for a free worker
+    and the round trip itself.
+    
+    Args:
+        query: A query builder with an ``execute()`` method.
+        timeout: Seconds to wait (defaults to settings.supabase_query_timeout).
+    
+    Returns:
+        The API response returned by ``execute()``.
+    
+    Raises:
+        asyncio.TimeoutError: If the query does not complete in time.
+    """
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    with tracer.span("supabase.query", SPAN_KIND_CLIENT) as span:
+        span.set_attributes({
+            "db.system": "postgresql",
+            "db.collection.name": str(getattr(query, "path", "")).lstrip("/") or None,
+        })
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(_query_executor, query.execute),
+                timeout if timeout is not None else settings.supabase_query_timeout
+            )
+        finally:
+            supabase_query_duration.observe(time.perf_counter() - started)
+
+
+def shutdown_query_executor() -> None:
+    """
+    Stop the query thread pool. Called on application shutdown.
     """
-    return create_client(
-        settings.supabase_url,
-        settings.supabase_service_role_key
-    )
+    _query_executor.shutdown(wait=False, cancel_futures=True)
 
 
-# Create global client instances
-supabase = get_supabase_client()
-supabase_admin = get_supabase_admin_client()
\ No newline at end of file
+# Shared clients used by the repositories
+supabase = clients.anon
+supabase_admin = clients.service_role
@@ -1,6 +1,9 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -9,18 +12,57 @@ load_dotenv()
 # Import API routers
 from app.api import router as api_router
 from app.core.config import settings
+from app.db.supabase_client import clients as supabase_clients, shutdown_query_executor
+from app.crud.crud_chat_history import chat_history_repository
+from app.crud.crud_user_settings import user_settings_repository
+from app.crud.crud_team_settings import membership_cache_stats
+from app.core.invalidation import invalidation_bus
+from app.core.metrics import metrics, MetricsMiddleware, CONTENT_TYPE
+from app.core.tracing import tracer, TracingMiddleware
 
 # Import model services to ensure they are initialized
 from app.services.model_service import model_orchestrator
+from app.services.completion_cache import completion_cache
+from app.services.settings_resolver import settings_resolver
+from app.services.tokenizer import tokenizers
 from app.services.openai_service import openai_service
 # Anthropic service is conditionally imported in its module if API key is available
 import app.services.anthropic_service
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Manage process-wide resources for the lifetime of the application.
+    """
+    chat_history_repository.write_buffer.start()
+    await invalidation_bus.start()
+    tracer.start()
+    # Load tokenizer encodings now, off the event loop, not in the first requests
+    try:
+        await asyncio.get_running_loop().run_in_executor(
+            None, tokenizers.warm_up, settings.available_models
+        )
+    except Exception as e:
+        print(f"Warning: could not preload tokenizer encodings: {str(e)}")
+    yield
+    await invalidation_bus.stop()
+    # Flush buffered chat history before the query pool goes away
+    await chat_history_repository.write_buffer.stop()
+    # Close pooled provider connections on shutdown
+    await model_orchestrator.aclose()
+    shutdown_query_executor()
+    supabase_clients.close()
+    # Export remaining spans last, including those of the final history flush
+    await tracer.stop()
+
+
 # Create FastAPI application
 app = FastAPI(
     title="AI Chat Core Service",
     description="AI-powered chat service with multi-model orchestration and persistent memory",
     version="0.2.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -32,6 +74,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Open a server span per request, continuing the gateway's trace (no-op while tracing is off)
+app.add_middleware(TracingMiddleware)
+
+# Record request metrics outermost, so latency covers the whole middleware stack
+if settings.enable_metrics:
+    app.add_middleware(MetricsMiddleware)
+
 # Root endpoint
 @app.get("/")
 async def read_root():
@@ -47,13 +96,39 @@ async def health_check():
     # Get available models from the orchestrator
     available_models = model_orchestrator.get_available_models()
     model_names = [model["id"] for model in available_models]
+    providers = model_orchestrator.health_stats()
+    
+    # Report degraded, not unhealthy, so the instance keeps serving other providers
+    status = "healthy"
+    if any(provider["state"] != "closed" for provider in providers.values()):
+        status = "degraded"
     
     return {
-        "status": "healthy",
+        "status": status,
         "available_models": model_names,
         "default_model": settings.default_model,
-        "multi_model_enabled": settings.enable_multi_model
+        "multi_model_enabled": settings.enable_multi_model,
+        "providers": providers,
+        "caches": {
+            "user_settings": user_settings_repository.cache_stats(),
+            "effective_settings": settings_resolver.stats(),
+            "team_memberships": membership_cache_stats(),
+            "supabase_clients": supabase_clients.stats(),
+            "session_history": chat_history_repository.session_cache.stats(),
+            "completions": completion_cache.stats()
+        },
+        "coalescing": model_orchestrator.coalescer.stats(),
+        "routing": model_orchestrator.latency_stats(),
+        "rate_limits": model_orchestrator.rate_limit_stats(),
+        "tracing": tracer.stats()
     }
 
+# Prometheus metrics endpoint
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    if not settings.enable_metrics:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
+
 # Include API routers
 app.include_router(api_router)
\ No newline at end of file
@@ -27,6 +27,7 @@ class ChatRequest(BaseModel):
     session_id: Optional[UUID] = Field(None, description="The session/thread ID for this conversation")
     tools: Optional[List[Dict[str, Any]]] = Field(None, description="List of tools available to the model")
     tool_choice: Optional[str] = Field(None, description="Control when the model calls functions")
+    stream: bool = Field(False, description="Whether to stream the response as Server-Sent Events")
 
 
 class ChatResponse(BaseModel):
@@ -35,11 +36,47 @@ class ChatResponse(BaseModel):
     """
     message: Message = Field(..., description="The generated message")
     session_id: UUID = Field(..., description="The session/thread ID for this conversation")
+    model: Optional[str] = Field(None, description="The model that generated the response")
     created_at: datetime = Field(default_factory=datetime.now, description="When this response was created")
     usage: Optional[Dict[str, int]] = Field(None, description="Token usage information")
+    estimated_cost: Optional[float] = Field(None, description="Cost of the request estimated from usage and model pricing")
     finish_reason: Optional[str] = Field(None, description="Reason why the generation finished")
 
 
+class ChatBatchRequest(BaseModel):
+    """
+    Request model for a batch of chat completions.
+    """
+    items: List[ChatRequest] = Field(..., description="The chat completion requests to run")
+    max_concurrency: Optional[int] = Field(None, description="Maximum items processed at once (capped by the server)")
+    stream: bool = Field(False, description="Whether to stream results as NDJSON in completion order")
+
+
+class ChatBatchError(BaseModel):
+    """
+    Error for a failed batch item.
+    """
+    status_code: int = Field(..., description="The HTTP status the item would have failed with")
+    detail: str = Field(..., description="Description of the error")
+
+
+class ChatBatchItemResult(BaseModel):
+    """
+    Result of one item in a chat completion batch.
+    """
+    index: int = Field(..., description="The item's position in the batch request")
+    session_id: Optional[UUID] = Field(None, description="The session/thread ID used for the item")
+    response: Optional[ChatResponse] = Field(None, description="The completion, if the item succeeded")
+    error: Optional[ChatBatchError] = Field(None, description="The error, if the item failed")
+
+
+class ChatBatchResponse(BaseModel):
+    """
+    Response model for a batch of chat completions.
+    """
+    results: List[ChatBatchItemResult] = Field(..., description="Item results, in request order")
+
+
 class ChatHistoryEntry(BaseModel):
     """
     Model for storing chat history in the database.
@@ -51,4 +88,45 @@ class ChatHistoryEntry(BaseModel):
     content: str = Field(..., description="The content of the message")
     model: Optional[str] = Field(None, description="The model used for assistant messages")
     created_at: datetime = Field(default_factory=datetime.now, description="When this message was created")
-    metadata: Optional[Dict[str, Any]] = Field(None, description="Additional metadata for this message")
\ No newline at end of file
+    metadata: Optional[Dict[str, Any]] = Field(None, description="Additional metadata for this message")
+
+
+class ChatHistoryItem(BaseModel):
+    """
+    A message returned by the session history endpoints.
+    """
+    id: UUID = Field(..., description="The ID of this chat history entry")
+    role: str = Field(..., description="The role of the message sender")
+    content: str = Field(..., description="The content of the message")
+    model: Optional[str] = Field(None, description="The model used for assistant messages")
+    created_at: datetime = Field(..., description="When this message was created")
+
+
+class ChatHistoryPage(BaseModel):
+    """
+    One page of a session's messages.
+    """
+    items: List[ChatHistoryItem] = Field(..., description="The messages, in the requested order")
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor to get the next page; null on the last page")
+    has_more: bool = Field(False, description="Whether more messages follow this page")
+
+
+class ChatSessionSummary(BaseModel):
+    """
+    A chat session as listed by the session index.
+    """
+    id: UUID = Field(..., description="The session/thread ID")
+    title: Optional[str] = Field(None, description="The start of the session's first user message")
+    message_count: int = Field(0, description="Messages in the session, excluding the start marker")
+    last_model: Optional[str] = Field(None, description="The model that generated the latest assistant message")
+    created_at: datetime = Field(..., description="When the session was started")
+    last_message_at: datetime = Field(..., description="When the latest message was written")
+
+
+class ChatSessionPage(BaseModel):
+    """
+    One page of a user's chat sessions.
+    """
+    items: List[ChatSessionSummary] = Field(..., description="The sessions, most recently active first")
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor to get the next page; null on the last page")
+    has_more: bool = Field(False, description="Whether more sessions follow this page")
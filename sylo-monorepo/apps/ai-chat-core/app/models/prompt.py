@@ -44,4 +44,22 @@ class PromptCategorizeResponse(BaseModel):
     suggested_categories: List[str] = Field(..., description="List of suggested categories")
     confidence_scores: Optional[Dict[str, float]] = Field(None, description="Confidence scores for each category")
     success: bool = Field(..., description="Whether the categorization was successful")
+    error: Optional[str] = Field(None, description="Error message if categorization failed")
+
+
+class PromptCategorizeBulkItem(BaseModel):
+    """
+    A prompt to categorize in a bulk job.
+    """
+    id: str = Field(..., description="The ID of the prompt, used to map results back")
+    prompt_text: str = Field(..., description="The prompt text to categorize")
+
+
+class PromptCategorizeBulkResult(BaseModel):
+    """
+    Categorization result for one prompt of a bulk job.
+    """
+    id: str = Field(..., description="The ID of the prompt")
+    suggested_categories: List[str] = Field(..., description="List of suggested categories")
+    success: bool = Field(..., description="Whether the categorization was successful")
     error: Optional[str] = Field(None, description="Error message if categorization failed")
\ No newline at end of file
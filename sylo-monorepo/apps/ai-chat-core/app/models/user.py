@@ -48,4 +48,39 @@ class UserSettingsResponse(BaseModel):
     """
     settings: UserSettings = Field(..., description="The user's settings")
     success: bool = Field(..., description="Whether the operation was successful")
-    error: Optional[str] = Field(None, description="Error message if operation failed")
\ No newline at end of file
+    error: Optional[str] = Field(None, description="Error message if operation failed")
+
+
+class EffectiveSettings(BaseModel):
+    """
+    Settings a user's requests run with, merged from system defaults, the
+    user's teams and the user's own settings.
+    """
+    user_id: UUID = Field(..., description="The ID of the user")
+    default_model: str = Field(..., description="The default AI model to use")
+    temperature: float = Field(..., description="Default temperature setting (0-1)")
+    max_tokens: Optional[int] = Field(None, description="Default maximum tokens to generate")
+    memory_window: int = Field(..., description="Number of previous messages to include in context")
+    preferred_models: Optional[List[str]] = Field(None, description="List of preferred models in order of preference")
+    model_specific_settings: Dict[str, Dict[str, Any]] = Field(default_factory=dict, description="Settings specific to each model")
+    preferences: Dict[str, Any] = Field(default_factory=dict, description="Additional preferences")
+    team_ids: List[UUID] = Field(default_factory=list, description="Teams whose settings were merged")
+    enforced_by_team_id: Optional[UUID] = Field(None, description="The team whose enforced settings override the user's, if any")
+    
+    def for_model(self, model: str) -> Dict[str, Any]:
+        """
+        Get the temperature and max_tokens to use with a model.
+        
+        Args:
+            model: The model identifier.
+        
+        Returns:
+            Dict with ``temperature`` and ``max_tokens``, with the model's
+            overrides from ``model_specific_settings`` applied.
+        """
+        resolved = {"temperature": self.temperature, "max_tokens": self.max_tokens}
+        overrides = self.model_specific_settings.get(model) or {}
+        for key in resolved:
+            if overrides.get(key) is not None:
+                resolved[key] = overrides[key]
+        return resolved
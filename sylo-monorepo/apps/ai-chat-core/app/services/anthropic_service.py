@@ -1,7 +1,10 @@
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Union, AsyncIterator, Tuple
+import json
 import httpx
 from app.core.config import settings, ModelConfig
+from app.core.rate_limiter import parse_retry_after
 from app.services.model_service import ModelService
+from app.services.prompt_cache import EPHEMERAL_CACHE_CONTROL, cache_breakpoints
 
 
 class AnthropicService(ModelService):
@@ -14,13 +17,16 @@ class AnthropicService(ModelService):
         Initialize the Anthropic service.
         """
         self.api_key = settings.anthropic_api_key
-        self.api_url = "https://api.anthropic.com/v1/messages"
+        self.api_url = settings.anthropic_api_url
         self.supported_models = {
             model_id: config 
             for model_id, config in settings.model_configs.items() 
             if config.provider == "anthropic"
         }
         
+        # Shared connection pool, created lazily on first use
+        self._client: Optional[httpx.AsyncClient] = None
+        
         # Check if API key is available
         if not self.api_key:
             print("Warning: Anthropic API key not set. Anthropic models will not be available.")
@@ -69,58 +75,152 @@ class AnthropicService(ModelService):
             }
         
         try:
-            # Convert OpenAI-style messages to Anthropic format
-            anthropic_messages = self._convert_messages(messages)
-            
             # Build request payload
-            payload = {
-                "model": model,
-                "messages": anthropic_messages,
-                "temperature": temperature,
-                "max_tokens": max_tokens if max_tokens is not None else 1024,
-                "stream": stream,
-            }
+            payload = self._build_payload(
+                messages, model, temperature, max_tokens, tools, stream, **kwargs
+            )
             
-            # Add tools if provided
-            if tools is not None:
-                payload["tools"] = self._convert_tools(tools)
+            # Make the API call
+            response = await self._get_client().post(
+                self.api_url,
+                json=payload,
+                headers=self._headers()
+            )
             
-            # Add any additional parameters
-            for key, value in kwargs.items():
-                if value is not None:
-                    payload[key] = value
+            # Check for errors
+            if response.status_code != 200:
+                return {
+                    "error": True,
+                    "message": f"Anthropic API error: {response.text}",
+                    "type": "AnthropicAPIError",
+                    "status_code": response.status_code,
+                    "retry_after": parse_retry_after(response.headers.get("retry-after"))
+                }
             
-            # Make the API call
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.api_url,
-                    json=payload,
-                    headers={
-                        "x-api-key": self.api_key,
-                        "anthropic-version": "2023-06-01",
-                        "content-type": "application/json"
-                    }
-                )
+            # Parse response
+            data = response.json()
+            
+            # Convert Anthropic response to OpenAI-like format for consistency
+            return self._convert_response_to_openai_format(data)
                 
+        except Exception as e:
+            # Log the error and return a structured error response
+            print(f"Error calling Anthropic API: {str(e)}")
+            return {
+                "error": True,
+                "message": str(e),
+                "type": type(e).__name__
+            }
+    
+    async def stream_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_choice: Optional[Union[str, Dict[str, Any]]] = None,
+        **kwargs
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a chat completion using Anthropic's API.
+        
+        Anthropic server-sent events are translated into OpenAI-style
+        ``chat.completion.chunk`` dicts so callers can treat every provider
+        the same way. The final chunk carries ``finish_reason`` and ``usage``.
+        
+        Args:
+            messages: List of message objects with role and content.
+            model: The Anthropic model to use.
+            temperature: Controls randomness (0-1).
+            max_tokens: Maximum number of tokens to generate.
+            tools: List of tools available to the model.
+            tool_choice: Control when the model calls functions.
+            **kwargs: Additional model-specific parameters.
+            
+        Yields:
+            OpenAI-style completion chunks, or a single error dict.
+        """
+        # Check if API key is available
+        if not self.api_key:
+            yield {
+                "error": True,
+                "message": "Anthropic API key not set",
+                "type": "ConfigurationError"
+            }
+            return
+        
+        # Validate model
+        if not self.supports_model(model):
+            yield {
+                "error": True,
+                "message": f"Model '{model}' is not supported by Anthropic service",
+                "type": "UnsupportedModelError"
+            }
+            return
+        
+        try:
+            payload = self._build_payload(
+                messages, model, temperature, max_tokens, tools, True, **kwargs
+            )
+            
+            message_id = ""
+            start_usage: Dict[str, Any] = {}
+            output_tokens = 0
+            stop_reason = None
+            
+            async with self._get_client().stream(
+                "POST",
+                self.api_url,
+                json=payload,
+                headers=self._headers()
+            ) as response:
                 # Check for errors
                 if response.status_code != 200:
-                    return {
+                    body = await response.aread()
+                    yield {
                         "error": True,
-                        "message": f"Anthropic API error: {response.text}",
+                        "message": f"Anthropic API error: {body.decode(errors='replace')}",
                         "type": "AnthropicAPIError",
-                        "status_code": response.status_code
+                        "status_code": response.status_code,
+                        "retry_after": parse_retry_after(response.headers.get("retry-after"))
                     }
+                    return
                 
-                # Parse response
-                data = response.json()
-                
-                # Convert Anthropic response to OpenAI-like format for consistency
-                return self._convert_response_to_openai_format(data)
-                
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    event = json.loads(line[len("data:"):].strip())
+                    event_type = event.get("type")
+                    
+                    if event_type == "message_start":
+                        message = event.get("message", {})
+                        message_id = message.get("id", "")
+                        start_usage = message.get("usage", {})
+                    elif event_type == "content_block_delta":
+                        text = event.get("delta", {}).get("text")
+                        if text:
+                            yield self._make_chunk(message_id, model, {"content": text})
+                    elif event_type == "message_delta":
+                        stop_reason = event.get("delta", {}).get("stop_reason", stop_reason)
+                        output_tokens = event.get("usage", {}).get("output_tokens", output_tokens)
+                    elif event_type == "error":
+                        yield {
+                            "error": True,
+                            "message": f"Anthropic API error: {event.get('error', {}).get('message', 'Unknown error')}",
+                            "type": "AnthropicAPIError"
+                        }
+                        return
+        
+            # Close the stream with the finish reason and usage
+            final_chunk = self._make_chunk(message_id, model, {}, stop_reason or "stop")
+            final_chunk["usage"] = self._convert_usage({**start_usage, "output_tokens": output_tokens})
+            yield final_chunk
+            
         except Exception as e:
-            # Log the error and return a structured error response
-            print(f"Error calling Anthropic API: {str(e)}")
-            return {
+            # Log the error and end the stream with a structured error
+            print(f"Error streaming from Anthropic API: {str(e)}")
+            yield {
                 "error": True,
                 "message": str(e),
                 "type": type(e).__name__
@@ -150,16 +250,163 @@ class AnthropicService(ModelService):
         """
         return model in self.supported_models and self.api_key is not None
     
-    def _convert_messages(self, openai_messages: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    def _get_client(self) -> httpx.AsyncClient:
+        """
+        Get the shared HTTP client, creating it on first use.
+        
+        A single pooled client is kept for the life of the process so that
+        DNS, TCP and TLS setup are paid once rather than on every completion.
+        
+        Returns:
+            The shared httpx.AsyncClient.
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=settings.anthropic_http2,
+                limits=httpx.Limits(
+                    max_connections=settings.anthropic_max_connections,
+                    max_keepalive_connections=settings.anthropic_max_keepalive_connections,
+                    keepalive_expiry=settings.anthropic_keepalive_expiry
+                ),
+                timeout=httpx.Timeout(
+                    connect=settings.anthropic_connect_timeout,
+                    read=settings.anthropic_read_timeout,
+                    write=settings.anthropic_write_timeout,
+                    pool=settings.anthropic_pool_timeout
+                )
+            )
+        return self._client
+    
+    async def aclose(self) -> None:
+        """
+        Close the shared HTTP client and its connection pool.
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    def _headers(self) -> Dict[str, str]:
+        """
+        Build the request headers for the Anthropic API.
+        
+        Returns:
+            Dict of HTTP headers.
+        """
+        return {
+            "x-api-key": self.api_key,
+            "anthropic-version": "2023-06-01",
+            "content-type": "application/json"
+        }
+    
+    def _build_payload(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: Optional[int],
+        tools: Optional[List[Dict[str, Any]]],
+        stream: bool,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Build the request payload for the Anthropic messages API.
+        
+        With prompt caching enabled, the system prompt and the last two user
+        turns are marked with ``cache_control`` breakpoints, so the tools,
+        system prompt and earlier conversation are read from Anthropic's
+        prompt cache on the next turn instead of being billed in full.
+        
+        Args:
+            messages: List of OpenAI-style message objects.
+            model: The Anthropic model to use.
+            temperature: Controls randomness (0-1).
+            max_tokens: Maximum number of tokens to generate.
+            tools: List of OpenAI-style tools available to the model.
+            stream: Whether to stream the response.
+            **kwargs: Additional model-specific parameters.
+            
+        Returns:
+            Dict containing the request payload.
+        """
+        # Convert OpenAI-style messages to Anthropic format
+        system, anthropic_messages = self._convert_messages(messages)
+        
+        if settings.enable_prompt_caching:
+            self._add_cache_breakpoints(system, anthropic_messages)
+        
+        payload = {
+            "model": model,
+            "messages": anthropic_messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens if max_tokens is not None else 1024,
+            "stream": stream,
+        }
+        
+        # System prompts go in the top-level system field
+        if system:
+            payload["system"] = system
+        
+        # Add tools if provided
+        if tools is not None:
+            payload["tools"] = self._convert_tools(tools)
+        
+        # Add any additional parameters
+        for key, value in kwargs.items():
+            if value is not None:
+                payload[key] = value
+        
+        return payload
+    
+    def _make_chunk(
+        self,
+        message_id: str,
+        model: str,
+        delta: Dict[str, Any],
+        finish_reason: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Build an OpenAI-style streaming chunk.
+        
+        Args:
+            message_id: The Anthropic message ID.
+            model: The model that produced the chunk.
+            delta: The message delta for this chunk.
+            finish_reason: Reason why the generation finished, on the last chunk.
+            
+        Returns:
+            Dict in OpenAI chunk format.
+        """
+        return {
+            "id": message_id,
+            "object": "chat.completion.chunk",
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "delta": delta,
+                    "finish_reason": finish_reason
+                }
+            ]
+        }
+    
+    def _convert_messages(
+        self,
+        openai_messages: List[Dict[str, str]]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
         """
         Convert OpenAI-style messages to Anthropic format.
         
+        Anthropic takes system prompts in a separate top-level ``system``
+        field rather than as messages, so they are returned apart, as text
+        blocks in their original order.
+        
         Args:
             openai_messages: List of OpenAI-style message objects.
             
         Returns:
-            List of Anthropic-style message objects.
+            The system text blocks and the list of Anthropic-style message objects.
         """
+        system = []
         anthropic_messages = []
         
         for msg in openai_messages:
@@ -168,9 +415,8 @@ class AnthropicService(ModelService):
             
             # Map OpenAI roles to Anthropic roles
             if role == "system":
-                # System messages in Anthropic are handled differently
-                # We'll add it as a system message at the beginning
-                anthropic_messages.insert(0, {"role": "system", "content": content})
+                if content:
+                    system.append({"type": "text", "text": content})
             elif role == "user":
                 anthropic_messages.append({"role": "user", "content": content})
             elif role == "assistant":
@@ -182,7 +428,68 @@ class AnthropicService(ModelService):
                     "content": f"Function result: {content}"
                 })
         
-        return anthropic_messages
+        return system, anthropic_messages
+    
+    @staticmethod
+    def _add_cache_breakpoints(
+        system: List[Dict[str, Any]],
+        anthropic_messages: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Mark the ends of stable prompt prefixes with ``cache_control``.
+        
+        Uses at most three of Anthropic's four breakpoints: the last system
+        block and the messages chosen by ``cache_breakpoints``. Prefixes
+        shorter than the model's minimum cacheable length are ignored by
+        Anthropic at no cost.
+        
+        Args:
+            system: The system text blocks (updated in place).
+            anthropic_messages: The Anthropic-style messages (updated in place).
+        """
+        if system:
+            system[-1] = {**system[-1], "cache_control": EPHEMERAL_CACHE_CONTROL}
+        
+        for index in cache_breakpoints(anthropic_messages):
+            message = anthropic_messages[index]
+            content = message["content"]
+            if isinstance(content, str):
+                if not content:
+                    continue
+                blocks = [{"type": "text", "text": content}]
+            elif content:
+                blocks = [dict(block) for block in content]
+            else:
+                continue
+            blocks[-1]["cache_control"] = EPHEMERAL_CACHE_CONTROL
+            anthropic_messages[index] = {**message, "content": blocks}
+    
+    @staticmethod
+    def _convert_usage(usage: Dict[str, Any]) -> Dict[str, int]:
+        """
+        Convert Anthropic usage to OpenAI-style token counts.
+        
+        Anthropic's ``input_tokens`` excludes prompt cache reads and writes;
+        they are added back so ``prompt_tokens`` covers the whole prompt, and
+        reported separately as ``cache_read_tokens`` and ``cache_write_tokens``.
+        
+        Args:
+            usage: The ``usage`` object from the Anthropic API.
+        
+        Returns:
+            Dict of token counts.
+        """
+        cache_read_tokens = usage.get("cache_read_input_tokens") or 0
+        cache_write_tokens = usage.get("cache_creation_input_tokens") or 0
+        prompt_tokens = (usage.get("input_tokens") or 0) + cache_read_tokens + cache_write_tokens
+        completion_tokens = usage.get("output_tokens") or 0
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "cache_read_tokens": cache_read_tokens,
+            "cache_write_tokens": cache_write_tokens
+        }
     
     def _convert_tools(self, openai_tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
@@ -246,14 +553,7 @@ class AnthropicService(ModelService):
                     "finish_reason": anthropic_response.get("stop_reason", "stop")
                 }
             ],
-            "usage": {
-                "prompt_tokens": anthropic_response.get("usage", {}).get("input_tokens", 0),
-                "completion_tokens": anthropic_response.get("usage", {}).get("output_tokens", 0),
-                "total_tokens": (
-                    anthropic_response.get("usage", {}).get("input_tokens", 0) +
-                    anthropic_response.get("usage", {}).get("output_tokens", 0)
-                )
-            }
+            "usage": self._convert_usage(anthropic_response.get("usage", {}))
         }
         
         # Add tool calls if present
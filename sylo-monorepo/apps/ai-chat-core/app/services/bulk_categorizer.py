@@ -0,0 +1,354 @@
+"""
+Offline bulk prompt categorization.
+
+Packs many prompts into each model call, up to a token budget, and asks for
+a JSON object mapping each prompt to its categories. Items the model drops
+or answers badly are retried in smaller packs; everything else is written
+to an append-only JSONL checkpoint, so a killed job resumes where it left
+off.
+
+Usage:
+    python -m app.services.bulk_categorizer prompts.jsonl categories.jsonl
+
+Each input line is a JSON object with an ``id`` and the prompt text under
+``prompt_text`` (or ``content``, as exported from the ``prompts`` table).
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set
+from app.core.config import settings
+from app.models.prompt import PromptCategorizeBulkItem, PromptCategorizeBulkResult
+from app.services.model_service import model_orchestrator
+from app.services.tokenizer import count_text_tokens, MESSAGE_OVERHEAD_TOKENS
+
+# Maximum categories kept per prompt, as for single-prompt categorization
+MAX_CATEGORIES = 5
+
+# Reply tokens reserved per prompt in a pack, plus a fixed allowance for the JSON wrapper
+REPLY_TOKENS_PER_ITEM = 40
+REPLY_TOKENS_BASE = 50
+
+SYSTEM_PROMPT = (
+    "You are an expert at categorizing prompts for AI systems. "
+    "You will receive a numbered list of prompts. For each prompt, suggest 1-5 "
+    "relevant categories. Categories should be single words or short phrases "
+    "that describe the domain, purpose, or content of the prompt. "
+    "Respond with only a JSON object of the form "
+    '{"results": [{"id": "<prompt number>", "categories": ["..."]}]}, '
+    "with exactly one entry per prompt."
+)
+
+
+class CategorizationCheckpoint:
+    """
+    Append-only JSONL record of categorization results.
+    
+    Each result is flushed to disk as soon as its pack completes. On resume,
+    prompts whose latest record succeeded are skipped; failed ones are tried
+    again.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+    
+    def completed_ids(self) -> Set[str]:
+        """
+        Get the IDs of prompts already categorized successfully.
+        
+        Returns:
+            The set of prompt IDs.
+        """
+        latest: Dict[str, bool] = {}
+        if not os.path.exists(self.path):
+            return set()
+        
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A partial last line from a killed job
+                    continue
+                latest[str(record["id"])] = bool(record.get("success"))
+        return {prompt_id for prompt_id, success in latest.items() if success}
+    
+    def append(self, results: Iterable[PromptCategorizeBulkResult]) -> None:
+        """
+        Durably append results.
+        
+        Args:
+            results: The results to record.
+        """
+        with open(self.path, "a", encoding="utf-8") as f:
+            for result in results:
+                f.write(result.json() + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class BulkPromptCategorizer:
+    """
+    Categorizes many prompts with few model calls.
+    """
+    
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        max_prompt_tokens: int = settings.prompt_bulk_max_prompt_tokens,
+        max_items_per_call: int = settings.prompt_bulk_max_items_per_call,
+        concurrency: int = settings.prompt_bulk_concurrency,
+        max_retries: int = settings.prompt_bulk_max_retries,
+        priority: int = settings.prompt_bulk_priority
+    ):
+        """
+        Initialize the categorizer.
+        
+        Args:
+            model: The model to use (defaults to settings.default_model).
+            max_prompt_tokens: Token budget for the prompts packed into one call.
+            max_items_per_call: Maximum prompts packed into one call.
+            concurrency: Maximum model calls in flight.
+            max_retries: Times a failed prompt is retried.
+            priority: Rate limiter priority, so interactive traffic goes first.
+        """
+        self.model = model or settings.default_model
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_items_per_call = max_items_per_call
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.priority = priority
+        self.calls = 0
+    
+    def pack(
+        self,
+        items: List[PromptCategorizeBulkItem],
+        max_items: Optional[int] = None
+    ) -> List[List[PromptCategorizeBulkItem]]:
+        """
+        Split items into packs that fit the token budget.
+        
+        A prompt larger than the budget goes into a pack of its own.
+        
+        Args:
+            items: The prompts to pack.
+            max_items: Maximum prompts per pack (defaults to ``max_items_per_call``).
+        
+        Returns:
+            The packs, in input order.
+        """
+        max_items = max_items or self.max_items_per_call
+        budget = self.max_prompt_tokens - count_text_tokens(SYSTEM_PROMPT, self.model)
+        
+        packs: List[List[PromptCategorizeBulkItem]] = []
+        current: List[PromptCategorizeBulkItem] = []
+        used = 0
+        for item in items:
+            tokens = count_text_tokens(item.prompt_text, self.model) + MESSAGE_OVERHEAD_TOKENS
+            if current and (used + tokens > budget or len(current) >= max_items):
+                packs.append(current)
+                current, used = [], 0
+            current.append(item)
+            used += tokens
+        if current:
+            packs.append(current)
+        return packs
+    
+    async def categorize(
+        self,
+        items: List[PromptCategorizeBulkItem],
+        checkpoint: Optional[CategorizationCheckpoint] = None
+    ) -> List[PromptCategorizeBulkResult]:
+        """
+        Categorize prompts, retrying only the ones that fail.
+        
+        Failed prompts are re-packed into packs half the previous size, so a
+        reply truncated by a large pack is not repeated.
+        
+        Args:
+            items: The prompts to categorize.
+            checkpoint: Where to record results as packs complete. Prompts
+                already completed in it are skipped.
+        
+        Returns:
+            Results for the prompts processed in this run, in input order.
+        """
+        if checkpoint is not None:
+            done = checkpoint.completed_ids()
+            items = [item for item in items if item.id not in done]
+        
+        results: Dict[str, PromptCategorizeBulkResult] = {}
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+        pending = items
+        max_items = self.max_items_per_call
+        
+        for attempt in range(self.max_retries + 1):
+            if not pending:
+                break
+            final = attempt == self.max_retries
+            
+            async def run_pack(pack: List[PromptCategorizeBulkItem]) -> List[PromptCategorizeBulkResult]:
+                async with semaphore:
+                    pack_results = await self._categorize_pack(pack)
+                # Record successes now; failures only once they won't be retried
+                recorded = [r for r in pack_results if r.success or final]
+                if checkpoint is not None and recorded:
+                    checkpoint.append(recorded)
+                return pack_results
+            
+            packs = self.pack(pending, max_items)
+            pack_results = await asyncio.gather(*(run_pack(pack) for pack in packs))
+            
+            failed = set()
+            for result in (r for batch in pack_results for r in batch):
+                results[result.id] = result
+                if not result.success:
+                    failed.add(result.id)
+            
+            pending = [item for item in pending if item.id in failed]
+            max_items = max(1, max_items // 2)
+        
+        return [results[item.id] for item in items if item.id in results]
+    
+    async def _categorize_pack(
+        self,
+        pack: List[PromptCategorizeBulkItem]
+    ) -> List[PromptCategorizeBulkResult]:
+        """
+        Categorize one pack of prompts with a single model call.
+        
+        Returns:
+            One result per prompt in the pack.
+        """
+        numbered = "\n\n".join(
+            f"Prompt {number}:\n{item.prompt_text}"
+            for number, item in enumerate(pack, start=1)
+        )
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": numbered}
+        ]
+        
+        kwargs: Dict[str, Any] = {}
+        config = settings.model_configs.get(self.model)
+        if config is not None and config.provider == "openai":
+            # Constrain the reply to a JSON object
+            kwargs["response_format"] = {"type": "json_object"}
+        
+        self.calls += 1
+        response = await model_orchestrator.generate_completion(
+            messages=messages,
+            model=self.model,
+            temperature=0.3,  # Lower temperature for more consistent results
+            max_tokens=REPLY_TOKENS_BASE + REPLY_TOKENS_PER_ITEM * len(pack),
+            priority=self.priority,
+            **kwargs
+        )
+        
+        if response.get("error", False):
+            error = response.get("message", "Failed to categorize prompts")
+            return [self._failure(item, error) for item in pack]
+        
+        content = response["choices"][0]["message"]["content"] or ""
+        try:
+            categories_by_number = self._parse(content)
+        except ValueError as e:
+            return [self._failure(item, f"Invalid response: {str(e)}") for item in pack]
+        
+        results = []
+        for number, item in enumerate(pack, start=1):
+            categories = categories_by_number.get(str(number))
+            if categories:
+                results.append(PromptCategorizeBulkResult(
+                    id=item.id,
+                    suggested_categories=categories,
+                    success=True
+                ))
+            else:
+                results.append(self._failure(item, "No categories returned for prompt"))
+        return results
+    
+    @staticmethod
+    def _parse(content: str) -> Dict[str, List[str]]:
+        """
+        Parse the model's JSON reply into categories keyed by prompt number.
+        
+        Raises:
+            ValueError: If the reply is not the expected JSON object.
+        """
+        # Tolerate replies wrapped in a markdown code block
+        match = re.search(r"```(?:json)?\s*(.*?)\s*```", content, re.DOTALL)
+        if match:
+            content = match.group(1)
+        
+        data = json.loads(content)
+        entries = data.get("results") if isinstance(data, dict) else data
+        if not isinstance(entries, list):
+            raise ValueError("expected a list of results")
+        
+        categories_by_number: Dict[str, List[str]] = {}
+        for entry in entries:
+            if not isinstance(entry, dict) or not isinstance(entry.get("categories"), list):
+                continue
+            categories = [str(c).strip() for c in entry["categories"] if str(c).strip()]
+            categories_by_number[str(entry.get("id")).strip()] = categories[:MAX_CATEGORIES]
+        return categories_by_number
+    
+    @staticmethod
+    def _failure(item: PromptCategorizeBulkItem, error: str) -> PromptCategorizeBulkResult:
+        return PromptCategorizeBulkResult(
+            id=item.id,
+            suggested_categories=[],
+            success=False,
+            error=error
+        )
+
+
+def _read_items(path: str) -> List[PromptCategorizeBulkItem]:
+    """
+    Read prompts from a JSONL file.
+    """
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            items.append(PromptCategorizeBulkItem(
+                id=str(record["id"]),
+                prompt_text=record.get("prompt_text") or record.get("content") or ""
+            ))
+    return items
+
+
+async def _main(args: argparse.Namespace) -> None:
+    items = _read_items(args.input)
+    categorizer = BulkPromptCategorizer(model=args.model, concurrency=args.concurrency)
+    results = await categorizer.categorize(items, CategorizationCheckpoint(args.output))
+    
+    succeeded = sum(1 for result in results if result.success)
+    print(
+        f"Categorized {succeeded}/{len(results)} prompts in {categorizer.calls} model calls "
+        f"({len(items) - len(results)} already done)"
+    )
+    await model_orchestrator.aclose()
+
+
+if __name__ == "__main__":
+    # Register the model services with the orchestrator, as app.main does
+    import app.services.openai_service  # noqa: F401
+    import app.services.anthropic_service  # noqa: F401
+    
+    parser = argparse.ArgumentParser(description="Categorize a prompt library in bulk.")
+    parser.add_argument("input", help="JSONL file of prompts with id and prompt_text (or content)")
+    parser.add_argument("output", help="JSONL checkpoint and results file; rerun to resume")
+    parser.add_argument("--model", default=None, help="Model to use (defaults to DEFAULT_MODEL)")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.prompt_bulk_concurrency,
+        help="Maximum model calls in flight"
+    )
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,247 @@
+import asyncio
+import copy
+import hashlib
+import json
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Union
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.supabase_client import supabase_admin, execute_query
+
+
+class CompletionCacheStore(ABC):
+    """
+    Abstract persistent tier for the completion cache.
+    """
+    
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a cached response.
+        
+        Args:
+            key: The request fingerprint.
+        
+        Returns:
+            The cached response, or None if missing or expired.
+        """
+        pass
+    
+    @abstractmethod
+    async def set(self, key: str, response: Dict[str, Any], ttl: float) -> None:
+        """
+        Store a response.
+        
+        Args:
+            key: The request fingerprint.
+            response: The completion response.
+            ttl: Seconds the entry stays valid.
+        """
+        pass
+
+
+class SupabaseCompletionCacheStore(CompletionCacheStore):
+    """
+    Persistent completion cache tier backed by the ``completion_cache`` table.
+    """
+    
+    def __init__(self):
+        self.table_name = "completion_cache"
+    
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        response = await execute_query(
+            supabase_admin.table(self.table_name)
+            .select("response")
+            .eq("key", key)
+            .gt("expires_at", datetime.now(timezone.utc).isoformat())
+            .limit(1)
+        )
+        if response.data:
+            return response.data[0]["response"]
+        return None
+    
+    async def set(self, key: str, response: Dict[str, Any], ttl: float) -> None:
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        await execute_query(
+            supabase_admin.table(self.table_name).upsert({
+                "key": key,
+                "response": response,
+                "expires_at": expires_at.isoformat()
+            })
+        )
+
+
+class CompletionCache:
+    """
+    Two-tier cache for completions of deterministic requests.
+    
+    Requests are keyed on a canonical hash of the model, messages, sampling
+    parameters and tools. Lookups hit the in-memory tier first and then the
+    optional persistent tier, promoting persistent hits into memory.
+    """
+    
+    def __init__(
+        self,
+        enabled: bool = settings.completion_cache_enabled,
+        max_entries: int = settings.completion_cache_max_entries,
+        ttl: float = settings.completion_cache_ttl,
+        max_temperature: float = settings.completion_cache_max_temperature,
+        max_entry_bytes: int = settings.completion_cache_max_entry_bytes,
+        store: Optional[CompletionCacheStore] = None
+    ):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_temperature = max_temperature
+        self.max_entry_bytes = max_entry_bytes
+        self.memory = TTLCache(maxsize=max_entries, ttl=ttl)
+        self.store = store
+        self.store_hits = 0
+        self._store_writes = set()
+    
+    def set_store(self, store: Optional[CompletionCacheStore]) -> None:
+        """
+        Plug in (or remove) the persistent tier.
+        
+        Args:
+            store: The persistent store, or None for memory only.
+        """
+        self.store = store
+    
+    def is_eligible(
+        self,
+        temperature: float,
+        stream: bool = False,
+        use_cache: Optional[bool] = None
+    ) -> bool:
+        """
+        Check whether a request may be served from or stored in the cache.
+        
+        Args:
+            temperature: The sampling temperature.
+            stream: Whether the request is streamed.
+            use_cache: True to opt in regardless of temperature, False to bypass,
+                None to cache only low-temperature requests.
+        
+        Returns:
+            True if the cache applies.
+        """
+        if not self.enabled or stream or use_cache is False:
+            return False
+        if use_cache:
+            return True
+        return temperature is not None and temperature <= self.max_temperature
+    
+    def make_key(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        temperature: float,
+        max_tokens: Optional[int],
+        tools: Optional[List[Dict[str, Any]]],
+        tool_choice: Optional[Union[str, Dict[str, Any]]],
+        params: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Build a canonical fingerprint for a request.
+        
+        Returns:
+            A hex SHA-256 digest.
+        """
+        canonical = json.dumps(
+            {
+                "model": model,
+                "messages": messages,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+                "tools": tools,
+                "tool_choice": tool_choice,
+                "params": params or {},
+            },
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+    
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a response in memory, then in the persistent tier.
+        
+        Args:
+            key: The request fingerprint.
+        
+        Returns:
+            A copy of the cached response, or None on a miss.
+        """
+        response = self.memory.get(key)
+        
+        if response is None and self.store is not None:
+            try:
+                response = await self.store.get(key)
+            except Exception as e:
+                print(f"Error reading completion cache store: {str(e)}")
+                response = None
+            if response is not None:
+                self.store_hits += 1
+                self.memory.set(key, response)
+        
+        return copy.deepcopy(response) if response is not None else None
+    
+    async def set(self, key: str, response: Dict[str, Any]) -> None:
+        """
+        Store a successful response in both tiers.
+        
+        Responses larger than ``max_entry_bytes`` are not cached. The write
+        to the persistent tier runs in the background, off the response path.
+        
+        Args:
+            key: The request fingerprint.
+            response: The completion response.
+        """
+        encoded = json.dumps(response, default=str)
+        if len(encoded) > self.max_entry_bytes:
+            return
+        
+        # Store a plain-dict snapshot so later mutation by callers can't leak in
+        snapshot = json.loads(encoded)
+        self.memory.set(key, snapshot)
+        
+        if self.store is not None:
+            task = asyncio.get_running_loop().create_task(self._write_store(key, snapshot))
+            self._store_writes.add(task)
+            task.add_done_callback(self._store_writes.discard)
+    
+    async def _write_store(self, key: str, snapshot: Dict[str, Any]) -> None:
+        """
+        Write an entry to the persistent tier, logging failures.
+        """
+        try:
+            await self.store.set(key, snapshot, self.ttl)
+        except Exception as e:
+            print(f"Error writing completion cache store: {str(e)}")
+    
+    async def aclose(self) -> None:
+        """
+        Wait for background writes to the persistent tier to finish.
+        
+        Called on shutdown, before the query executor and Supabase clients
+        the writes run on are closed.
+        """
+        if self._store_writes:
+            await asyncio.gather(*self._store_writes, return_exceptions=True)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters.
+        
+        Returns:
+            Dict of memory tier statistics plus persistent tier hits.
+        """
+        return {**self.memory.stats(), "store_hits": self.store_hits}
+
+
+# Create a global instance
+completion_cache = CompletionCache(
+    store=SupabaseCompletionCacheStore() if settings.completion_cache_persistent else None
+)
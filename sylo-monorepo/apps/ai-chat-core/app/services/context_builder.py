@@ -0,0 +1,129 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.services.tokenizer import count_messages_tokens, count_text_tokens, REPLY_PRIMING_TOKENS
+
+
+class ContextOverflowError(ValueError):
+    """
+    Raised when the messages that must be sent don't fit the model's context.
+    """
+    
+    def __init__(self, tokens: int, budget: int):
+        super().__init__(
+            f"Request needs {tokens} prompt tokens but the model allows {budget}"
+        )
+        self.tokens = tokens
+        self.budget = budget
+
+
+class ContextBuilder:
+    """
+    Assembles the messages sent to a model within its token budget.
+    """
+    
+    def budget(
+        self,
+        model: str,
+        max_tokens: Optional[int] = None,
+        tools: Optional[List[Dict[str, Any]]] = None
+    ) -> int:
+        """
+        Get the number of prompt tokens available for a request.
+        
+        Args:
+            model: The model identifier.
+            max_tokens: Tokens reserved for the reply.
+            tools: Tool definitions sent with the request.
+        
+        Returns:
+            The prompt token budget.
+        """
+        config = settings.model_configs.get(model)
+        context_window = config.context_window if config else 8192
+        reserved = max_tokens if max_tokens is not None else settings.default_max_tokens
+        
+        budget = context_window - reserved - REPLY_PRIMING_TOKENS
+        if tools:
+            budget -= count_text_tokens(json.dumps(tools), model)
+        return budget
+    
+    def build(
+        self,
+        model: str,
+        history: List[Dict[str, Any]],
+        new_messages: List[Dict[str, Any]],
+        max_tokens: Optional[int] = None,
+        tools: Optional[List[Dict[str, Any]]] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Pack system messages, the current turn and as much recent history as fits.
+        
+        System messages and the new messages of the current turn are always
+        kept. History is then added newest first until the budget of
+        ``context_window - max_tokens`` is used up. Per-message token counts
+        are cached on the input dicts under ``token_counts``.
+        
+        System messages of the current turn are placed with the stored ones,
+        ahead of the history, so a system prompt resent on every turn stays
+        part of the stable prefix that providers cache.
+        
+        Args:
+            model: The model identifier.
+            history: Previous messages in the session, oldest first.
+            new_messages: Messages of the current turn, oldest first.
+            max_tokens: Tokens reserved for the reply.
+            tools: Tool definitions sent with the request.
+        
+        Returns:
+            The messages to send, oldest first, with only role and content,
+            and their prompt token count.
+        
+        Raises:
+            ContextOverflowError: If the system messages and current turn
+                alone exceed the budget.
+        """
+        budget = self.budget(model, max_tokens, tools)
+        
+        system_messages = [m for m in history if m["role"] == "system"]
+        conversation = [m for m in history if m["role"] != "system"]
+        
+        # Tokenize everything not yet counted in one batch
+        required = system_messages + new_messages
+        required_tokens = sum(count_messages_tokens(required, model))
+        if required_tokens > budget:
+            raise ContextOverflowError(required_tokens, budget)
+        conversation_tokens = count_messages_tokens(conversation, model)
+        remaining = budget - required_tokens
+        
+        # Walk history from newest to oldest until the budget runs out
+        selected = []
+        for message, tokens in zip(reversed(conversation), reversed(conversation_tokens)):
+            if tokens > remaining:
+                break
+            remaining -= tokens
+            selected.append(message)
+        selected.reverse()
+        
+        new_system = [m for m in new_messages if m["role"] == "system"]
+        new_conversation = [m for m in new_messages if m["role"] != "system"]
+        messages = [
+            self._strip(message)
+            for message in system_messages + new_system + selected + new_conversation
+        ]
+        return messages, budget - remaining + REPLY_PRIMING_TOKENS
+    
+    @staticmethod
+    def _strip(message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Drop bookkeeping keys and unset fields before a message is sent.
+        """
+        return {
+            key: value
+            for key, value in message.items()
+            if key != "token_counts" and value is not None
+        }
+
+
+# Create a global instance
+context_builder = ContextBuilder()
@@ -1,6 +1,22 @@
-from typing import List, Dict, Any, Optional, Union
+import asyncio
+import time
+from typing import List, Dict, Any, Optional, Union, AsyncIterator, Awaitable, Callable, Tuple
 from abc import ABC, abstractmethod
 from app.core.config import settings, ModelConfig
+from app.core.singleflight import SingleFlight
+from app.core.stats import LatencyHistogram
+from app.core.metrics import model_cost, model_tokens, orchestrator_duration, provider_duration
+from app.core.tracing import tracer, Span, SPAN_KIND_CLIENT
+from app.core.circuit_breaker import CircuitBreaker, CircuitBreakerRegistry, Permit
+from app.core.rate_limiter import (
+    AdaptiveLimiter,
+    DEFAULT_PRIORITY,
+    RateLimiterRegistry,
+    RateLimitExceeded,
+)
+from app.services.tokenizer import estimate_cost, estimate_request_tokens
+from app.services.completion_cache import completion_cache
+from app.services.prompt_cache import normalize_usage
 
 
 class ModelService(ABC):
@@ -32,12 +48,44 @@ class ModelService(ABC):
             tool_choice: Control when the model calls functions.
             stream: Whether to stream the response.
             **kwargs: Additional model-specific parameters.
-            
+        
         Returns:
             Dict containing the API response.
         """
         pass
     
+    @abstractmethod
+    def stream_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_choice: Optional[Union[str, Dict[str, Any]]] = None,
+        **kwargs
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a completion using the AI model.
+        
+        Implementations are async generators yielding OpenAI-style
+        ``chat.completion.chunk`` dicts. Errors are yielded as a single
+        ``{"error": True, ...}`` dict and end the stream.
+        
+        Args:
+            messages: List of message objects with role and content.
+            model: The model to use.
+            temperature: Controls randomness (0-1).
+            max_tokens: Maximum number of tokens to generate.
+            tools: List of tools available to the model.
+            tool_choice: Control when the model calls functions.
+            **kwargs: Additional model-specific parameters.
+        
+        Yields:
+            Dicts containing streamed completion chunks.
+        """
+        pass
+    
     @abstractmethod
     async def get_model_info(self, model: str) -> ModelConfig:
         """
@@ -45,7 +93,7 @@ class ModelService(ABC):
         
         Args:
             model: The model identifier.
-            
+        
         Returns:
             ModelConfig object containing model information.
         """
@@ -58,22 +106,70 @@ class ModelService(ABC):
         
         Args:
             model: The model identifier.
-            
+        
         Returns:
             True if the model is supported, False otherwise.
         """
         pass
+    
+    async def aclose(self) -> None:
+        """
+        Release any resources (e.g. HTTP connection pools) held by the service.
+        """
+        pass
+
+
+# Error types caused by the request itself, which another model won't fix
+NON_RETRYABLE_ERROR_TYPES = {"InvalidRequestError", "ValidationError"}
+
+# HTTP statuses caused by the request itself
+NON_RETRYABLE_STATUS_CODES = {400, 413, 422}
+
+# Error types providers use for rate limiting
+RATE_LIMIT_ERROR_TYPES = {"RateLimitError", "RateLimitExceeded"}
+
+# Errors raised locally before a provider is reached, which say nothing about its health
+LOCAL_ERROR_TYPES = {"RateLimitExceeded", "CircuitOpenError"}
 
 
 class ModelOrchestrator:
     """
     Orchestrates requests between different model providers.
+    
+    Requests that fail or time out are retried on the next compatible model,
+    ordered by the caller's preferred models and then by ``ModelConfig.priority``.
+    Optionally, a hedged request is sent to the next model once the primary
+    has been running longer than its usual (p95) latency. Provider calls are
+    scheduled through per-model and per-provider adaptive rate limiters, and
+    each provider has a circuit breaker so calls to a failing provider are
+    rejected immediately.
     """
     
     def __init__(self):
         self.services = {}
         self.model_configs = settings.model_configs
         self.available_models = settings.available_models
+        self.coalescer = SingleFlight()
+        self.latency: Dict[str, LatencyHistogram] = {}
+        self.fallbacks = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.rate_limiters = RateLimiterRegistry(
+            max_concurrency=settings.rate_limit_max_concurrency,
+            min_concurrency=settings.rate_limit_min_concurrency,
+            queue_timeout=settings.rate_limit_queue_timeout,
+            default_retry_after=settings.rate_limit_default_retry_after
+        )
+        self.breakers = CircuitBreakerRegistry(
+            failure_rate_threshold=settings.circuit_failure_rate_threshold,
+            min_calls=settings.circuit_min_calls,
+            consecutive_failures=settings.circuit_consecutive_failures,
+            window=settings.circuit_window_seconds,
+            open_seconds=settings.circuit_open_seconds,
+            max_open_seconds=settings.circuit_max_open_seconds,
+            half_open_probes=settings.circuit_half_open_probes,
+            slow_call_seconds=settings.circuit_slow_call_seconds
+        )
     
     def register_service(self, provider: str, service: ModelService):
         """
@@ -85,13 +181,22 @@ class ModelOrchestrator:
         """
         self.services[provider] = service
     
+    async def aclose(self) -> None:
+        """
+        Close all registered model services and wait for pending completion
+        cache writes. Called on application shutdown.
+        """
+        await completion_cache.aclose()
+        for service in self.services.values():
+            await service.aclose()
+    
     def get_service_for_model(self, model: str) -> Optional[ModelService]:
         """
         Get the appropriate service for a specific model.
         
         Args:
             model: The model identifier.
-            
+        
         Returns:
             The appropriate ModelService instance, or None if not found.
         """
@@ -101,6 +206,89 @@ class ModelOrchestrator:
         provider = self.model_configs[model].provider
         return self.services.get(provider)
     
+    def get_candidate_models(
+        self,
+        model: str,
+        fallback_models: Optional[List[str]] = None,
+        tools: Optional[List[Dict[str, Any]]] = None
+    ) -> List[str]:
+        """
+        Get the models to try for a request, in order.
+        
+        The requested model comes first, then the caller's fallback models,
+        then the remaining available models by priority. Fallback models
+        without a registered service, without tool support when tools are
+        used, or whose provider circuit is open are skipped.
+        
+        Args:
+            model: The requested model.
+            fallback_models: Preferred models to try next, in order.
+            tools: Tools sent with the request.
+        
+        Returns:
+            Candidate model identifiers, at most ``model_fallback_max_attempts``.
+        """
+        if not settings.enable_model_fallback:
+            return [model]
+        
+        by_priority = sorted(
+            self.available_models,
+            key=lambda name: self.model_configs[name].priority
+        )
+        
+        candidates = [model]
+        for name in list(fallback_models or []) + by_priority:
+            if name in candidates or name not in self.available_models:
+                continue
+            if self.get_service_for_model(name) is None:
+                continue
+            if tools and not self.model_configs[name].supports_tools:
+                continue
+            if self._is_provider_down(name):
+                continue
+            candidates.append(name)
+        
+        return candidates[:max(1, settings.model_fallback_max_attempts)]
+    
+    def health_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the circuit state and health score of every registered provider.
+        
+        Returns:
+            Dict of provider health keyed by provider name.
+        """
+        return {
+            provider: self.breakers.get(provider).health()
+            for provider in self.services
+        }
+    
+    def rate_limit_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the state of every provider and model rate limiter.
+        
+        Returns:
+            Dict of limiter statistics keyed by limiter name.
+        """
+        return self.rate_limiters.stats()
+    
+    def latency_stats(self) -> Dict[str, Any]:
+        """
+        Get per-model latency summaries and routing counters.
+        
+        Returns:
+            Dict with latency snapshots per model, fallbacks, hedged requests
+            and hedged requests that won.
+        """
+        return {
+            "models": {
+                model: histogram.snapshot()
+                for model, histogram in self.latency.items()
+            },
+            "fallbacks": self.fallbacks,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+        }
+    
     async def generate_completion(
         self,
         messages: List[Dict[str, str]],
@@ -110,11 +298,20 @@ class ModelOrchestrator:
         tools: Optional[List[Dict[str, Any]]] = None,
         tool_choice: Optional[Union[str, Dict[str, Any]]] = None,
         stream: bool = False,
+        use_cache: Optional[bool] = None,
+        fallback_models: Optional[List[str]] = None,
+        priority: int = DEFAULT_PRIORITY,
         **kwargs
     ) -> Dict[str, Any]:
         """
         Generate a completion using the appropriate model service.
         
+        Low-temperature requests are served from the completion cache when an
+        identical request has been answered before, and identical requests
+        that are in flight at the same time share a single upstream call.
+        Failed or timed-out calls fall back to the next candidate model; the
+        model that served the request is returned under ``model``.
+        
         Args:
             messages: List of message objects with role and content.
             model: The model to use (defaults to settings.default_model).
@@ -123,8 +320,12 @@ class ModelOrchestrator:
             tools: List of tools available to the model.
             tool_choice: Control when the model calls functions.
             stream: Whether to stream the response.
+            use_cache: True to cache regardless of temperature, False to bypass
+                the cache, None to cache only low-temperature requests.
+            fallback_models: Preferred models to fall back to, in order.
+            priority: Scheduling priority when rate limited; lower is served first.
             **kwargs: Additional model-specific parameters.
-            
+        
         Returns:
             Dict containing the API response.
         """
@@ -149,11 +350,14 @@ class ModelOrchestrator:
                 "type": "ServiceNotAvailableError"
             }
         
-        # Generate completion
-        try:
-            return await service.generate_completion(
+        candidates = self.get_candidate_models(model, fallback_models, tools)
+        started = time.perf_counter()
+        
+        async def call_model(candidate: str) -> Dict[str, Any]:
+            return await self._call_model(
+                candidate,
+                priority,
                 messages=messages,
-                model=model,
                 temperature=temperature,
                 max_tokens=max_tokens,
                 tools=tools,
@@ -161,12 +365,606 @@ class ModelOrchestrator:
                 stream=stream,
                 **kwargs
             )
+        
+        async def call_service() -> Dict[str, Any]:
+            return await self._route(candidates, call_model)
+        
+        # Streamed responses can't be shared, so call the provider directly
+        if stream:
+            response = await call_model(model)
+            orchestrator_duration.labels(model, "upstream").observe(time.perf_counter() - started)
+            return response
+        
+        fingerprint = completion_cache.make_key(
+            model, messages, temperature, max_tokens, tools, tool_choice, kwargs
+        )
+        
+        # Serve repeated deterministic requests from the cache
+        cacheable = completion_cache.is_eligible(temperature, stream, use_cache)
+        if cacheable:
+            cached = await completion_cache.get(fingerprint)
+            if cached is not None:
+                orchestrator_duration.labels(model, "cache").observe(time.perf_counter() - started)
+                return cached
+        
+        # Concurrent identical requests share one upstream call
+        if settings.enable_request_coalescing:
+            response = await self.coalescer.do(fingerprint, call_service)
+        else:
+            response = await call_service()
+        
+        # The key names the requested model, so a fallback's reply isn't cached
+        # under it; it would keep being served after the model recovers
+        if cacheable and not response.get("error", False) and response.get("model") == model:
+            await completion_cache.set(fingerprint, response)
+        
+        orchestrator_duration.labels(model, "upstream").observe(time.perf_counter() - started)
+        return response
+    
+    async def stream_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_choice: Optional[Union[str, Dict[str, Any]]] = None,
+        fallback_models: Optional[List[str]] = None,
+        priority: int = DEFAULT_PRIORITY,
+        **kwargs
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a completion using the appropriate model service.
+        
+        If a model fails before producing its first chunk, the stream falls
+        back to the next candidate model. Once content has been sent, errors
+        are passed through.
+        
+        Args:
+            messages: List of message objects with role and content.
+            model: The model to use (defaults to settings.default_model).
+            temperature: Controls randomness (0-1).
+            max_tokens: Maximum number of tokens to generate.
+            tools: List of tools available to the model.
+            tool_choice: Control when the model calls functions.
+            fallback_models: Preferred models to fall back to, in order.
+            priority: Scheduling priority when rate limited; lower is served first.
+            **kwargs: Additional model-specific parameters.
+        
+        Yields:
+            OpenAI-style completion chunks, or a single error dict.
+        """
+        # Use default model if not specified
+        if not model:
+            model = settings.default_model
+        
+        # Check if model is available
+        if model not in self.available_models:
+            yield {
+                "error": True,
+                "message": f"Model '{model}' is not available. Available models: {', '.join(self.available_models)}",
+                "type": "ModelNotAvailableError"
+            }
+            return
+        
+        # Get the appropriate service
+        service = self.get_service_for_model(model)
+        if not service:
+            yield {
+                "error": True,
+                "message": f"No service available for model '{model}'",
+                "type": "ServiceNotAvailableError"
+            }
+            return
+        
+        candidates = self.get_candidate_models(model, fallback_models, tools)
+        
+        for attempt, candidate in enumerate(candidates):
+            if attempt > 0:
+                self.fallbacks += 1
+            
+            chunks = self._stream_model(
+                candidate,
+                priority,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                tools=tools,
+                tool_choice=tool_choice,
+                **kwargs
+            )
+            try:
+                # Wait for the first chunk to decide whether to fall back
+                try:
+                    first = await asyncio.wait_for(
+                        chunks.__anext__(), settings.model_attempt_timeout
+                    )
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    first = self._timeout_error(candidate)
+                
+                if self._should_fall_back(first) and attempt < len(candidates) - 1:
+                    continue
+                
+                yield first
+                async for chunk in chunks:
+                    yield chunk
+                return
+            finally:
+                await chunks.aclose()
+    
+    async def _call_model(self, model: str, priority: int, **params) -> Dict[str, Any]:
+        """
+        Call one model through its provider's circuit breaker, traced as a
+        client span.
+        
+        Returns:
+            The response with the serving model under ``model``, or an error
+            dict. Fails immediately while the provider's circuit is open.
+        """
+        with tracer.span(f"chat {model}", SPAN_KIND_CLIENT, self._span_attributes(model)) as span:
+            breaker = self._breaker_for(model)
+            permit = breaker.allow_request() if breaker is not None else None
+            if breaker is None:
+                response = await self._invoke_model(model, priority, **params)
+            elif permit is None:
+                response = self._circuit_open_error(model)
+            else:
+                started = time.perf_counter()
+                response = None
+                try:
+                    response = await self._invoke_model(model, priority, **params)
+                finally:
+                    self._record_health(breaker, permit, response, time.perf_counter() - started)
+            
+            self._annotate_span(span, response)
+            return response
+    
+    async def _invoke_model(self, model: str, priority: int, **params) -> Dict[str, Any]:
+        """
+        Call one model within its rate limits and the attempt timeout,
+        recording its latency.
+        
+        Returns:
+            The response with the serving model under ``model``, or an error dict.
+        """
+        service = self.get_service_for_model(model)
+        limiters = self._limiters_for(model)
+        estimated = estimate_request_tokens(params["messages"], params.get("max_tokens"))
+        
+        try:
+            async with self.rate_limiters.slot(limiters, estimated, priority):
+                started = time.perf_counter()
+                if limiters:
+                    self._span_event("rate_limit.admitted")
+                response = await asyncio.wait_for(
+                    service.generate_completion(model=model, **params),
+                    settings.model_attempt_timeout
+                )
+        except RateLimitExceeded as e:
+            return self._rate_limit_error(str(e), e.retry_after)
+        except asyncio.TimeoutError:
+            self._record_provider_latency(model, "timeout", time.perf_counter() - started)
+            return self._timeout_error(model)
         except Exception as e:
             return {
                 "error": True,
                 "message": str(e),
                 "type": type(e).__name__
             }
+        
+        if not isinstance(response, dict):
+            return response
+        
+        elapsed = time.perf_counter() - started
+        self._record_outcome(limiters, response, estimated)
+        if response.get("error", False):
+            self._record_provider_latency(model, "error", elapsed)
+        else:
+            self.latency.setdefault(model, LatencyHistogram()).observe(elapsed)
+            self._record_provider_latency(model, "success", elapsed)
+            response["usage"] = normalize_usage(response.get("usage"))
+            self._record_usage(model, response["usage"])
+            response["model"] = model
+        return response
+    
+    async def _stream_model(self, model: str, priority: int, **params) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream from one model through its provider's circuit breaker and rate
+        limits, tagging chunks with the serving model and turning exceptions
+        into an error chunk. The stream is traced as a client span.
+        """
+        with tracer.span(f"chat {model}", SPAN_KIND_CLIENT, self._span_attributes(model)) as span:
+            span.set_attribute("gen_ai.request.stream", True)
+            chunks = self._stream_model_chunks(span, model, priority, **params)
+            try:
+                async for chunk in chunks:
+                    yield chunk
+            finally:
+                # Release the limiter slot and breaker probe as soon as the consumer stops
+                await chunks.aclose()
+    
+    async def _stream_model_chunks(
+        self,
+        span: Span,
+        model: str,
+        priority: int,
+        **params
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream from one model, recording the outcome on ``span``.
+        """
+        breaker = self._breaker_for(model)
+        permit = breaker.allow_request() if breaker is not None else None
+        if breaker is not None and permit is None:
+            outcome = self._circuit_open_error(model)
+            self._annotate_span(span, outcome)
+            yield outcome
+            return
+        
+        service = self.get_service_for_model(model)
+        limiters = self._limiters_for(model)
+        estimated = estimate_request_tokens(params["messages"], params.get("max_tokens"))
+        started = time.perf_counter()
+        # Final outcome of the stream: the error chunk, or usage on success
+        outcome = None
+        
+        try:
+            try:
+                async with self.rate_limiters.slot(limiters, estimated, priority):
+                    admitted = time.perf_counter()
+                    usage = None
+                    first = True
+                    async for chunk in service.stream_completion(model=model, **params):
+                        if chunk.get("error", False):
+                            outcome = chunk
+                        else:
+                            if first:
+                                span.add_event("first_chunk")
+                                first = False
+                            chunk["model"] = model
+                            if chunk.get("usage"):
+                                # Count it now: the final usage chunk may be
+                                # the last one the consumer reads before closing
+                                chunk["usage"] = usage = normalize_usage(chunk["usage"])
+                                self._record_usage(model, usage)
+                        yield chunk
+                    if outcome is None:
+                        outcome = {"usage": usage}
+            except RateLimitExceeded as e:
+                outcome = self._rate_limit_error(str(e), e.retry_after)
+                self._annotate_span(span, outcome)
+                yield outcome
+                return
+            except Exception as e:
+                outcome = {
+                    "error": True,
+                    "message": str(e),
+                    "type": type(e).__name__
+                }
+                self._annotate_span(span, outcome)
+                yield outcome
+                return
+            
+            self._record_outcome(limiters, outcome, estimated)
+            self._annotate_span(span, outcome)
+            elapsed = time.perf_counter() - admitted
+            if outcome.get("error", False):
+                self._record_provider_latency(model, "error", elapsed)
+            else:
+                self._record_provider_latency(model, "success", elapsed)
+        finally:
+            # Streams closed early by the consumer leave ``outcome`` unset
+            if breaker is not None:
+                self._record_health(breaker, permit, outcome, time.perf_counter() - started)
+    
+    def _limiters_for(self, model: str) -> Tuple[AdaptiveLimiter, ...]:
+        """
+        Get the model and provider limiters a call to a model must pass.
+        """
+        if not settings.enable_rate_limiting:
+            return ()
+        
+        config = self.model_configs[model]
+        return (
+            self.rate_limiters.get(
+                f"{config.provider}:{model}",
+                requests_per_minute=config.requests_per_minute,
+                tokens_per_minute=config.tokens_per_minute
+            ),
+            self.rate_limiters.get(config.provider),
+        )
+    
+    def _is_provider_down(self, model: str) -> bool:
+        """
+        Check whether a model's provider circuit is currently open.
+        """
+        breaker = self.breakers.peek(self.model_configs[model].provider)
+        return breaker is not None and breaker.is_open()
+    
+    def _breaker_for(self, model: str) -> Optional[CircuitBreaker]:
+        """
+        Get the circuit breaker of a model's provider.
+        """
+        if not settings.enable_circuit_breaker:
+            return None
+        return self.breakers.get(self.model_configs[model].provider)
+    
+    def _record_health(
+        self,
+        breaker: CircuitBreaker,
+        permit: Permit,
+        response: Optional[Dict[str, Any]],
+        latency: float
+    ) -> None:
+        """
+        Feed a call's outcome into its provider's circuit breaker.
+        
+        Provider errors and timeouts count as failures. Cancelled calls,
+        local rate limiting, provider rate limits and errors caused by the
+        request itself don't reflect provider health and are ignored.
+        """
+        if response is None or not isinstance(response, dict):
+            breaker.record_ignored(permit)
+        elif not response.get("error", False):
+            breaker.record_success(latency, permit)
+        elif (
+            response.get("type") in LOCAL_ERROR_TYPES
+            or self._is_rate_limited(response)
+            or not self._should_fall_back(response)
+        ):
+            breaker.record_ignored(permit)
+        else:
+            breaker.record_failure(latency, permit)
+    
+    def _span_attributes(self, model: str) -> Dict[str, Any]:
+        """
+        Get the span attributes identifying a model call.
+        """
+        return {
+            "gen_ai.operation.name": "chat",
+            "gen_ai.system": self.model_configs[model].provider,
+            "gen_ai.request.model": model,
+        }
+    
+    @staticmethod
+    def _span_event(name: str) -> None:
+        """
+        Add an event to the current span, if any.
+        """
+        span = tracer.current_span()
+        if span is not None:
+            span.add_event(name)
+    
+    @staticmethod
+    def _annotate_span(span: Span, response: Optional[Dict[str, Any]]) -> None:
+        """
+        Record a model response's usage or error on its span.
+        """
+        if not span.recording or not isinstance(response, dict):
+            return
+        
+        if response.get("error", False):
+            span.set_attributes({
+                "error.type": response.get("type"),
+                "http.response.status_code": response.get("status_code"),
+            })
+            span.set_status(False, response.get("message"))
+            return
+        
+        usage = response.get("usage") or {}
+        span.set_attributes({
+            "gen_ai.response.model": response.get("model"),
+            "gen_ai.usage.input_tokens": usage.get("prompt_tokens"),
+            "gen_ai.usage.output_tokens": usage.get("completion_tokens"),
+            "gen_ai.usage.cache_read_tokens": usage.get("cache_read_tokens"),
+            "gen_ai.usage.cache_write_tokens": usage.get("cache_write_tokens"),
+        })
+    
+    def _record_provider_latency(self, model: str, outcome: str, seconds: float) -> None:
+        """
+        Record the duration of one provider call.
+        """
+        provider = self.model_configs[model].provider
+        provider_duration.labels(provider, model, outcome).observe(seconds)
+    
+    def _record_usage(self, model: str, usage: Optional[Dict[str, Any]]) -> None:
+        """
+        Count the tokens a provider reported and their estimated cost.
+        """
+        if not usage:
+            return
+        
+        provider = self.model_configs[model].provider
+        prompt_tokens = usage.get("prompt_tokens") or 0
+        completion_tokens = usage.get("completion_tokens") or 0
+        cache_read_tokens = usage.get("cache_read_tokens") or 0
+        cache_write_tokens = usage.get("cache_write_tokens") or 0
+        model_tokens.labels(provider, model, "input").inc(prompt_tokens)
+        model_tokens.labels(provider, model, "output").inc(completion_tokens)
+        model_tokens.labels(provider, model, "cache_read").inc(cache_read_tokens)
+        model_tokens.labels(provider, model, "cache_write").inc(cache_write_tokens)
+        model_cost.labels(provider, model).inc(estimate_cost(
+            model, prompt_tokens, completion_tokens, cache_read_tokens, cache_write_tokens
+        ))
+    
+    def _record_outcome(
+        self,
+        limiters: Tuple[AdaptiveLimiter, ...],
+        response: Dict[str, Any],
+        estimated: int
+    ) -> None:
+        """
+        Feed a provider response back into the limiters.
+        
+        Rate-limit errors shrink the model's concurrency and pause it for
+        ``retry-after``; successes grow it and correct the token estimate
+        with the reported usage.
+        """
+        if not limiters:
+            return
+        
+        if self._is_rate_limited(response):
+            retry_after = response.get("retry_after") or self.rate_limiters.default_retry_after
+            limiters[0].record_rate_limited(retry_after)
+        elif not response.get("error", False):
+            usage = response.get("usage") or {}
+            for limiter in limiters:
+                limiter.record_success(estimated, usage.get("total_tokens"))
+    
+    async def _route(
+        self,
+        candidates: List[str],
+        call_model: Callable[[str], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Try candidate models in order until one succeeds.
+        
+        Args:
+            candidates: Models to try, in order.
+            call_model: Coroutine function calling a single model.
+        
+        Returns:
+            The first successful response, or the last error.
+        """
+        response = None
+        index = 0
+        while index < len(candidates):
+            if index > 0:
+                self.fallbacks += 1
+            
+            if settings.enable_hedged_requests and index + 1 < len(candidates):
+                response, attempted = await self._hedged_call(
+                    candidates[index], candidates[index + 1], call_model
+                )
+            else:
+                response, attempted = await call_model(candidates[index]), 1
+            
+            index += attempted
+            if not self._should_fall_back(response):
+                return response
+        
+        return response
+    
+    async def _hedged_call(
+        self,
+        primary: str,
+        backup: str,
+        call_model: Callable[[str], Awaitable[Dict[str, Any]]]
+    ) -> Tuple[Dict[str, Any], int]:
+        """
+        Call the primary model, hedging with the backup if it is slow.
+        
+        The backup is only started once the primary has run past its hedge
+        delay. The first successful response wins and the other call is
+        cancelled.
+        
+        Returns:
+            The response and the number of models attempted.
+        """
+        delay = self._hedge_delay(primary)
+        primary_task = asyncio.ensure_future(call_model(primary))
+        if delay is None:
+            return await primary_task, 1
+        
+        tasks = {primary_task}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return primary_task.result(), 1
+            
+            self.hedges += 1
+            backup_task = asyncio.ensure_future(call_model(backup))
+            tasks.add(backup_task)
+            
+            response = None
+            pending = tasks
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    response = task.result()
+                    if not response.get("error", False):
+                        if task is backup_task:
+                            self.hedge_wins += 1
+                        return response, 2
+            return response, 2
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+    
+    def _hedge_delay(self, model: str) -> Optional[float]:
+        """
+        Get how long to wait before hedging a call to a model.
+        
+        Returns:
+            The model's latency percentile, or None while there are too few
+            samples to estimate it.
+        """
+        histogram = self.latency.get(model)
+        if histogram is None or histogram.count < settings.hedge_min_samples:
+            return None
+        return max(settings.hedge_min_delay, histogram.percentile(settings.hedge_percentile))
+    
+    @staticmethod
+    def _should_fall_back(response: Dict[str, Any]) -> bool:
+        """
+        Check whether an error response should be retried on another model.
+        """
+        if not response.get("error", False):
+            return False
+        if response.get("type") in NON_RETRYABLE_ERROR_TYPES:
+            return False
+        return response.get("status_code") not in NON_RETRYABLE_STATUS_CODES
+    
+    @staticmethod
+    def _is_rate_limited(response: Dict[str, Any]) -> bool:
+        """
+        Check whether an error response is a provider or local rate limit.
+        """
+        if not response.get("error", False):
+            return False
+        return (
+            response.get("status_code") == 429
+            or response.get("type") in RATE_LIMIT_ERROR_TYPES
+        )
+    
+    @staticmethod
+    def _rate_limit_error(message: str, retry_after: Optional[float]) -> Dict[str, Any]:
+        """
+        Build the error returned when a call can't be scheduled in time.
+        """
+        return {
+            "error": True,
+            "message": message,
+            "type": "RateLimitExceeded",
+            "status_code": 429,
+            "retry_after": retry_after
+        }
+    
+    @staticmethod
+    def _circuit_open_error(model: str) -> Dict[str, Any]:
+        """
+        Build the error returned when a model's provider circuit is open.
+        """
+        return {
+            "error": True,
+            "message": f"Provider for model '{model}' is unavailable (circuit open)",
+            "type": "CircuitOpenError",
+            "status_code": 503
+        }
+    
+    @staticmethod
+    def _timeout_error(model: str) -> Dict[str, Any]:
+        """
+        Build the error returned when a model call times out.
+        """
+        return {
+            "error": True,
+            "message": f"Model '{model}' did not respond within {settings.model_attempt_timeout}s",
+            "type": "TimeoutError"
+        }
     
     def get_model_info(self, model: str) -> Optional[ModelConfig]:
         """
@@ -174,7 +972,7 @@ class ModelOrchestrator:
         
         Args:
             model: The model identifier.
-            
+        
         Returns:
             ModelConfig object containing model information, or None if not found.
         """
@@ -185,8 +983,11 @@ class ModelOrchestrator:
         Get a list of all available models with their configurations.
         
         Returns:
-            List of model configurations.
+            List of model configurations, with the circuit state and health
+            score of each model's provider.
         """
+        provider_health = self.health_stats()
+        unknown = {"state": None, "score": None}
         return [
             {
                 "id": model,
@@ -197,6 +998,8 @@ class ModelOrchestrator:
                 "context_window": self.model_configs[model].context_window,
                 "cost_per_1k_input": self.model_configs[model].cost_per_1k_input,
                 "cost_per_1k_output": self.model_configs[model].cost_per_1k_output,
+                "circuit_state": provider_health.get(self.model_configs[model].provider, unknown)["state"],
+                "health_score": provider_health.get(self.model_configs[model].provider, unknown)["score"],
             }
             for model in self.available_models
         ]
@@ -1,13 +1,9 @@
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Union, AsyncIterator
 import openai
 from app.core.config import settings, ModelConfig
+from app.core.rate_limiter import parse_retry_after
 from app.services.model_service import ModelService
 
-# Configure OpenAI API key
-openai.api_key = settings.openai_api_key
-if settings.openai_org_id:
-    openai.organization = settings.openai_org_id
-
 
 class OpenAIService(ModelService):
     """
@@ -23,6 +19,34 @@ class OpenAIService(ModelService):
             for model_id, config in settings.model_configs.items()
             if config.provider == "openai"
         }
+        self._client: Optional[openai.AsyncOpenAI] = None
+    
+    def _get_client(self) -> openai.AsyncOpenAI:
+        """
+        Get the shared OpenAI client, creating it on first use.
+        
+        Retries are left to the orchestrator's rate limiters and model
+        fallback, so the client makes a single attempt per call.
+        
+        Returns:
+            The shared openai.AsyncOpenAI client.
+        """
+        if self._client is None:
+            self._client = openai.AsyncOpenAI(
+                api_key=settings.openai_api_key,
+                organization=settings.openai_org_id,
+                base_url=settings.openai_api_base or None,
+                max_retries=0
+            )
+        return self._client
+    
+    async def aclose(self) -> None:
+        """
+        Close the shared OpenAI client and its connection pool.
+        """
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
     
     async def generate_completion(
         self,
@@ -47,7 +71,7 @@ class OpenAIService(ModelService):
             tool_choice: Control when the model calls functions.
             stream: Whether to stream the response.
             **kwargs: Additional model-specific parameters.
-            
+        
         Returns:
             Dict containing the API response.
         """
@@ -72,25 +96,110 @@ class OpenAIService(ModelService):
             # Add optional parameters if provided
             if max_tokens is not None:
                 params["max_tokens"] = max_tokens
-                
+            
             if tools is not None:
                 params["tools"] = tools
-                
+            
             if tool_choice is not None:
                 params["tool_choice"] = tool_choice
             
             # Make the API call
-            response = await openai.ChatCompletion.acreate(**params)
-            return response
-            
+            response = await self._get_client().chat.completions.create(**params)
+            return response.model_dump()
+        
         except Exception as e:
             # Log the error and return a structured error response
             print(f"Error calling OpenAI API: {str(e)}")
-            return {
+            return self._error_response(e)
+    
+    async def stream_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = "gpt-4o",
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_choice: Optional[Union[str, Dict[str, Any]]] = None,
+        **kwargs
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a chat completion using OpenAI's API.
+        
+        Args:
+            messages: List of message objects with role and content.
+            model: The OpenAI model to use.
+            temperature: Controls randomness (0-1).
+            max_tokens: Maximum number of tokens to generate.
+            tools: List of tools available to the model.
+            tool_choice: Control when the model calls functions.
+            **kwargs: Additional model-specific parameters.
+        
+        Yields:
+            Completion chunks as dicts in the API's chunk format, or a single error dict.
+            The last chunk has no choices and carries the request's ``usage``.
+        """
+        # Validate model
+        if not self.supports_model(model):
+            yield {
                 "error": True,
-                "message": str(e),
-                "type": type(e).__name__
+                "message": f"Model '{model}' is not supported by OpenAI service",
+                "type": "UnsupportedModelError"
             }
+            return
+        
+        # Build request parameters
+        params = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            **kwargs,
+            "stream": True,
+            # Without this, streamed responses report no token usage
+            "stream_options": {"include_usage": True},
+        }
+        
+        # Add optional parameters if provided
+        if max_tokens is not None:
+            params["max_tokens"] = max_tokens
+        
+        if tools is not None:
+            params["tools"] = tools
+        
+        if tool_choice is not None:
+            params["tool_choice"] = tool_choice
+        
+        try:
+            # Chunks already use the OpenAI chunk format, so pass them through
+            response = await self._get_client().chat.completions.create(**params)
+            async for chunk in response:
+                yield chunk.model_dump()
+        
+        except Exception as e:
+            # Log the error and end the stream with a structured error
+            print(f"Error streaming from OpenAI API: {str(e)}")
+            yield self._error_response(e)
+    
+    @staticmethod
+    def _error_response(e: Exception) -> Dict[str, Any]:
+        """
+        Build a structured error response from an OpenAI exception.
+        
+        Keeps the HTTP status and ``retry-after`` header of API status errors
+        (including ``openai.RateLimitError``), so rate limits can be told
+        apart from other failures.
+        """
+        status_code = None
+        retry_after = None
+        if isinstance(e, openai.APIStatusError):
+            status_code = e.status_code
+            retry_after = parse_retry_after(e.response.headers.get("retry-after"))
+        return {
+            "error": True,
+            "message": str(e),
+            "type": type(e).__name__,
+            "status_code": status_code,
+            "retry_after": retry_after
+        }
     
     async def get_model_info(self, model: str) -> Optional[ModelConfig]:
         """
@@ -98,7 +207,7 @@ class OpenAIService(ModelService):
         
         Args:
             model: The model identifier.
-            
+        
         Returns:
             ModelConfig object containing model information, or None if not found.
         """
@@ -110,7 +219,7 @@ class OpenAIService(ModelService):
         
         Args:
             model: The model identifier.
-            
+        
         Returns:
             True if the model is supported, False otherwise.
         """
@@ -122,7 +231,7 @@ class OpenAIService(ModelService):
         
         Args:
             prompt: The original prompt to improve.
-            
+        
         Returns:
             Dict containing the improved prompt and explanation.
         """
@@ -164,7 +273,7 @@ class OpenAIService(ModelService):
                 "improved_prompt": improved_prompt,
                 "success": True
             }
-            
+        
         except Exception as e:
             print(f"Error improving prompt: {str(e)}")
             return {
@@ -0,0 +1,56 @@
+from typing import Any, Dict, List, Optional
+
+# Cache marker for Anthropic content blocks; entries live for about five minutes
+EPHEMERAL_CACHE_CONTROL = {"type": "ephemeral"}
+
+# User turns marked as cache breakpoints, newest first
+CACHED_USER_TURNS = 2
+
+
+def cache_breakpoints(messages: List[Dict[str, Any]]) -> List[int]:
+    """
+    Find the messages that end a stable prompt prefix.
+    
+    Everything up to the last user message is the prefix the next turn
+    will resend unchanged, so it is cached there. The user message before
+    it is where the previous turn cached its prefix, so marking it too lets
+    this turn read that entry even when the newest prefix is not cached yet.
+    
+    Args:
+        messages: Provider messages, oldest first.
+    
+    Returns:
+        Indexes of the messages to mark, oldest first.
+    """
+    indexes = [i for i, message in enumerate(messages) if message.get("role") == "user"]
+    return indexes[-CACHED_USER_TURNS:]
+
+
+def normalize_usage(usage: Optional[Dict[str, Any]]) -> Optional[Dict[str, int]]:
+    """
+    Flatten provider usage into integer token counts.
+    
+    Prompt cache tokens are reported as ``cache_read_tokens`` and
+    ``cache_write_tokens`` for every provider; OpenAI's
+    ``prompt_tokens_details.cached_tokens`` is moved there. Nested details
+    and non-numeric fields are dropped. ``prompt_tokens`` always includes
+    the cached tokens.
+    
+    Args:
+        usage: Usage as reported by the provider service.
+    
+    Returns:
+        The normalized usage, or None if there was none.
+    """
+    if not usage:
+        return None
+    
+    normalized = {
+        key: int(value)
+        for key, value in usage.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    }
+    details = usage.get("prompt_tokens_details") or {}
+    normalized.setdefault("cache_read_tokens", int(details.get("cached_tokens") or 0))
+    normalized.setdefault("cache_write_tokens", 0)
+    return normalized
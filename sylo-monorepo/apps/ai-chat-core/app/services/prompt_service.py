@@ -43,7 +43,8 @@ class PromptService:
             response = await model_orchestrator.generate_completion(
                 messages=messages,
                 model=request.model if request.model else settings.default_model,
-                temperature=0.7
+                temperature=0.7,
+                use_cache=True  # The same prompt text gets the same suggestion
             )
             
             if "error" in response and response.get("error", False):
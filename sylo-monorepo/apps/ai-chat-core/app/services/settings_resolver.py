@@ -0,0 +1,243 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Set, Tuple
+from uuid import UUID
+from app.core.config import settings
+from app.core.cache import TTLCache
+from app.core.invalidation import invalidation_bus
+from app.core.singleflight import SingleFlight
+from app.crud.crud_user_settings import user_settings_repository
+from app.crud.crud_team_settings import (
+    TEAM_MEMBERS_CHANNEL,
+    TEAM_SETTINGS_CHANNEL,
+    TEAMS_CHANNEL,
+    get_teams_for_user,
+    get_team_settings,
+)
+from app.models.team import Team, TeamSettings
+from app.models.user import EffectiveSettings, UserSettings
+
+# Messages of history used when no layer sets a memory window
+DEFAULT_MEMORY_WINDOW = 10
+
+
+def _merge_model_settings(
+    base: Dict[str, Dict[str, Any]],
+    overrides: Optional[Dict[str, Dict[str, Any]]]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Merge per-model settings, key by key within each model.
+    """
+    merged = {model: dict(values) for model, values in base.items()}
+    for model, values in (overrides or {}).items():
+        merged.setdefault(model, {}).update(values or {})
+    return merged
+
+
+class EffectiveSettingsResolver:
+    """
+    Resolves the settings a user's requests run with.
+    
+    Layers are merged lowest first:
+    
+    1. System defaults from ``Settings``.
+    2. Settings of the user's teams that don't enforce them. Users always
+       have a default model, temperature and memory window, so these teams
+       only fill in fields the user leaves unset.
+    3. The user's own settings.
+    4. Settings of a team with ``enforce_team_settings``, which override the
+       user's wherever the team sets a value.
+    
+    Teams are applied oldest first within a layer, so when several teams
+    enforce settings the newest wins. ``model_specific_settings`` and
+    ``preferences`` are merged key by key rather than replaced.
+    
+    The merged result is cached per user and dropped when the user's
+    settings, one of their teams' settings or their memberships change, so
+    steady-state requests resolve their settings without any database call.
+    """
+    
+    def __init__(self):
+        self.cache = TTLCache(
+            maxsize=settings.effective_settings_cache_size,
+            ttl=settings.effective_settings_cache_ttl,
+            on_evict=self._unindex
+        )
+        self.coalescer = SingleFlight()
+        # Users whose cached settings include each team, for invalidation;
+        # pruned as entries leave the cache, so bounded by its size
+        self._team_users: Dict[str, Set[str]] = {}
+        # Bumped on every invalidation so a resolve racing one isn't cached
+        self._generation = 0
+        invalidation_bus.subscribe(user_settings_repository.table_name, self.invalidate_user)
+        invalidation_bus.subscribe(TEAM_SETTINGS_CHANNEL, self.invalidate_team)
+        invalidation_bus.subscribe(TEAM_MEMBERS_CHANNEL, self.invalidate_user)
+        invalidation_bus.subscribe(TEAMS_CHANNEL, self.invalidate_team)
+    
+    async def resolve(self, user_id: UUID) -> EffectiveSettings:
+        """
+        Get a user's effective settings.
+        
+        Cached objects are shared, so callers must not mutate the result.
+        
+        Args:
+            user_id: The ID of the user.
+        
+        Returns:
+            The merged settings.
+        """
+        key = str(user_id)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        
+        # Concurrent misses for the same user share one load
+        return await self.coalescer.do(key, lambda: self._load(user_id))
+    
+    def invalidate_user(self, user_id: str) -> None:
+        """
+        Drop a user's cached settings.
+        
+        Args:
+            user_id: The ID of the user, as a string.
+        """
+        self._generation += 1
+        self.cache.invalidate(user_id)
+    
+    def invalidate_team(self, team_id: str) -> None:
+        """
+        Drop the cached settings of every user merged with a team.
+        
+        Args:
+            team_id: The ID of the team, as a string.
+        """
+        self._generation += 1
+        for user_id in self._team_users.pop(team_id, ()):
+            self.cache.invalidate(user_id)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache and load counters.
+        
+        Returns:
+            Dict of cache statistics and coalesced loads.
+        """
+        return {
+            **self.cache.stats(),
+            "loads": self.coalescer.stats(),
+            "indexed_teams": len(self._team_users),
+        }
+    
+    def _unindex(self, user_id: str, effective: EffectiveSettings) -> None:
+        """
+        Drop a user leaving the cache from the team index.
+        """
+        for team_id in effective.team_ids:
+            users = self._team_users.get(str(team_id))
+            if users is not None:
+                users.discard(user_id)
+                if not users:
+                    del self._team_users[str(team_id)]
+    
+    async def _load(self, user_id: UUID) -> EffectiveSettings:
+        """
+        Load every layer for a user, merge them and cache the result.
+        """
+        generation = self._generation
+        user_settings, teams = await asyncio.gather(
+            user_settings_repository.get_or_create_settings(user_id),
+            get_teams_for_user(user_id)
+        )
+        
+        # A user can both own and belong to a team
+        unique_teams = list({team.id: team for team in teams}.values())
+        team_settings = await asyncio.gather(
+            *(get_team_settings(team.id) for team in unique_teams)
+        )
+        layers = [
+            (team, layer)
+            for team, layer in zip(unique_teams, team_settings)
+            if layer is not None
+        ]
+        layers.sort(key=lambda item: (
+            item[0].created_at.isoformat() if item[0].created_at else "",
+            str(item[0].id)
+        ))
+        
+        effective = self.merge(user_settings, layers)
+        effective.team_ids = [team.id for team in unique_teams]
+        
+        if generation == self._generation:
+            key = str(user_id)
+            self.cache.set(key, effective)
+            for team in unique_teams:
+                self._team_users.setdefault(str(team.id), set()).add(key)
+        return effective
+    
+    @staticmethod
+    def merge(
+        user_settings: UserSettings,
+        teams: List[Tuple[Team, TeamSettings]]
+    ) -> EffectiveSettings:
+        """
+        Merge system defaults, team settings and user settings.
+        
+        Args:
+            user_settings: The user's own settings.
+            teams: The user's teams with their settings, oldest first.
+        
+        Returns:
+            The merged settings.
+        """
+        effective = EffectiveSettings(
+            user_id=user_settings.user_id,
+            default_model=settings.default_model,
+            temperature=settings.default_temperature,
+            memory_window=DEFAULT_MEMORY_WINDOW,
+        )
+        
+        # Teams that don't enforce their settings fill in what the user leaves unset
+        for _, team in teams:
+            if team.enforce_team_settings:
+                continue
+            effective.max_tokens = team.max_tokens if team.max_tokens is not None else effective.max_tokens
+            effective.preferred_models = team.preferred_models or effective.preferred_models
+            effective.model_specific_settings = _merge_model_settings(
+                effective.model_specific_settings, team.model_specific_settings
+            )
+            effective.preferences = {**effective.preferences, **(team.preferences or {})}
+        
+        # The user's own settings
+        effective.default_model = user_settings.default_model or effective.default_model
+        if user_settings.temperature is not None:
+            effective.temperature = user_settings.temperature
+        if user_settings.max_tokens is not None:
+            effective.max_tokens = user_settings.max_tokens
+        if user_settings.memory_window is not None:
+            effective.memory_window = user_settings.memory_window
+        effective.preferred_models = user_settings.preferred_models or effective.preferred_models
+        effective.model_specific_settings = _merge_model_settings(
+            effective.model_specific_settings, user_settings.model_specific_settings
+        )
+        effective.preferences = {**effective.preferences, **(user_settings.preferences or {})}
+        
+        # Enforced team settings override the user's
+        for team_info, team in teams:
+            if not team.enforce_team_settings:
+                continue
+            effective.default_model = team.default_model or effective.default_model
+            effective.temperature = team.temperature
+            effective.memory_window = team.memory_window
+            if team.max_tokens is not None:
+                effective.max_tokens = team.max_tokens
+            effective.preferred_models = team.preferred_models or effective.preferred_models
+            effective.model_specific_settings = _merge_model_settings(
+                effective.model_specific_settings, team.model_specific_settings
+            )
+            effective.preferences = {**effective.preferences, **(team.preferences or {})}
+            effective.enforced_by_team_id = team_info.id
+        
+        return effective
+
+
+# Create a global instance
+settings_resolver = EffectiveSettingsResolver()
@@ -0,0 +1,343 @@
+import math
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+from app.core.config import settings, ModelConfig
+
+try:
+    import tiktoken
+except ImportError:  # Optional: fall back to approximate counts
+    tiktoken = None
+
+# Name used for counts produced by the character-based approximation
+APPROXIMATE_ENCODING = "approx"
+
+# Average characters per token for English text, used when no tokenizer is available
+APPROX_CHARS_PER_TOKEN = 4
+
+# Tokens added per message for role and separators (OpenAI chat format)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Tokens used to prime the assistant reply
+REPLY_PRIMING_TOKENS = 3
+
+# Encoding used for OpenAI models tiktoken doesn't know yet
+DEFAULT_OPENAI_ENCODING = "cl100k_base"
+
+# Price of prompt cache reads and writes relative to uncached input, by provider
+CACHE_PRICE_RATIOS = {
+    "anthropic": (0.1, 1.25),
+    "openai": (0.5, 1.0),
+}
+
+
+class Tokenizer(ABC):
+    """
+    Abstract token counter for one encoding.
+    """
+    
+    # Name of the encoding; counts are cached on messages under this key
+    name: str
+    
+    @abstractmethod
+    def count(self, text: str) -> int:
+        """
+        Count the tokens in a piece of text.
+        
+        Args:
+            text: The text to count.
+        
+        Returns:
+            The number of tokens.
+        """
+        pass
+    
+    def count_batch(self, texts: List[str]) -> List[int]:
+        """
+        Count the tokens in many pieces of text.
+        
+        Args:
+            texts: The texts to count.
+        
+        Returns:
+            The number of tokens in each text, in order.
+        """
+        return [self.count(text) for text in texts]
+
+
+class ApproximateTokenizer(Tokenizer):
+    """
+    Fast character-based estimate for models without a local tokenizer.
+    """
+    
+    name = APPROXIMATE_ENCODING
+    
+    def __init__(self, chars_per_token: float = APPROX_CHARS_PER_TOKEN):
+        self.chars_per_token = chars_per_token
+    
+    def count(self, text: str) -> int:
+        return math.ceil(len(text) / self.chars_per_token)
+    
+    def count_batch(self, texts: List[str]) -> List[int]:
+        chars_per_token = self.chars_per_token
+        return [math.ceil(len(text) / chars_per_token) for text in texts]
+
+
+class TiktokenTokenizer(Tokenizer):
+    """
+    Exact counts for OpenAI models using a tiktoken encoding.
+    
+    The encoding is loaded once, normally at startup through
+    ``TokenizerRegistry.warm_up``, and shared for the life of the process.
+    """
+    
+    def __init__(self, encoding_name: str):
+        self.name = encoding_name
+    
+    def count(self, text: str) -> int:
+        return len(_get_encoding(self.name).encode(text, disallowed_special=()))
+    
+    def count_batch(self, texts: List[str]) -> List[int]:
+        # encode_batch tokenizes on tiktoken's native thread pool
+        encoded = _get_encoding(self.name).encode_batch(texts, disallowed_special=())
+        return [len(tokens) for tokens in encoded]
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(name: str):
+    """
+    Load a tiktoken encoding once per process.
+    """
+    return tiktoken.get_encoding(name)
+
+
+def _openai_tokenizer(config: ModelConfig) -> Optional[Tokenizer]:
+    """
+    Build the tiktoken tokenizer for an OpenAI model.
+    """
+    if tiktoken is None:
+        return None
+    try:
+        return TiktokenTokenizer(tiktoken.encoding_for_model(config.model_id).name)
+    except KeyError:
+        return TiktokenTokenizer(DEFAULT_OPENAI_ENCODING)
+
+
+class TokenizerRegistry:
+    """
+    Tokenizers keyed by model, built by per-provider factories.
+    
+    Each model's tokenizer is resolved once and cached for the life of the
+    process. Providers without a factory, or whose factory can't build an
+    exact tokenizer, get the approximate tokenizer. In approximate mode every
+    model uses it.
+    """
+    
+    def __init__(self, mode: str = "exact", chars_per_token: float = APPROX_CHARS_PER_TOKEN):
+        """
+        Initialize the registry.
+        
+        Args:
+            mode: ``exact`` to use local tokenizers where available, or
+                ``approximate`` to always use the character estimate.
+            chars_per_token: Characters per token for the approximation.
+        """
+        self.mode = mode
+        self.approximate = ApproximateTokenizer(chars_per_token)
+        self._factories: Dict[str, Callable[[ModelConfig], Optional[Tokenizer]]] = {}
+        self._tokenizers: Dict[str, Tokenizer] = {}
+    
+    def register(self, provider: str, factory: Callable[[ModelConfig], Optional[Tokenizer]]) -> None:
+        """
+        Register the tokenizer factory for a provider.
+        
+        Args:
+            provider: The provider name (e.g., 'openai', 'anthropic').
+            factory: Builds a tokenizer from a model config, or returns None
+                if no exact tokenizer is available.
+        """
+        self._factories[provider] = factory
+        self._tokenizers.clear()
+    
+    def for_model(self, model: str) -> Tokenizer:
+        """
+        Get the tokenizer for a model.
+        
+        Args:
+            model: The model identifier.
+        
+        Returns:
+            The model's tokenizer.
+        """
+        tokenizer = self._tokenizers.get(model)
+        if tokenizer is None:
+            tokenizer = self._tokenizers[model] = self._build(model)
+        return tokenizer
+    
+    def warm_up(self, models: List[str]) -> None:
+        """
+        Build the tokenizers of models and load their encodings.
+        
+        tiktoken reads, and on first use downloads, its BPE files
+        synchronously, so this runs at startup (off the event loop) rather
+        than inside the first request that counts tokens for a model.
+        
+        Args:
+            models: The model identifiers to prepare.
+        """
+        for model in models:
+            tokenizer = self.for_model(model)
+            if isinstance(tokenizer, TiktokenTokenizer):
+                _get_encoding(tokenizer.name)
+    
+    def _build(self, model: str) -> Tokenizer:
+        config = settings.model_configs.get(model)
+        if self.mode == "approximate" or config is None:
+            return self.approximate
+        
+        factory = self._factories.get(config.provider)
+        tokenizer = factory(config) if factory else None
+        return tokenizer or self.approximate
+
+
+# Create a global instance
+tokenizers = TokenizerRegistry(
+    mode=settings.tokenizer_mode,
+    chars_per_token=settings.tokenizer_approx_chars_per_token
+)
+tokenizers.register("openai", _openai_tokenizer)
+
+
+def encoding_name(model: str) -> str:
+    """
+    Get the name of the tokenizer used for a model.
+    
+    Args:
+        model: The model identifier.
+    
+    Returns:
+        The tiktoken encoding name, or ``APPROXIMATE_ENCODING`` when the model
+        has no local tokenizer.
+    """
+    return tokenizers.for_model(model).name
+
+
+def count_text_tokens(text: str, model: str) -> int:
+    """
+    Count the tokens in a piece of text for a model.
+    
+    Args:
+        text: The text to count.
+        model: The model identifier.
+    
+    Returns:
+        The number of tokens.
+    """
+    return tokenizers.for_model(model).count(text)
+
+
+def count_message_tokens(message: Dict[str, Any], model: str) -> int:
+    """
+    Count the tokens a chat message contributes to a prompt.
+    
+    The count is cached on the message under ``token_counts`` keyed by
+    encoding name, so a message is only tokenized once per encoding.
+    
+    Args:
+        message: The message dict with role and content.
+        model: The model identifier.
+    
+    Returns:
+        The number of tokens, including per-message overhead.
+    """
+    return count_messages_tokens([message], model)[0]
+
+
+def count_messages_tokens(messages: List[Dict[str, Any]], model: str) -> List[int]:
+    """
+    Count the tokens of many chat messages, tokenizing uncached ones in one batch.
+    
+    Counts are cached on each message as in ``count_message_tokens``.
+    
+    Args:
+        messages: The message dicts with role and content.
+        model: The model identifier.
+    
+    Returns:
+        The number of tokens of each message, including per-message overhead.
+    """
+    tokenizer = tokenizers.for_model(model)
+    name = tokenizer.name
+    
+    uncached = [
+        message for message in messages
+        if name not in (message.get("token_counts") or {})
+    ]
+    if uncached:
+        counts = tokenizer.count_batch([message.get("content") or "" for message in uncached])
+        for message, count in zip(uncached, counts):
+            if message.get("token_counts") is None:
+                message["token_counts"] = {}
+            message["token_counts"][name] = count + MESSAGE_OVERHEAD_TOKENS
+    
+    return [message["token_counts"][name] for message in messages]
+
+
+def estimate_request_tokens(messages: List[Dict[str, Any]], max_tokens: Optional[int] = None) -> int:
+    """
+    Cheaply estimate the tokens a request will use, for quota accounting.
+    
+    Uses the character approximation rather than a tokenizer, since the
+    estimate is corrected with the provider's reported usage afterwards.
+    
+    Args:
+        messages: The messages sent to the model.
+        max_tokens: Tokens reserved for the reply.
+    
+    Returns:
+        The estimated prompt plus reply tokens.
+    """
+    characters = sum(len(message.get("content") or "") for message in messages)
+    prompt_tokens = (
+        characters // APPROX_CHARS_PER_TOKEN
+        + len(messages) * MESSAGE_OVERHEAD_TOKENS
+        + REPLY_PRIMING_TOKENS
+    )
+    reply_tokens = max_tokens if max_tokens is not None else settings.default_max_tokens
+    return prompt_tokens + reply_tokens
+
+
+def estimate_cost(
+    model: str,
+    prompt_tokens: int,
+    completion_tokens: int,
+    cache_read_tokens: int = 0,
+    cache_write_tokens: int = 0
+) -> float:
+    """
+    Estimate the cost of a request from its token counts.
+    
+    Args:
+        model: The model identifier.
+        prompt_tokens: Tokens sent to the model, including cached ones.
+        completion_tokens: Tokens generated, or reserved for the reply.
+        cache_read_tokens: Prompt tokens read from the provider's prompt cache.
+        cache_write_tokens: Prompt tokens written to the provider's prompt cache.
+    
+    Returns:
+        The cost in the currency of ``cost_per_1k_*``, or 0 for unknown models.
+    """
+    config = settings.model_configs.get(model)
+    if config is None:
+        return 0.0
+    read_ratio, write_ratio = CACHE_PRICE_RATIOS.get(config.provider, (1.0, 1.0))
+    uncached_tokens = max(0, prompt_tokens - cache_read_tokens - cache_write_tokens)
+    input_tokens = (
+        uncached_tokens
+        + cache_read_tokens * read_ratio
+        + cache_write_tokens * write_ratio
+    )
+    return (
+        input_tokens * config.cost_per_1k_input
+        + completion_tokens * config.cost_per_1k_output
+    ) / 1000
@@ -0,0 +1,472 @@
+"""
+End-to-end API benchmark against local stand-ins.
+
+Starts the fake OpenAI/Anthropic server, the fake PostgREST backend and the
+real app (under uvicorn) as subprocesses, drives each scenario at the
+configured concurrency and reports throughput, p50/p95/p99 latency and the
+app's CPU time and memory per request. Results can be saved and compared
+with a baseline to catch regressions.
+
+Usage:
+    python -m benchmarks.api_benchmark [--scenarios chat,chat-stream,settings,prompts]
+        [--concurrency 32] [--requests 500] [--latency 0.3] [--rate-limit-ratio 0.0]
+        [--output results.json] [--baseline baseline.json --max-regression 0.1]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import httpx
+from benchmarks import fake_providers
+
+try:
+    import psutil
+except ImportError:  # Optional: /proc is read directly on Linux
+    psutil = None
+
+# Fake JWT accepted by supabase-py's key format check
+FAKE_SUPABASE_KEY = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJyb2xlIjoiYmVuY2htYXJrIn0.benchmark"
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Scenarios run by default, as groups of endpoints
+SCENARIO_GROUPS = {
+    "chat": ["chat"],
+    "chat-stream": ["chat-stream"],
+    "settings": ["settings-get", "settings-put"],
+    "prompts": ["prompt-improve", "prompt-categorize"],
+}
+
+
+class ProcessSampler:
+    """
+    Samples a process's CPU time and resident memory.
+    """
+    
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.peak_rss = 0
+        self._process = psutil.Process(pid) if psutil is not None else None
+        self._task: Optional[asyncio.Task] = None
+    
+    def cpu_seconds(self) -> float:
+        if self._process is not None:
+            times = self._process.cpu_times()
+            return times.user + times.system
+        with open(f"/proc/{self.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        # utime and stime are fields 14 and 15 of the stat line
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    
+    def rss_bytes(self) -> int:
+        if self._process is not None:
+            return self._process.memory_info().rss
+        with open(f"/proc/{self.pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+        return 0
+    
+    def start(self, interval: float = 0.05) -> None:
+        self.peak_rss = self.rss_bytes()
+        
+        async def sample() -> None:
+            while True:
+                self.peak_rss = max(self.peak_rss, self.rss_bytes())
+                await asyncio.sleep(interval)
+        
+        self._task = asyncio.get_running_loop().create_task(sample())
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.peak_rss = max(self.peak_rss, self.rss_bytes())
+
+
+class Scenario:
+    """
+    One endpoint under load.
+    
+    ``send`` performs a single request and returns its time to first token
+    for streamed responses, or None. It raises on a failed request.
+    """
+    
+    def __init__(self, name: str, send: Callable[[httpx.AsyncClient, Dict[str, str], int], Awaitable[Optional[float]]]):
+        self.name = name
+        self.send = send
+
+
+def _check(response: httpx.Response) -> None:
+    if response.status_code >= 400:
+        raise RuntimeError(f"HTTP {response.status_code}")
+
+
+def _chat_body(user: Dict[str, str], index: int, model: str, stream: bool) -> Dict[str, Any]:
+    return {
+        "user_id": user["user_id"],
+        "session_id": user["session_id"],
+        "model": model,
+        "stream": stream,
+        "messages": [{"role": "user", "content": f"Question {index}: summarize the benchmark plan."}],
+    }
+
+
+def build_scenarios(model: str) -> Dict[str, Scenario]:
+    """
+    Build the benchmark scenarios.
+    
+    Args:
+        model: The model chat and prompt requests ask for.
+    
+    Returns:
+        Scenarios keyed by name.
+    """
+    async def chat(client: httpx.AsyncClient, user: Dict[str, str], index: int) -> Optional[float]:
+        response = await client.post(
+            "/v1/chat/completion",
+            json=_chat_body(user, index, model, False),
+            headers={"X-User-ID": user["user_id"]}
+        )
+        _check(response)
+        return None
+    
+    async def chat_stream(client: httpx.AsyncClient, user: Dict[str, str], index: int) -> Optional[float]:
+        started = time.perf_counter()
+        ttft = None
+        async with client.stream(
+            "POST",
+            "/v1/chat/completion",
+            json=_chat_body(user, index, model, True),
+            headers={"X-User-ID": user["user_id"]}
+        ) as response:
+            _check(response)
+            async for line in response.aiter_lines():
+                if line == "event: delta" and ttft is None:
+                    ttft = time.perf_counter() - started
+                elif line == "event: error":
+                    raise RuntimeError("stream error event")
+        return ttft
+    
+    async def settings_get(client: httpx.AsyncClient, user: Dict[str, str], index: int) -> Optional[float]:
+        _check(await client.get("/v1/user-settings", headers={"X-User-ID": user["user_id"]}))
+        return None
+    
+    async def settings_put(client: httpx.AsyncClient, user: Dict[str, str], index: int) -> Optional[float]:
+        _check(await client.put(
+            "/v1/user-settings",
+            json={"user_id": user["user_id"], "temperature": round(0.1 + (index % 9) / 10, 1)},
+            headers={"X-User-ID": user["user_id"]}
+        ))
+        return None
+    
+    def prompt(path: str) -> Callable[[httpx.AsyncClient, Dict[str, str], int], Awaitable[Optional[float]]]:
+        async def send(client: httpx.AsyncClient, user: Dict[str, str], index: int) -> Optional[float]:
+            # Distinct prompts, so the completion cache doesn't answer them
+            _check(await client.post(
+                path,
+                json={
+                    "user_id": user["user_id"],
+                    "prompt_text": f"Write a product description for item {index} of {user['user_id']}.",
+                    "model": model,
+                },
+                headers={"X-User-ID": user["user_id"]}
+            ))
+            return None
+        return send
+    
+    return {
+        "chat": Scenario("chat", chat),
+        "chat-stream": Scenario("chat-stream", chat_stream),
+        "settings-get": Scenario("settings-get", settings_get),
+        "settings-put": Scenario("settings-put", settings_put),
+        "prompt-improve": Scenario("prompt-improve", prompt("/v1/prompts/improve")),
+        "prompt-categorize": Scenario("prompt-categorize", prompt("/v1/prompts/categorize")),
+    }
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """
+    Nearest-rank percentile of a list of values.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered) + 0.5)) - 1))]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    users: List[Dict[str, str]],
+    concurrency: int,
+    requests: int,
+    warmup: int,
+    sampler: ProcessSampler
+) -> Dict[str, Any]:
+    """
+    Drive one scenario with a fixed number of concurrent workers.
+    
+    Returns:
+        The scenario's throughput, latency, error and resource figures.
+    """
+    async def drive(total: int, latencies: List[float], ttfts: List[float], errors: Dict[str, int]) -> None:
+        counter = itertools.count()
+        
+        async def worker() -> None:
+            for index in iter(lambda: next(counter), None):
+                if index >= total:
+                    return
+                user = users[index % len(users)]
+                started = time.perf_counter()
+                try:
+                    ttft = await scenario.send(client, user, index)
+                except Exception as e:
+                    key = str(e) or type(e).__name__
+                    errors[key] = errors.get(key, 0) + 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+                if ttft is not None:
+                    ttfts.append(ttft)
+        
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    
+    await drive(warmup, [], [], {})
+    
+    latencies: List[float] = []
+    ttfts: List[float] = []
+    errors: Dict[str, int] = {}
+    cpu_before = sampler.cpu_seconds()
+    rss_before = sampler.rss_bytes()
+    sampler.start()
+    started = time.perf_counter()
+    await drive(requests, latencies, ttfts, errors)
+    elapsed = time.perf_counter() - started
+    await sampler.stop()
+    cpu = sampler.cpu_seconds() - cpu_before
+    
+    def ms(value: Optional[float]) -> Optional[float]:
+        return round(value * 1000, 2) if value is not None else None
+    
+    return {
+        "requests": requests,
+        "errors": sum(errors.values()),
+        "error_types": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "p50_ms": ms(percentile(latencies, 0.50)),
+        "p95_ms": ms(percentile(latencies, 0.95)),
+        "p99_ms": ms(percentile(latencies, 0.99)),
+        "ttft_p50_ms": ms(percentile(ttfts, 0.50)),
+        "ttft_p95_ms": ms(percentile(ttfts, 0.95)),
+        "cpu_ms_per_request": round(cpu * 1000 / requests, 3),
+        "peak_rss_mb": round(sampler.peak_rss / 2**20, 1),
+        "rss_growth_kb_per_request": round((sampler.peak_rss - rss_before) / 1024 / requests, 2),
+    }
+
+
+def _spawn(args: List[str], env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, *args], cwd=APP_ROOT, env=env)
+
+
+async def _wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{url} did not become ready within {timeout}s")
+            await asyncio.sleep(0.2)
+
+
+def _app_env(args: argparse.Namespace) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_API_KEY": "sk-benchmark",
+        "OPENAI_API_BASE": f"http://127.0.0.1:{args.provider_port}/v1",
+        "ANTHROPIC_API_KEY": "sk-ant-benchmark",
+        "ANTHROPIC_API_URL": f"http://127.0.0.1:{args.provider_port}/v1/messages",
+        "SUPABASE_URL": f"http://127.0.0.1:{args.postgrest_port}",
+        "SUPABASE_ANON_KEY": FAKE_SUPABASE_KEY,
+        "SUPABASE_SERVICE_ROLE_KEY": FAKE_SUPABASE_KEY,
+        "COMPLETION_CACHE_PERSISTENT": "false",
+        "CACHE_INVALIDATION_DSN": "",
+    })
+    return env
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """
+    Compare results with a baseline.
+    
+    Args:
+        results: Results of this run, keyed by scenario.
+        baseline: Results of the baseline run, keyed by scenario.
+        max_regression: Allowed relative drop in throughput or rise in p95.
+    
+    Returns:
+        A description of each regression found.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if previous.get("throughput_rps") and current.get("throughput_rps") is not None:
+            change = current["throughput_rps"] / previous["throughput_rps"] - 1
+            if change < -max_regression:
+                regressions.append(f"{name}: throughput {change:+.1%}")
+        if previous.get("p95_ms") and current.get("p95_ms") is not None:
+            change = current["p95_ms"] / previous["p95_ms"] - 1
+            if change > max_regression:
+                regressions.append(f"{name}: p95 latency {change:+.1%}")
+    return regressions
+
+
+def print_report(results: Dict[str, Dict[str, Any]]) -> None:
+    columns = [
+        ("scenario", 20), ("ok/total", 12), ("rps", 9), ("p50 ms", 9), ("p95 ms", 9),
+        ("p99 ms", 9), ("ttft p50", 9), ("cpu ms/req", 11), ("peak rss MB", 12),
+    ]
+    print("".join(f"{title:>{width}}" if i else f"{title:<{width}}" for i, (title, width) in enumerate(columns)))
+    for name, r in results.items():
+        cells = [
+            name,
+            f"{r['requests'] - r['errors']}/{r['requests']}",
+            r["throughput_rps"], r["p50_ms"], r["p95_ms"], r["p99_ms"],
+            r["ttft_p50_ms"] if r["ttft_p50_ms"] is not None else "-",
+            r["cpu_ms_per_request"], r["peak_rss_mb"],
+        ]
+        print("".join(
+            f"{str(cell):>{width}}" if i else f"{str(cell):<{width}}"
+            for i, (cell, (_, width)) in enumerate(zip(cells, columns))
+        ))
+        if r["error_types"]:
+            print(f"  errors: {r['error_types']}")
+
+
+async def main(args: argparse.Namespace) -> int:
+    names = []
+    for group in args.scenarios.split(","):
+        names.extend(SCENARIO_GROUPS.get(group.strip(), [group.strip()]))
+    scenarios = build_scenarios(args.model)
+    unknown = [name for name in names if name not in scenarios]
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(unknown)}")
+        return 2
+    
+    processes = [
+        _spawn([
+            "-m", "benchmarks.fake_providers",
+            "--port", str(args.provider_port),
+            "--latency", str(args.latency),
+            "--token-delay", str(args.token_delay),
+            "--reply-tokens", str(args.reply_tokens),
+            "--rate-limit-ratio", str(args.rate_limit_ratio),
+            "--retry-after", str(args.retry_after),
+        ]),
+        _spawn([
+            "-m", "benchmarks.fake_postgrest",
+            "--port", str(args.postgrest_port),
+            "--latency", str(args.db_latency),
+        ]),
+    ]
+    app = _spawn([
+        "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1",
+        "--port", str(args.app_port),
+        "--log-level", "warning",
+        "--no-access-log",
+    ], env=_app_env(args))
+    processes.append(app)
+    
+    try:
+        await _wait_ready(f"http://127.0.0.1:{args.provider_port}/stats")
+        await _wait_ready(f"http://127.0.0.1:{args.postgrest_port}/stats")
+        await _wait_ready(f"http://127.0.0.1:{args.app_port}/health")
+        
+        users = [
+            {"user_id": str(uuid.uuid4()), "session_id": str(uuid.uuid4())}
+            for _ in range(args.users)
+        ]
+        sampler = ProcessSampler(app.pid)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        results: Dict[str, Dict[str, Any]] = {}
+        
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{args.app_port}",
+            limits=limits,
+            timeout=args.timeout
+        ) as client:
+            for name in names:
+                results[name] = await run_scenario(
+                    client, scenarios[name], users, args.concurrency,
+                    args.requests, args.warmup, sampler
+                )
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+    
+    print(
+        f"concurrency {args.concurrency}, {args.requests} requests per scenario, "
+        f"provider latency {args.latency}s + {args.token_delay}s/token, "
+        f"429 ratio {args.rate_limit_ratio}, db latency {args.db_latency}s"
+    )
+    print_report(results)
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+    
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the API against local fake providers and database.")
+    parser.add_argument(
+        "--scenarios",
+        default="chat,chat-stream,settings,prompts",
+        help="Comma-separated scenarios or groups: " + ", ".join(SCENARIO_GROUPS)
+    )
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=500, help="Measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests before each scenario")
+    parser.add_argument("--users", type=int, default=50, help="Distinct users, each with one chat session")
+    parser.add_argument("--model", default="gpt-4o", help="Model requested by chat and prompt scenarios")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Client timeout in seconds")
+    parser.add_argument("--db-latency", type=float, default=0.005, help="Seconds added to every database request")
+    parser.add_argument("--app-port", type=int, default=8100)
+    parser.add_argument("--provider-port", type=int, default=8101)
+    parser.add_argument("--postgrest-port", type=int, default=8102)
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare with results saved by --output")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.1,
+        help="Allowed relative throughput drop or p95 rise before failing"
+    )
+    fake_providers.add_arguments(parser)
+    sys.exit(asyncio.run(main(parser.parse_args())))
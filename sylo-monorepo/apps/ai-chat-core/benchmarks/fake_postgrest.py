@@ -0,0 +1,222 @@
+"""
+In-memory stand-in for Supabase's PostgREST API, for benchmarks.
+
+Supports the subset of PostgREST the service uses: ``select``, filters
+(``eq``, ``neq``, ``gt``, ``gte``, ``lt``, ``lte``, ``in``, ``is``),
+``order``, ``limit``, ``offset``, inserts, upserts (``on_conflict``),
+updates and deletes, under ``/rest/v1/{table}``. Every request can be
+delayed to model the network round trip to the database.
+
+Usage:
+    python -m benchmarks.fake_postgrest [--port 8102] [--latency 0.005]
+"""
+import argparse
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+# Query parameters that are not column filters
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+def _coerce(value: Any) -> Any:
+    """
+    Make numbers compare as numbers and everything else as strings.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return "" if value is None else str(value)
+
+
+def _compare(op: str) -> Callable[[Any, Any], bool]:
+    return {
+        "eq": lambda a, b: a is not None and _coerce(a) == _coerce(b),
+        "neq": lambda a, b: a is not None and _coerce(a) != _coerce(b),
+        "gt": lambda a, b: a is not None and _coerce(a) > _coerce(b),
+        "gte": lambda a, b: a is not None and _coerce(a) >= _coerce(b),
+        "lt": lambda a, b: a is not None and _coerce(a) < _coerce(b),
+        "lte": lambda a, b: a is not None and _coerce(a) <= _coerce(b),
+    }[op]
+
+
+def _parse_filter(column: str, expression: str) -> Callable[[Dict[str, Any]], bool]:
+    """
+    Parse one ``column=op.value`` filter into a row predicate.
+    """
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[len("not."):]
+    op, _, value = expression.partition(".")
+    
+    if op == "in":
+        values = {_coerce(v.strip().strip('"')) for v in value.strip("()").split(",") if v}
+        predicate = lambda row: _coerce(row.get(column)) in values
+    elif op == "is":
+        expected = {"null": None, "true": True, "false": False}[value]
+        predicate = lambda row: row.get(column) is expected
+    else:
+        compare = _compare(op)
+        predicate = lambda row: compare(row.get(column), value)
+    
+    return (lambda row: not predicate(row)) if negate else predicate
+
+
+def _parse_order(value: str) -> List[Tuple[str, bool]]:
+    order = []
+    for term in value.split(","):
+        parts = term.split(".")
+        order.append((parts[0], "desc" in parts[1:]))
+    return order
+
+
+class FakePostgrest:
+    """
+    Tables held in memory as lists of row dicts.
+    """
+    
+    def __init__(self, latency: float = 0.005):
+        """
+        Args:
+            latency: Seconds added to every request.
+        """
+        self.latency = latency
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.requests = 0
+    
+    def _select(self, table: str, params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        rows = self.tables.get(table, [])
+        filters = [_parse_filter(k, v) for k, v in params if k not in RESERVED_PARAMS]
+        return [row for row in rows if all(f(row) for f in filters)]
+    
+    @staticmethod
+    def _shape(rows: List[Dict[str, Any]], params: Dict[str, str]) -> List[Dict[str, Any]]:
+        for column, descending in reversed(_parse_order(params["order"]) if "order" in params else []):
+            rows = sorted(rows, key=lambda row: _coerce(row.get(column)), reverse=descending)
+        
+        offset = int(params.get("offset", 0))
+        limit = params.get("limit")
+        rows = rows[offset:offset + int(limit)] if limit is not None else rows[offset:]
+        
+        select = params.get("select", "*")
+        if select != "*":
+            columns = [c.strip() for c in select.split(",")]
+            rows = [{c: row.get(c) for c in columns} for row in rows]
+        return rows
+    
+    @staticmethod
+    def _new_row(values: Dict[str, Any]) -> Dict[str, Any]:
+        row = dict(values)
+        row.setdefault("id", str(uuid.uuid4()))
+        row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+        return row
+    
+    async def handle(self, request: Request) -> Response:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        
+        table = request.path_params["table"]
+        items = list(request.query_params.multi_items())
+        params = dict(items)
+        prefer = request.headers.get("prefer", "")
+        rows = self.tables.setdefault(table, [])
+        
+        if request.method == "GET":
+            return JSONResponse(self._shape(self._select(table, items), params))
+        
+        if request.method == "POST":
+            body = await request.json()
+            values = body if isinstance(body, list) else [body]
+            conflict = params.get("on_conflict")
+            merge = "resolution=merge-duplicates" in prefer
+            written = []
+            for value in values:
+                existing: Optional[Dict[str, Any]] = None
+                if merge and conflict:
+                    keys = conflict.split(",")
+                    existing = next(
+                        (row for row in rows if all(row.get(k) == value.get(k) for k in keys)),
+                        None
+                    )
+                if existing is not None:
+                    existing.update(value)
+                    written.append(existing)
+                else:
+                    row = self._new_row(value)
+                    rows.append(row)
+                    written.append(row)
+            return self._written(written, prefer, status_code=201)
+        
+        if request.method == "PATCH":
+            body = await request.json()
+            matched = self._select(table, items)
+            for row in matched:
+                row.update(body)
+            return self._written(matched, prefer)
+        
+        if request.method == "DELETE":
+            matched = self._select(table, items)
+            matched_ids = {id(row) for row in matched}
+            self.tables[table] = [row for row in rows if id(row) not in matched_ids]
+            return self._written(matched, prefer)
+        
+        return JSONResponse({"message": "Method not allowed"}, status_code=405)
+    
+    @staticmethod
+    def _written(rows: List[Dict[str, Any]], prefer: str, status_code: int = 200) -> Response:
+        if "return=minimal" in prefer:
+            return Response(status_code=204 if status_code == 200 else status_code)
+        return JSONResponse(rows, status_code=status_code)
+    
+    async def stats(self, request: Request) -> Response:
+        return JSONResponse({
+            "requests": self.requests,
+            "tables": {name: len(rows) for name, rows in self.tables.items()},
+        })
+
+
+def create_app(backend: FakePostgrest) -> Starlette:
+    """
+    Build the fake PostgREST application.
+    
+    Args:
+        backend: The in-memory tables.
+    
+    Returns:
+        The ASGI application.
+    """
+    async def rpc(request: Request) -> Response:
+        return JSONResponse(
+            {"message": f"Function {request.path_params['function']} not found"},
+            status_code=404
+        )
+    
+    return Starlette(routes=[
+        Route("/rest/v1/rpc/{function}", rpc, methods=["POST"]),
+        Route("/rest/v1/{table}", backend.handle, methods=["GET", "POST", "PATCH", "DELETE"]),
+        Route("/stats", backend.stats, methods=["GET"]),
+    ])
+
+
+if __name__ == "__main__":
+    import uvicorn
+    
+    parser = argparse.ArgumentParser(description="Run an in-memory PostgREST stand-in.")
+    parser.add_argument("--port", type=int, default=8102)
+    parser.add_argument("--latency", type=float, default=0.005, help="Seconds added to every request")
+    args = parser.parse_args()
+    
+    uvicorn.run(
+        create_app(FakePostgrest(latency=args.latency)),
+        host="127.0.0.1",
+        port=args.port,
+        log_level="warning"
+    )
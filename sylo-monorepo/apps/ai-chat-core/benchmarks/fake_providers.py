@@ -0,0 +1,235 @@
+"""
+Fake OpenAI and Anthropic APIs for benchmarks.
+
+Serves ``POST /v1/chat/completions`` (OpenAI) and ``POST /v1/messages``
+(Anthropic), streamed or not, with a configurable time to first token,
+per-token delay and share of requests rejected with 429.
+
+Usage:
+    python -m benchmarks.fake_providers [--port 8101] [--latency 0.3]
+        [--token-delay 0.01] [--reply-tokens 50] [--rate-limit-ratio 0.0]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+WORDS = "the model answers with a short and plausible reply about the prompt".split()
+
+
+class FakeProviderConfig:
+    """
+    Behaviour of the fake providers.
+    """
+    
+    def __init__(
+        self,
+        latency: float = 0.3,
+        token_delay: float = 0.01,
+        reply_tokens: int = 50,
+        rate_limit_ratio: float = 0.0,
+        retry_after: float = 1.0,
+        seed: int = 42
+    ):
+        """
+        Args:
+            latency: Seconds before the first token.
+            token_delay: Seconds per generated token.
+            reply_tokens: Tokens in every reply.
+            rate_limit_ratio: Share of requests answered with 429.
+            retry_after: ``retry-after`` seconds sent with a 429.
+            seed: Seed for the 429 injection.
+        """
+        self.latency = latency
+        self.token_delay = token_delay
+        self.reply_tokens = reply_tokens
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.rate_limited = 0
+
+
+def _reply_tokens(count: int) -> List[str]:
+    return [WORDS[i % len(WORDS)] + " " for i in range(count)]
+
+
+def _prompt_tokens(messages: List[Dict[str, Any]], system: str = "") -> int:
+    characters = len(system) + sum(len(str(message.get("content") or "")) for message in messages)
+    return characters // 4 + 4 * len(messages)
+
+
+def create_app(config: FakeProviderConfig) -> Starlette:
+    """
+    Build the fake provider application.
+    
+    Args:
+        config: How the fake providers behave.
+    
+    Returns:
+        The ASGI application.
+    """
+    def rate_limited(provider: str):
+        config.requests += 1
+        if config.random.random() >= config.rate_limit_ratio:
+            return None
+        config.rate_limited += 1
+        body = {"error": {"message": "Rate limit reached (injected)", "type": "rate_limit_error"}}
+        if provider == "anthropic":
+            body = {"type": "error", "error": body["error"]}
+        return JSONResponse(body, status_code=429, headers={"retry-after": str(config.retry_after)})
+    
+    async def openai_completions(request: Request):
+        limited = rate_limited("openai")
+        if limited is not None:
+            return limited
+        
+        body = await request.json()
+        model = body.get("model", "gpt-4o")
+        prompt_tokens = _prompt_tokens(body.get("messages", []))
+        tokens = _reply_tokens(min(config.reply_tokens, body.get("max_tokens") or config.reply_tokens))
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_tokens + len(tokens),
+        }
+        
+        if not body.get("stream"):
+            await asyncio.sleep(config.latency + config.token_delay * len(tokens))
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens)},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+        
+        async def events() -> AsyncIterator[str]:
+            await asyncio.sleep(config.latency)
+            for index, token in enumerate(tokens):
+                if index:
+                    await asyncio.sleep(config.token_delay)
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            final = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+        
+        return StreamingResponse(events(), media_type="text/event-stream")
+    
+    async def anthropic_messages(request: Request):
+        limited = rate_limited("anthropic")
+        if limited is not None:
+            return limited
+        
+        body = await request.json()
+        model = body.get("model", "claude-3-opus")
+        system = body.get("system") or ""
+        if not isinstance(system, str):
+            system = json.dumps(system)
+        input_tokens = _prompt_tokens(body.get("messages", []), system)
+        tokens = _reply_tokens(min(config.reply_tokens, body.get("max_tokens") or config.reply_tokens))
+        message_id = f"msg_{uuid.uuid4().hex}"
+        
+        if not body.get("stream"):
+            await asyncio.sleep(config.latency + config.token_delay * len(tokens))
+            return JSONResponse({
+                "id": message_id,
+                "type": "message",
+                "role": "assistant",
+                "model": model,
+                "content": [{"type": "text", "text": "".join(tokens)}],
+                "stop_reason": "end_turn",
+                "usage": {"input_tokens": input_tokens, "output_tokens": len(tokens)},
+            })
+        
+        def event(name: str, data: Dict[str, Any]) -> str:
+            return f"event: {name}\ndata: {json.dumps({'type': name, **data})}\n\n"
+        
+        async def events() -> AsyncIterator[str]:
+            await asyncio.sleep(config.latency)
+            yield event("message_start", {"message": {
+                "id": message_id,
+                "type": "message",
+                "role": "assistant",
+                "model": model,
+                "content": [],
+                "usage": {"input_tokens": input_tokens, "output_tokens": 0},
+            }})
+            yield event("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}})
+            for index, token in enumerate(tokens):
+                if index:
+                    await asyncio.sleep(config.token_delay)
+                yield event("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": token}})
+            yield event("content_block_stop", {"index": 0})
+            yield event("message_delta", {
+                "delta": {"stop_reason": "end_turn"},
+                "usage": {"output_tokens": len(tokens)},
+            })
+            yield event("message_stop", {})
+        
+        return StreamingResponse(events(), media_type="text/event-stream")
+    
+    async def stats(request: Request):
+        return JSONResponse({"requests": config.requests, "rate_limited": config.rate_limited})
+    
+    return Starlette(routes=[
+        Route("/v1/chat/completions", openai_completions, methods=["POST"]),
+        Route("/v1/messages", anthropic_messages, methods=["POST"]),
+        Route("/stats", stats, methods=["GET"]),
+    ])
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Add the fake provider options to an argument parser.
+    """
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="Seconds per generated token")
+    parser.add_argument("--reply-tokens", type=int, default=50, help="Tokens in every reply")
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="retry-after seconds sent with a 429")
+
+
+if __name__ == "__main__":
+    import uvicorn
+    
+    parser = argparse.ArgumentParser(description="Run fake OpenAI and Anthropic APIs.")
+    parser.add_argument("--port", type=int, default=8101)
+    add_arguments(parser)
+    args = parser.parse_args()
+    
+    app = create_app(FakeProviderConfig(
+        latency=args.latency,
+        token_delay=args.token_delay,
+        reply_tokens=args.reply_tokens,
+        rate_limit_ratio=args.rate_limit_ratio,
+        retry_after=args.retry_after
+    ))
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
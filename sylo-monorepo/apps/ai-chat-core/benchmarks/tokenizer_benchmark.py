@@ -0,0 +1,83 @@
+"""
+Microbenchmarks for the local tokenizers.
+
+Compares exact (tiktoken) and approximate counting on single texts and on
+batches, and reports how far the approximation is from the exact count.
+
+Usage:
+    python -m benchmarks.tokenizer_benchmark [--model gpt-4o] [--repeat 5]
+"""
+import argparse
+import random
+import statistics
+import timeit
+from typing import Callable, List
+from app.services.tokenizer import ApproximateTokenizer, Tokenizer, tokenizers
+
+# Sample vocabulary mixing prose, code and numbers, like chat traffic
+WORDS = (
+    "the quick brown fox jumps over a lazy dog while prompt engineering "
+    "def return async await import json {\"key\": [1, 2, 3]} https://example.com "
+    "internationalization 2024-10-18 résumé naïve 東京 🚀"
+).split()
+
+
+def make_texts(count: int, words: int, seed: int = 42) -> List[str]:
+    """
+    Build reproducible sample texts.
+    """
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(words)) for _ in range(count)]
+
+
+def best_of(fn: Callable[[], object], repeat: int, number: int) -> float:
+    """
+    Get the best time per call in microseconds.
+    """
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number * 1e6
+
+
+def run(exact: Tokenizer, approximate: Tokenizer, repeat: int) -> None:
+    print(f"{'case':<28}{'exact us':>12}{'approx us':>12}{'speedup':>10}{'mean err %':>12}")
+    
+    for label, count, words in (
+        ("single short (20 words)", 1, 20),
+        ("single long (2000 words)", 1, 2000),
+        ("batch 100 x 50 words", 100, 50),
+        ("batch 1000 x 50 words", 1000, 50),
+    ):
+        texts = make_texts(count, words)
+        number = max(1, 2000 // (count * max(1, words // 50)))
+        
+        if count == 1:
+            text = texts[0]
+            exact_us = best_of(lambda: exact.count(text), repeat, number)
+            approx_us = best_of(lambda: approximate.count(text), repeat, number)
+        else:
+            exact_us = best_of(lambda: exact.count_batch(texts), repeat, number)
+            approx_us = best_of(lambda: approximate.count_batch(texts), repeat, number)
+        
+        exact_counts = exact.count_batch(texts)
+        approx_counts = approximate.count_batch(texts)
+        error = statistics.mean(
+            abs(a - e) / e * 100 for a, e in zip(approx_counts, exact_counts) if e
+        )
+        
+        print(
+            f"{label:<28}{exact_us:>12.1f}{approx_us:>12.1f}"
+            f"{exact_us / approx_us:>9.0f}x{error:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark exact and approximate token counting.")
+    parser.add_argument("--model", default="gpt-4o", help="Model whose exact tokenizer to benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions; the best is reported")
+    args = parser.parse_args()
+    
+    exact_tokenizer = tokenizers.for_model(args.model)
+    if isinstance(exact_tokenizer, ApproximateTokenizer):
+        parser.error(f"No exact tokenizer for '{args.model}' (is tiktoken installed and TOKENIZER_MODE=exact?)")
+    
+    print(f"Model {args.model}: exact encoding {exact_tokenizer.name}")
+    run(exact_tokenizer, tokenizers.approximate, args.repeat)
@@ -0,0 +1,8 @@
+-- Chat History Keyset Pagination Migration
+-- Date: 2026-10-18
+
+-- Serves session history pages and exports (crud_chat_history.get_session_page,
+-- iter_session_rows) in (created_at, id) order straight from the index, so a
+-- page deep into a long session costs the same as the first one
+CREATE INDEX IF NOT EXISTS idx_chat_history_session_keyset
+    ON chat_history(user_id, session_id, created_at, id);
@@ -0,0 +1,115 @@
+-- Chat Session Index Migration
+-- Date: 2026-10-18
+
+-- One row per chat session, kept in step with chat_history by the triggers
+-- below so sessions can be listed without scanning a user's history
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    id UUID PRIMARY KEY,
+    user_id UUID NOT NULL,
+    title TEXT,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    last_model TEXT,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    last_message_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- Serves GET /v1/chat/sessions pages, most recently active first
+CREATE INDEX IF NOT EXISTS idx_chat_sessions_user_recent
+    ON chat_sessions(user_id, last_message_at DESC, id DESC);
+
+-- Fold a statement's inserted rows into the index, one upsert per session.
+-- Write-behind flushes insert many rows at once, so this runs per statement.
+-- Session start markers create the session but are not counted; the title
+-- is taken from the first user message.
+CREATE OR REPLACE FUNCTION chat_sessions_apply_inserts()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO chat_sessions AS s (
+        id, user_id, title, message_count, last_model, created_at, last_message_at
+    )
+    SELECT
+        n.session_id,
+        (array_agg(n.user_id ORDER BY n.created_at))[1],
+        left((array_agg(n.content ORDER BY n.created_at, n.id) FILTER (WHERE n.role = 'user'))[1], 120),
+        count(*) FILTER (WHERE n.metadata->>'session_start' IS NULL),
+        (array_agg(n.model ORDER BY n.created_at DESC, n.id DESC) FILTER (WHERE n.model IS NOT NULL))[1],
+        min(n.created_at),
+        max(n.created_at)
+    FROM new_rows n
+    GROUP BY n.session_id
+    ON CONFLICT (id) DO UPDATE SET
+        title = coalesce(s.title, EXCLUDED.title),
+        message_count = s.message_count + EXCLUDED.message_count,
+        last_model = coalesce(EXCLUDED.last_model, s.last_model),
+        created_at = least(s.created_at, EXCLUDED.created_at),
+        last_message_at = greatest(s.last_message_at, EXCLUDED.last_message_at)
+    WHERE s.user_id = EXCLUDED.user_id;
+    RETURN NULL;
+END;
+$$;
+
+-- Recount the sessions a delete touched, dropping those left empty
+CREATE OR REPLACE FUNCTION chat_sessions_apply_deletes()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    WITH affected AS (
+        SELECT DISTINCT o.user_id, o.session_id FROM old_rows o
+    ),
+    remaining AS (
+        SELECT
+            a.session_id,
+            count(h.id) FILTER (WHERE h.metadata->>'session_start' IS NULL) AS message_count,
+            max(h.created_at) AS last_message_at
+        FROM affected a
+        LEFT JOIN chat_history h
+            ON h.user_id = a.user_id AND h.session_id = a.session_id
+        GROUP BY a.session_id
+    ),
+    dropped AS (
+        DELETE FROM chat_sessions s
+        USING remaining r
+        WHERE s.id = r.session_id AND r.last_message_at IS NULL
+    )
+    UPDATE chat_sessions s
+    SET message_count = r.message_count,
+        last_message_at = r.last_message_at
+    FROM remaining r
+    WHERE s.id = r.session_id AND r.last_message_at IS NOT NULL;
+    RETURN NULL;
+END;
+$$;
+
+BEGIN;
+
+-- Block writes while the index is backfilled, so no rows are missed or counted twice
+LOCK TABLE chat_history IN SHARE ROW EXCLUSIVE MODE;
+
+CREATE TRIGGER chat_history_index_inserts
+AFTER INSERT ON chat_history
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION chat_sessions_apply_inserts();
+
+CREATE TRIGGER chat_history_index_deletes
+AFTER DELETE ON chat_history
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION chat_sessions_apply_deletes();
+
+-- Index existing sessions
+INSERT INTO chat_sessions (id, user_id, title, message_count, last_model, created_at, last_message_at)
+SELECT
+    h.session_id,
+    (array_agg(h.user_id ORDER BY h.created_at))[1],
+    left((array_agg(h.content ORDER BY h.created_at, h.id) FILTER (WHERE h.role = 'user'))[1], 120),
+    count(*) FILTER (WHERE h.metadata->>'session_start' IS NULL),
+    (array_agg(h.model ORDER BY h.created_at DESC, h.id DESC) FILTER (WHERE h.model IS NOT NULL))[1],
+    min(h.created_at),
+    max(h.created_at)
+FROM chat_history h
+GROUP BY h.session_id
+ON CONFLICT (id) DO NOTHING;
+
+COMMIT;
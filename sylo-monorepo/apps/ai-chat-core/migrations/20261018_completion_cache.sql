@@ -0,0 +1,13 @@
+-- Completion Cache Migration
+-- Date: 2026-10-18
+
+-- Persistent tier for cached model completions (COMPLETION_CACHE_PERSISTENT=true)
+CREATE TABLE completion_cache (
+    key TEXT PRIMARY KEY,
+    response JSONB NOT NULL,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create index for expiry sweeps
+CREATE INDEX idx_completion_cache_expires_at ON completion_cache(expires_at);
@@ -0,0 +1,64 @@
+-- Team Membership Migration
+-- Date: 2026-10-18
+
+-- Teams a user owns or belongs to, in one round trip (crud_team_settings.get_teams_for_user)
+CREATE OR REPLACE FUNCTION get_teams_for_user(p_user_id UUID)
+RETURNS SETOF teams
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT t.*
+    FROM teams t
+    WHERE t.owner_id = p_user_id
+       OR EXISTS (
+           SELECT 1
+           FROM team_members m
+           WHERE m.team_id = t.id
+             AND m.user_id = p_user_id
+       );
+$$;
+
+-- Create indexes for both sides of the lookup
+CREATE INDEX IF NOT EXISTS idx_teams_owner_id ON teams(owner_id);
+CREATE INDEX IF NOT EXISTS idx_team_members_user_id_team_id ON team_members(user_id, team_id);
+
+-- Notify replicas listening with CACHE_INVALIDATION_DSN when memberships change
+CREATE OR REPLACE FUNCTION notify_team_members_change()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM pg_notify('team_members', OLD.user_id::text);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM pg_notify('team_members', NEW.user_id::text);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER team_members_notify
+AFTER INSERT OR UPDATE OR DELETE ON team_members
+FOR EACH ROW EXECUTE FUNCTION notify_team_members_change();
+
+-- Owners are members too, and cached teams carry names and descriptions
+CREATE OR REPLACE FUNCTION notify_teams_change()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM pg_notify('teams', OLD.id::text);
+        PERFORM pg_notify('team_members', OLD.owner_id::text);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM pg_notify('team_members', NEW.owner_id::text);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER teams_notify
+AFTER INSERT OR UPDATE OR DELETE ON teams
+FOR EACH ROW EXECUTE FUNCTION notify_teams_change();
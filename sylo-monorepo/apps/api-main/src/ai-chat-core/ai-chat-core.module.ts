@@ -1,8 +1,9 @@
-import { Module } from '@nestjs/common';
+import { MiddlewareConsumer, Module, NestModule } from '@nestjs/common';
 import { HttpModule } from '@nestjs/axios';
 import { ConfigModule } from '@nestjs/config';
 import { AiChatCoreService } from './ai-chat-core.service';
 import { AiChatCoreController } from './ai-chat-core.controller';
+import { TraceContextMiddleware } from './trace-context.middleware';
 
 @Module({
   imports: [
@@ -13,4 +14,8 @@ import { AiChatCoreController } from './ai-chat-core.controller';
   providers: [AiChatCoreService],
   exports: [AiChatCoreService],
 })
-export class AiChatCoreModule {}
\ No newline at end of file
+export class AiChatCoreModule implements NestModule {
+  configure(consumer: MiddlewareConsumer) {
+    consumer.apply(TraceContextMiddleware).forRoutes(AiChatCoreController);
+  }
+}
@@ -3,6 +3,7 @@ import { HttpService } from '@nestjs/axios';
 import { ConfigService } from '@nestjs/config';
 import { firstValueFrom } from 'rxjs';
 import { AxiosRequestConfig } from 'axios';
+import { traceContextHeaders } from './trace-context.middleware';
 
 @Injectable()
 export class AiChatCoreService {
@@ -15,6 +16,18 @@ export class AiChatCoreService {
     this.baseUrl = this.configService.get<string>('AI_CHAT_CORE_URL') || 'http://localhost:4000';
   }
 
+  /**
+   * Build the headers for a request to ai-chat-core
+   * @param userId The ID of the user
+   * @returns The user ID header plus the caller's trace context, if any
+   */
+  private headers(userId: string): Record<string, string> {
+    return {
+      'X-User-ID': userId,
+      ...traceContextHeaders(),
+    };
+  }
+
   /**
    * Generate a chat completion
    * @param userId The ID of the user
@@ -44,9 +57,7 @@ export class AiChatCoreService {
     };
 
     const config: AxiosRequestConfig = {
-      headers: {
-        'X-User-ID': userId,
-      },
+      headers: this.headers(userId),
     };
 
     const response = await firstValueFrom(
@@ -65,9 +76,7 @@ export class AiChatCoreService {
     const url = `${this.baseUrl}/v1/chat/sessions`;
     
     const config: AxiosRequestConfig = {
-      headers: {
-        'X-User-ID': userId,
-      },
+      headers: this.headers(userId),
     };
 
     const response = await firstValueFrom(
@@ -87,9 +96,7 @@ export class AiChatCoreService {
     const url = `${this.baseUrl}/v1/chat/sessions/${sessionId}`;
     
     const config: AxiosRequestConfig = {
-      headers: {
-        'X-User-ID': userId,
-      },
+      headers: this.headers(userId),
     };
 
     const response = await firstValueFrom(
@@ -108,9 +115,7 @@ export class AiChatCoreService {
     const url = `${this.baseUrl}/v1/user-settings`;
     
     const config: AxiosRequestConfig = {
-      headers: {
-        'X-User-ID': userId,
-      },
+      headers: this.headers(userId),
     };
 
     const response = await firstValueFrom(
@@ -147,9 +152,7 @@ export class AiChatCoreService {
     };
 
     const config: AxiosRequestConfig = {
-      headers: {
-        'X-User-ID': userId,
-      },
+      headers: this.headers(userId),
     };
 
     const response = await firstValueFrom(
@@ -175,9 +178,7 @@ export class AiChatCoreService {
     };
 
     const config: AxiosRequestConfig = {
-      headers: {
-        'X-User-ID': userId,
-      },
+      headers: this.headers(userId),
     };
 
     const response = await firstValueFrom(
@@ -203,9 +204,7 @@ export class AiChatCoreService {
     };
 
     const config: AxiosRequestConfig = {
-      headers: {
-        'X-User-ID': userId,
-      },
+      headers: this.headers(userId),
     };
 
     const response = await firstValueFrom(
@@ -0,0 +1,46 @@
+import { Injectable, NestMiddleware } from '@nestjs/common';
+import { AsyncLocalStorage } from 'async_hooks';
+import { NextFunction, Request, Response } from 'express';
+
+/**
+ * W3C trace context headers received with the current request
+ */
+interface TraceContext {
+  traceparent?: string;
+  tracestate?: string;
+}
+
+const traceContextStorage = new AsyncLocalStorage<TraceContext>();
+
+/**
+ * Keeps the incoming trace context for the duration of a request, so calls
+ * to ai-chat-core continue the caller's trace.
+ */
+@Injectable()
+export class TraceContextMiddleware implements NestMiddleware {
+  use(req: Request, res: Response, next: NextFunction) {
+    const context: TraceContext = {
+      traceparent: req.header('traceparent'),
+      tracestate: req.header('tracestate'),
+    };
+    traceContextStorage.run(context, next);
+  }
+}
+
+/**
+ * Get the trace context headers to forward with an outgoing request
+ * @returns The traceparent and tracestate headers, if the current request had them
+ */
+export function traceContextHeaders(): Record<string, string> {
+  const context = traceContextStorage.getStore();
+  const headers: Record<string, string> = {};
+
+  if (context?.traceparent) {
+    headers.traceparent = context.traceparent;
+    if (context.tracestate) {
+      headers.tracestate = context.tracestate;
+    }
+  }
+
+  return headers;
+}